@@ -0,0 +1,266 @@
+"""
+Measures the calculator on a fixed set of scenarios: the task main.py calculates while DEBUG is enabled, over an
+increasing amount of turns, and synthetic tasks scaling the amount of commands, commands per turn and turns one at a
+time. Every scenario runs headless in its own process, which records its wall time, peak memory (resident set size),
+the amount of routes expanded and the amount of routes returned.
+
+Each scenario is run a few times, keeping its best time and memory. The results can be saved as a baseline, and later
+runs compared against it, failing if a scenario got slower or used more memory than the tolerance allows, or if it
+returned a different amount of routes. benchmarks/baseline.json is the baseline of the current version:
+
+    python benchmark.py --baseline benchmarks/baseline.json
+
+Its times were measured on one machine, so on another one, save a baseline of the version to compare against first:
+
+    python benchmark.py --save my_baseline.json
+
+Heat always gains its minimum in every scenario, so that the amount of routes returned doesn't depend on luck.
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+
+# Peak memory is only measured where the resource module exists, which is everywhere but on Windows
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from solver import Task, solve, debug_task, optimistic_heat_task
+from task_calculator import SearchControl, BREADTH_FIRST, DEPTH_FIRST, STREAMING, STATE_GRAPH
+from data_structure import Command, PossibleTurnsCache, REGULAR_RESOURCE_NAMES, SPECIAL_RESOURCE_NAMES, Comms, Navs, \
+    Data, Power, Heat, Crew
+
+TIME_TOLERANCE = 0.25  # How much slower than the baseline a scenario can get, as a fraction of the baseline
+MIN_TIME_TOLERANCE = 0.05  # How many seconds slower any scenario can get, so that the fastest ones aren't just noise
+MEMORY_TOLERANCE = 0.25  # How much more memory than the baseline a scenario can use, as a fraction of the baseline
+SCENARIO_TIMEOUT = 600  # The most seconds a single scenario can take
+REPEATS = 3  # How many times each scenario is run, keeping the best of its measurements
+
+# The commands the synthetic tasks are made of, in the order they're taken
+SYNTHETIC_COMMANDS: list[tuple[str, dict[str, int], dict[str, int]]] = [
+    ("Power to comms", {REGULAR_RESOURCE_NAMES["power"]: 1}, {REGULAR_RESOURCE_NAMES["comms"]: 2}),
+    ("Comms to navs", {REGULAR_RESOURCE_NAMES["comms"]: 2}, {REGULAR_RESOURCE_NAMES["navs"]: 3}),
+    ("Navs to data", {REGULAR_RESOURCE_NAMES["navs"]: 2}, {REGULAR_RESOURCE_NAMES["data"]: 2}),
+    ("Data to power", {REGULAR_RESOURCE_NAMES["data"]: 1}, {REGULAR_RESOURCE_NAMES["power"]: 2}),
+    ("Heat to power", {SPECIAL_RESOURCE_NAMES["heat"]: 1}, {REGULAR_RESOURCE_NAMES["power"]: 1}),
+    ("Crew to data", {SPECIAL_RESOURCE_NAMES["crew"]: 1}, {REGULAR_RESOURCE_NAMES["data"]: 1}),
+    ("Power to navs", {REGULAR_RESOURCE_NAMES["power"]: 2}, {REGULAR_RESOURCE_NAMES["navs"]: 2}),
+    ("Comms to data", {REGULAR_RESOURCE_NAMES["comms"]: 1}, {REGULAR_RESOURCE_NAMES["data"]: 1}),
+    ("Power to heat and comms", {REGULAR_RESOURCE_NAMES["power"]: 1},
+     {SPECIAL_RESOURCE_NAMES["heat"]: 1, REGULAR_RESOURCE_NAMES["comms"]: 3}),
+    ("Crew and navs to comms", {SPECIAL_RESOURCE_NAMES["crew"]: 1, REGULAR_RESOURCE_NAMES["navs"]: 1},
+     {REGULAR_RESOURCE_NAMES["comms"]: 2}),
+    ("Data to comms", {REGULAR_RESOURCE_NAMES["data"]: 2}, {REGULAR_RESOURCE_NAMES["comms"]: 2}),
+    ("Power to data", {REGULAR_RESOURCE_NAMES["power"]: 3}, {REGULAR_RESOURCE_NAMES["data"]: 3})
+]
+
+
+def synthetic_task(amount_of_commands: int, commands_per_turn: int, amount_of_turns: int) -> Task:
+    """
+    A task with the first amount_of_commands of SYNTHETIC_COMMANDS, which always has routes.
+    """
+    resource_classes: dict[str, type] = {REGULAR_RESOURCE_NAMES["comms"]: Comms,
+                                         REGULAR_RESOURCE_NAMES["navs"]: Navs,
+                                         REGULAR_RESOURCE_NAMES["data"]: Data,
+                                         REGULAR_RESOURCE_NAMES["power"]: Power,
+                                         SPECIAL_RESOURCE_NAMES["heat"]: lambda value: Heat(12, 1, 1, value=value),
+                                         SPECIAL_RESOURCE_NAMES["crew"]: Crew}
+    available_commands: dict[str, Command] = {}
+    for name, inputs, outputs in SYNTHETIC_COMMANDS[:amount_of_commands]:
+        available_commands[name] = Command(name,
+                                           {resource_name: resource_classes[resource_name](value)
+                                            for resource_name, value in inputs.items()},
+                                           {resource_name: resource_classes[resource_name](value)
+                                            for resource_name, value in outputs.items()})
+    starting_resources: dict = {REGULAR_RESOURCE_NAMES["comms"]: Comms(value=2),
+                                REGULAR_RESOURCE_NAMES["navs"]: Navs(),
+                                REGULAR_RESOURCE_NAMES["data"]: Data(),
+                                REGULAR_RESOURCE_NAMES["power"]: Power(value=4 * commands_per_turn * amount_of_turns),
+                                SPECIAL_RESOURCE_NAMES["heat"]: Heat(12, 1, 1, value=2),
+                                SPECIAL_RESOURCE_NAMES["crew"]: Crew(2)}
+    objective: dict = {REGULAR_RESOURCE_NAMES["comms"]: Comms(value=2)}
+    return Task(available_commands, starting_resources, amount_of_turns, commands_per_turn, objective,
+                f"{amount_of_commands} commands, {commands_per_turn} per turn, {amount_of_turns} turns")
+
+
+def debug_scenario_task(amount_of_turns: int) -> Task:
+    task: Task = optimistic_heat_task(debug_task())
+    task.amount_of_turns = amount_of_turns
+    return task
+
+
+def get_scenarios() -> dict[str, tuple[callable, dict[str, any]]]:
+    """
+    Every scenario by name, as a function returning its task and the search options to solve it with.
+    """
+    scenarios: dict[str, tuple[callable, dict[str, any]]] = {}
+    for amount_of_turns in (1, 2, 3):
+        scenarios[f"debug-{amount_of_turns}-turns"] = (lambda turns=amount_of_turns: debug_scenario_task(turns),
+                                                       {"search_mode": DEPTH_FIRST, "prune": False})
+    scenarios["debug-3-turns-breadth-first"] = (lambda: debug_scenario_task(3),
+                                                {"search_mode": BREADTH_FIRST, "prune": False})
+    scenarios["debug-3-turns-streaming"] = (lambda: debug_scenario_task(3),
+                                            {"search_mode": STREAMING, "prune": False})
+    scenarios["debug-3-turns-state-graph"] = (lambda: debug_scenario_task(3),
+                                              {"search_mode": STATE_GRAPH, "prune": False})
+    scenarios["debug-3-turns-cached"] = (lambda: debug_scenario_task(3),
+                                         {"search_mode": DEPTH_FIRST, "prune": False,
+                                          "turn_cache": PossibleTurnsCache()})
+    scenarios["debug-3-turns-pruned"] = (lambda: debug_scenario_task(3), {"search_mode": DEPTH_FIRST, "prune": True})
+
+    for amount_of_commands in (3, 6, 9, 12):
+        scenarios[f"commands-{amount_of_commands}"] = (
+            lambda commands=amount_of_commands: synthetic_task(commands, 2, 3),
+            {"search_mode": DEPTH_FIRST, "prune": False})
+    for commands_per_turn in (1, 2, 3, 4):
+        scenarios[f"commands-per-turn-{commands_per_turn}"] = (
+            lambda per_turn=commands_per_turn: synthetic_task(6, per_turn, 2),
+            {"search_mode": DEPTH_FIRST, "prune": False})
+    for amount_of_turns in (1, 2, 3, 4, 5, 6):
+        scenarios[f"turns-{amount_of_turns}"] = (lambda turns=amount_of_turns: synthetic_task(4, 2, turns),
+                                                 {"search_mode": DEPTH_FIRST, "prune": False})
+    return scenarios
+
+
+def run_scenario(name: str) -> dict[str, any]:
+    """
+    Runs a single scenario in this process, and returns its measurements.
+    """
+    get_task, search_options = get_scenarios()[name]
+    task: Task = get_task()
+    random.seed(0)
+    control: SearchControl = SearchControl()
+
+    start_time: float = time.perf_counter()
+    routes_returned: int = 0
+    for _ in solve(task, control=control, **search_options):
+        routes_returned += 1
+    wall_time: float = time.perf_counter() - start_time
+
+    peak_rss: int = None
+    if resource is not None:
+        # In kilobytes on Linux, but in bytes on macOS
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":
+            peak_rss //= 1024
+    return {"name": name,
+            "wall_time": round(wall_time, 4),
+            "peak_rss_kb": peak_rss,
+            "routes_expanded": control.routes_expanded,
+            "routes_returned": routes_returned}
+
+
+def run_scenario_process(name: str, timeout: float = SCENARIO_TIMEOUT) -> dict[str, any]:
+    """
+    Runs a single scenario in a fresh process, so that its peak memory isn't affected by the other scenarios.
+    """
+    try:
+        completed: subprocess.CompletedProcess = subprocess.run(
+            [sys.executable, __file__, "--run-scenario", name], capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"name": name, "error": f"Timed out after {timeout} seconds"}
+    if completed.returncode != 0:
+        return {"name": name, "error": completed.stderr.strip().splitlines()[-1] if completed.stderr else
+                f"Exited with {completed.returncode}"}
+    return json.loads(completed.stdout)
+
+
+def run_scenario_repeatedly(name: str, repeats: int = REPEATS, timeout: float = SCENARIO_TIMEOUT) -> dict[str, any]:
+    """
+    Runs a single scenario repeats times, each in a fresh process, and keeps its fastest wall time and lowest peak
+    memory, since anything else running on the machine only ever makes a run slower or bigger.
+    """
+    best_result: dict[str, any] = None
+    for _ in range(repeats):
+        result: dict[str, any] = run_scenario_process(name, timeout)
+        if "error" in result:
+            return result
+        if best_result is None:
+            best_result = result
+            continue
+        best_result["wall_time"] = min(best_result["wall_time"], result["wall_time"])
+        if result["peak_rss_kb"] is not None:
+            best_result["peak_rss_kb"] = min(best_result["peak_rss_kb"], result["peak_rss_kb"])
+    return best_result
+
+
+def compare(result: dict[str, any], baseline: dict[str, any], time_tolerance: float = TIME_TOLERANCE,
+            memory_tolerance: float = MEMORY_TOLERANCE) -> list[str]:
+    """
+    Returns every regression of the result compared to the baseline of the same scenario.
+    """
+    if "error" in result:
+        return [result["error"]]
+    regressions: list[str] = []
+    if result["routes_returned"] != baseline["routes_returned"]:
+        regressions.append(f"returned {result['routes_returned']} routes instead of {baseline['routes_returned']}")
+    if result["wall_time"] > baseline["wall_time"] + max(baseline["wall_time"] * time_tolerance, MIN_TIME_TOLERANCE):
+        regressions.append(f"took {result['wall_time']}s instead of {baseline['wall_time']}s")
+    if result["peak_rss_kb"] is not None and baseline.get("peak_rss_kb") is not None and \
+            result["peak_rss_kb"] > baseline["peak_rss_kb"] * (1 + memory_tolerance):
+        regressions.append(f"used {result['peak_rss_kb']}kB instead of {baseline['peak_rss_kb']}kB")
+    return regressions
+
+
+def main(arguments: list[str] = None) -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Benchmarks the calculator.")
+    parser.add_argument("scenarios", nargs="*", help="The scenarios to run, every one of them by default")
+    parser.add_argument("--list", action="store_true", help="Lists the scenarios and exits")
+    parser.add_argument("--save", help="Saves the results to this file, to be used as a baseline later")
+    parser.add_argument("--baseline", help="Compares the results against the ones saved in this file")
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE)
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE)
+    parser.add_argument("--timeout", type=float, default=SCENARIO_TIMEOUT, help="The most seconds per scenario")
+    parser.add_argument("--repeats", type=int, default=REPEATS,
+                        help="How many times to run each scenario, keeping its best time and memory")
+    parser.add_argument("--run-scenario", help=argparse.SUPPRESS)
+    options: argparse.Namespace = parser.parse_args(arguments)
+
+    if options.run_scenario is not None:
+        print(json.dumps(run_scenario(options.run_scenario)))
+        return 0
+
+    scenarios: dict[str, tuple[callable, dict[str, any]]] = get_scenarios()
+    if options.list:
+        print("\n".join(scenarios))
+        return 0
+    unknown_scenarios: list[str] = [name for name in options.scenarios if name not in scenarios]
+    if unknown_scenarios:
+        parser.error(f"Unknown scenarios {unknown_scenarios}, see --list")
+
+    baselines: dict[str, dict[str, any]] = {}
+    if options.baseline is not None:
+        with open(options.baseline, encoding="utf-8") as baseline_file:
+            baselines = {result["name"]: result for result in json.load(baseline_file)}
+
+    results: list[dict[str, any]] = []
+    failed: bool = False
+    print(f"{'Scenario':<32}{'Time (s)':>10}{'Peak RSS (kB)':>15}{'Expanded':>12}{'Returned':>12}")
+    for name in options.scenarios or scenarios:
+        result: dict[str, any] = run_scenario_repeatedly(name, max(options.repeats, 1), options.timeout)
+        results.append(result)
+        if "error" in result:
+            print(f"{name:<32}{result['error']}")
+            failed = True
+            continue
+        print(f"{name:<32}{result['wall_time']:>10.3f}{str(result['peak_rss_kb']):>15}"
+              f"{result['routes_expanded']:>12}{result['routes_returned']:>12}")
+        if name in baselines:
+            for regression in compare(result, baselines[name], options.time_tolerance, options.memory_tolerance):
+                print(f"    Regression: {regression}")
+                failed = True
+
+    if options.save is not None:
+        with open(options.save, "w", encoding="utf-8") as results_file:
+            json.dump(results, results_file, indent=4)
+            results_file.write("\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
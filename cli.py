@@ -0,0 +1,169 @@
+import argparse
+import random
+import sys
+import time
+from typing import Iterator, TextIO
+
+from solver import Task, solve
+from heat_distribution import iterate_heat_risks
+from compact_routes import CompactRoutes
+from solution_cache import SolutionCache, MAX_BYTES
+from task_file import load_tasks, route_to_json, search_stats_to_json, write_json_line
+from task_calculator import SearchControl, SearchStats, SEARCH_MODES, DEPTH_FIRST
+from data_structure import Route, PossibleTurnsCache, TURN_CACHE_ENTRIES
+
+
+def parse_arguments(arguments: list[str] = None) -> argparse.Namespace:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Solves the tasks of one or more task files, and writes one JSON line per task with its routes.")
+    parser.add_argument("task_files", nargs="+", help="JSON files, each holding a task or a list of tasks")
+    parser.add_argument("-o", "--output", help="The file to write the results to, instead of the standard output")
+    parser.add_argument("--search-mode", choices=SEARCH_MODES, default=DEPTH_FIRST)
+    parser.add_argument("--no-prune", dest="prune", action="store_false",
+                        help="Don't cut routes which can no longer satisfy the objective early")
+    parser.add_argument("--workers", type=int, default=1, help="The amount of worker processes per task")
+    parser.add_argument("--max-routes", type=int, default=None,
+                        help="The most routes to write per task. Every route is still counted")
+    parser.add_argument("--turn-cache-entries", type=int, default=TURN_CACHE_ENTRIES,
+                        help="The most states to cache the possible turns of, 0 to disable the cache")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seeds the random Heat gains before each task, for results that can be reproduced")
+    parser.add_argument("--heat-samples", type=int, default=0,
+                        help="Estimates each route's probability of succeeding despite the random Heat gains from this "
+                             "many simulated samples, instead of drawing the gains once. Needs NumPy")
+    parser.add_argument("--heat-processes", type=int, default=1,
+                        help="The amount of processes simulating the Heat samples")
+    parser.add_argument("--exact-heat", action="store_true",
+                        help="Gives each route its exact probability of succeeding despite the random Heat gains, by "
+                             "keeping track of the distribution of Heat instead of drawing the gains")
+    parser.add_argument("--max-heat-failure", type=float, default=1.0,
+                        help="With --exact-heat, leaves out the routes more likely than this to fail")
+    parser.add_argument("--memory-budget", type=int, default=None,
+                        help="With the breadth first search mode, moves the routes of a turn to a file on disk once "
+                             "they take up more than this many megabytes")
+    parser.add_argument("--stats", action="store_true",
+                        help="Adds what the search did on each turn to every task's result, to find the turn which "
+                             "blows up")
+    parser.add_argument("--cache", default=None,
+                        help="An SQLite file to keep solved tasks in, and return them from when they're solved again. "
+                             "Tasks with the same commands also share the possible turns of every state. Not used with "
+                             "--exact-heat, --heat-samples or --memory-budget")
+    parser.add_argument("--cache-size", type=int, default=MAX_BYTES // (1024 * 1024),
+                        help="The most megabytes the cache takes up before the least recently used tasks are evicted")
+    return parser.parse_args(arguments)
+
+
+def solve_task(task: Task, options: argparse.Namespace, solution_cache: SolutionCache = None) -> dict[str, any]:
+    """
+    Solves a single task with the given command line options, and returns its result as a JSON object.
+    If a SolutionCache is given, the plain search takes the task's routes from it, or adds them to it.
+    """
+    if options.seed is not None:
+        random.seed(options.seed)
+    turn_cache: PossibleTurnsCache = None
+    if options.turn_cache_entries > 0:
+        turn_cache = PossibleTurnsCache(options.turn_cache_entries)
+    control: SearchControl = SearchControl(stats=SearchStats() if options.stats else None)
+    memory_budget: int = None
+    if options.memory_budget is not None:
+        memory_budget = options.memory_budget * 1024 * 1024
+
+    start_time: float = time.perf_counter()
+    if options.exact_heat:
+        if options.search_mode != DEPTH_FIRST or options.heat_samples > 0:
+            raise ValueError("--exact-heat only works with the depth first search mode, and without --heat-samples")
+        results: Iterator[tuple[Route, dict[str, any]]] = (
+            (heat_risk.route, {"success_probability": heat_risk.success_probability})
+            for heat_risk in iterate_heat_risks(task, options.max_heat_failure, options.prune, turn_cache,
+                                                control))
+    elif options.heat_samples > 0:
+        # Imported here, since it loads NumPy, which nothing else needs
+        from heat_monte_carlo import iterate_heat_estimates
+        results: Iterator[tuple[Route, dict[str, any]]] = (
+            (estimate.route, {"success_probability": estimate.probability,
+                              "confidence_interval": list(estimate.confidence_interval)})
+            for estimate in iterate_heat_estimates(task, options.heat_samples, options.seed,
+                                                   processes=options.heat_processes, search_mode=options.search_mode,
+                                                   prune=options.prune, control=control))
+    elif solution_cache is not None and memory_budget is None:
+        results: Iterator[tuple[Route, dict[str, any]]] = (
+            (route, {}) for route in solution_cache.solve(task, options.search_mode, options.prune, options.workers,
+                                                          control, options.turn_cache_entries, options.seed))
+    else:
+        results: Iterator[tuple[Route, dict[str, any]]] = (
+            (route, {}) for route in solve(task, options.search_mode, options.prune, turn_cache,
+                                           workers=options.workers, control=control,
+                                           memory_budget=memory_budget))
+
+    # The routes are kept compact until they're written, along with the details of each one, if there are any
+    routes_found: int = 0
+    routes: CompactRoutes = CompactRoutes(task)
+    routes_details: list[dict[str, any]] = []
+    for route, details in results:
+        routes_found += 1
+        if options.max_routes is None or len(routes) < options.max_routes:
+            routes.append(route)
+            if details:
+                routes_details.append(details)
+
+    result: dict[str, any] = {"task": task.name,
+                              "routes_found": routes_found,
+                              "routes": iterate_routes_json(routes, routes_details),
+                              "seconds": round(time.perf_counter() - start_time, 3)}
+    if control.stats is not None:
+        result["stats"] = search_stats_to_json(control.stats)
+    return result
+
+
+def iterate_routes_json(routes: CompactRoutes, routes_details: list[dict[str, any]]) -> Iterator[dict[str, any]]:
+    """
+    Materialises each route only when it's written.
+    """
+    for index, route in enumerate(routes):
+        yield {**route_to_json(route), **(routes_details[index] if routes_details else {})}
+
+
+def write_result(output: TextIO, result: dict[str, any]) -> None:
+    write_json_line(output, result)
+    output.flush()
+
+
+def main(arguments: list[str] = None) -> int:
+    """
+    Solves every task of every task file in order. A task file or task which can't be read or solved is written as
+    a JSON line with an error instead, and the rest are still solved.
+    Returns 1 if any of them failed, and 0 otherwise.
+    """
+    options: argparse.Namespace = parse_arguments(arguments)
+    output: TextIO = sys.stdout if options.output is None else open(options.output, "w", encoding="utf-8")
+    solution_cache: SolutionCache = None
+    if options.cache is not None:
+        solution_cache = SolutionCache(options.cache, options.cache_size * 1024 * 1024)
+
+    failed: bool = False
+    try:
+        for path in options.task_files:
+            try:
+                tasks: list[Task] = load_tasks(path)
+            except (OSError, ValueError) as error:
+                write_result(output, {"file": path, "error": str(error)})
+                failed = True
+                continue
+
+            for task in tasks:
+                try:
+                    result: dict[str, any] = solve_task(task, options, solution_cache)
+                except (ValueError, ImportError) as error:
+                    result: dict[str, any] = {"task": task.name, "error": str(error)}
+                    failed = True
+                write_result(output, {"file": path, **result})
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if solution_cache is not None:
+            solution_cache.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+from array import array
+from typing import Iterable, Iterator
+
+from solver import Task
+from route_store import RouteEncoder
+from data_structure import Command, Route, ResourceBounds
+
+
+class CompactRoutes:
+    """
+    A list of finished routes of a task, where each route is stored as nothing but the indices of its commands, turn by
+    turn, in a typed array, along with the random amount Heat gained at the end of each of its turns in another one.
+    The commands themselves are kept once, in a table shared by every route.
+    Since every turn of a finished route has the same amount of commands, routes take up the same amount of items in
+    the arrays, which is a few bytes per command instead of the objects of a Route. Route objects are only
+    materialised by a RouteEncoder when a route is accessed, which gives the exact same states as the route had when it
+    was found.
+    """
+
+    def __init__(self, task: Task, routes: Iterable[Route] = ()):
+        self.amount_of_turns: int = task.amount_of_turns
+        self.commands_per_turn: int = task.commands_per_turn
+        self.encoder: RouteEncoder = RouteEncoder(Route(task.starting_resources, task.amount_of_turns),
+                                                  task.available_commands, task.commands_per_turn)
+        bounds: ResourceBounds = self.encoder.bounds
+
+        # The smallest type every command index and Heat gain fits in
+        self.route_commands: array = array("B" if len(self.encoder.commands) <= 0xff else "H")
+        self.heat_gains: array = array("b" if -0x80 <= bounds.min_heat_increase and
+                                       bounds.max_heat_increase <= 0x7f else "i")
+        self.length: int = 0
+        self.extend(routes)
+
+    def __repr__(self) -> str:
+        output = f"CompactRoutes({self.length} routes, {self.nbytes} bytes)"
+        return output
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> Route:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("Route index out of range")
+        return self.materialise(index)
+
+    def __iter__(self) -> Iterator[Route]:
+        for index in range(self.length):
+            yield self.materialise(index)
+
+    @property
+    def commands(self) -> list[Command]:
+        return self.encoder.commands
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The amount of bytes taken up by the routes, apart from the shared command table.
+        """
+        return self.route_commands.itemsize * len(self.route_commands) + self.heat_gains.itemsize * len(self.heat_gains)
+
+    def append(self, route: Route) -> None:
+        if len(route) != self.amount_of_turns:
+            raise ValueError(f"Only finished routes of {self.amount_of_turns} turns can be stored, not {len(route)}")
+        self.route_commands.extend(self.encoder.encode_commands(route))
+        self.heat_gains.extend(self.encoder.encode_heat_gains(route))
+        self.length += 1
+
+    def extend(self, routes: Iterable[Route]) -> None:
+        for route in routes:
+            self.append(route)
+
+    @classmethod
+    def from_bytes(cls, task: Task, route_commands: bytes, heat_gains: bytes) -> type(__name__):
+        """
+        The opposite of to_bytes, for the same task (with its commands in the same order).
+        """
+        routes: CompactRoutes = cls(task)
+        routes.route_commands.frombytes(route_commands)
+        routes.heat_gains.frombytes(heat_gains)
+        routes.length = len(routes.heat_gains) // max(routes.amount_of_turns, 1)
+        return routes
+
+    def to_bytes(self) -> tuple[bytes, bytes]:
+        """
+        Returns the command indices and Heat gains of every route as bytes, to be stored somewhere.
+        """
+        return self.route_commands.tobytes(), self.heat_gains.tobytes()
+
+    def get_turns_commands(self, index: int) -> list[tuple[Command, ...]]:
+        """
+        Returns the commands of every turn of a route, without materialising it.
+        """
+        start: int = index * self.amount_of_turns * self.commands_per_turn
+        return [tuple(self.commands[command_index]
+                      for command_index in self.route_commands[turn_start:turn_start + self.commands_per_turn])
+                for turn_start in range(start, start + self.amount_of_turns * self.commands_per_turn,
+                                        self.commands_per_turn)]
+
+    def materialise(self, index: int) -> Route:
+        """
+        Rebuilds the Route at the given index with the RouteEncoder.
+        """
+        commands_per_route: int = self.amount_of_turns * self.commands_per_turn
+        return self.encoder.materialise(
+            self.route_commands[index * commands_per_route:(index + 1) * commands_per_route],
+            self.heat_gains[index * self.amount_of_turns:(index + 1) * self.amount_of_turns])
+
+    def to_numpy(self):
+        """
+        Returns the command indices of every route as a (routes, turns, commands per turn) NumPy array, which shares
+        its memory with the stored routes, so it must not be kept while routes are still being added.
+        """
+        # NumPy is only needed for viewing the routes as an array, so it's only imported here, and the rest of the
+        # calculator works (and starts) without it
+        try:
+            import numpy
+        except ImportError as error:
+            raise ImportError("Viewing routes as an array needs NumPy, which can be installed with pip install numpy") \
+                from error
+        return numpy.frombuffer(self.route_commands, dtype=self.route_commands.typecode).reshape(
+            self.length, self.amount_of_turns, self.commands_per_turn)
@@ -1,6 +1,11 @@
+import copy
 import itertools
 import random
-from PyQt5.Qt import QApplication
+import sys
+import types
+import weakref
+from collections import OrderedDict
+from typing import Iterable, Iterator, Optional
 
 # TODO: Need to find alternatives to the current datastructure where resource and resource cost is intermingled (because they are made of the same resource/BaseResource and generally very chaotic
 REGULAR_RESOURCE_NAMES = {
@@ -17,6 +22,10 @@ SPECIAL_RESOURCE_NAMES = {
     "crew": "Crew"
 }
 
+# The fixed order in which resource values are stored in a resource state vector
+RESOURCE_NAMES: list[str] = list(REGULAR_RESOURCE_NAMES.values()) + list(SPECIAL_RESOURCE_NAMES.values())
+RESOURCE_INDEX: dict[str, int] = {resource_name: index for index, resource_name in enumerate(RESOURCE_NAMES)}
+
 
 class BaseResource:
     """
@@ -36,47 +45,240 @@ class BaseResource:
         return self.min_value <= self.value <= self.max_value
 
 
-class Command:
+class ResourceBounds:
     """
-    Contains a ratio for exchanging input resources into output resources
+    Contains everything about a task's resources that stays the same from turn to turn, so that the resources
+    themselves can be stored as a plain state vector (a tuple of integers in the order of RESOURCE_NAMES).
+    This is the per-index min and max values, as well as the parameters of the special resources, all taken from the
+    starting resources. A single instance is shared by every Turn and Route of a task.
     """
 
-    def __init__(self, name: str,
-                 input_resources: dict[str, type(BaseResource)], output_resources: dict[str, type(BaseResource)]):
+    def __init__(self, starting_resources: dict[str, type(BaseResource)]):
+        default_resource: BaseResource = BaseResource("")
+        min_values: list[int] = [default_resource.min_value] * len(RESOURCE_NAMES)
+        max_values: list[int] = [default_resource.max_value] * len(RESOURCE_NAMES)
+        for resource_name, resource in starting_resources.items():
+            min_values[RESOURCE_INDEX[resource_name]] = resource.min_value
+            max_values[RESOURCE_INDEX[resource_name]] = resource.max_value
+        self.min_values: tuple[int, ...] = tuple(min_values)
+        self.max_values: tuple[int, ...] = tuple(max_values)
+
+        # The resource objects are only kept as templates for materialising a state vector back into resources
+        self.templates: dict[str, type(BaseResource)] = {}
+        for resource_name, resource in starting_resources.items():
+            self.templates[resource_name]: type(BaseResource) = resource.copy()
+
+        self.heat_index: int = -1
+        self.overheat_limit: int = 0
+        self.min_heat_increase: int = 0
+        self.max_heat_increase: int = 0
+        self.crew_index: int = -1
+        self.crew_max: int = 0
+        self.drift_index: int = -1
+        self.drift_bounds: list[int] = []
+        self.thrust_index: int = -1
+        self.required_thrust: int = 0
+        for resource_name, resource in starting_resources.items():
+            if isinstance(resource, Heat):
+                self.heat_index = RESOURCE_INDEX[resource_name]
+                self.overheat_limit = resource.overheat_limit
+                self.min_heat_increase = resource.min_random_increase
+                self.max_heat_increase = resource.max_random_increase
+            elif isinstance(resource, Crew):
+                self.crew_index = RESOURCE_INDEX[resource_name]
+                self.crew_max = resource.max_value
+            elif isinstance(resource, Drift):
+                self.drift_index = RESOURCE_INDEX[resource_name]
+                self.drift_bounds = resource.drift_bounds.copy()
+            elif isinstance(resource, Thrust):
+                self.thrust_index = RESOURCE_INDEX[resource_name]
+                self.required_thrust = resource.required_thrust
 
-        self.name: str = name
+    def __repr__(self) -> str:
+        output = f"ResourceBounds({self.min_values}, {self.max_values})"
+        return output
 
-        self.input_resources: dict[str, type(BaseResource)] = {}
-        for input_resource_name, input_resource in input_resources.items():
-            self.input_resources[input_resource_name]: type(BaseResource) = input_resource.copy()
+    def without_heat(self) -> type(__name__):
+        """
+        Returns a copy of these bounds where Heat is neither bounded nor gains anything at the end of a turn, for
+        searches which keep track of Heat some other way.
+        """
+        bounds_copy: ResourceBounds = copy.copy(self)
+        if self.heat_index >= 0:
+            min_values: list[int] = list(self.min_values)
+            max_values: list[int] = list(self.max_values)
+            min_values[self.heat_index] = -sys.maxsize
+            max_values[self.heat_index] = sys.maxsize
+            bounds_copy.min_values = tuple(min_values)
+            bounds_copy.max_values = tuple(max_values)
+            bounds_copy.heat_index = -1
+        return bounds_copy
+
+    def key(self) -> tuple:
+        """
+        Everything these bounds decide about a task, as a hashable tuple. Bounds with the same key behave the same.
+        """
+        return (self.min_values, self.max_values,
+                self.heat_index, self.overheat_limit, self.min_heat_increase, self.max_heat_increase,
+                self.crew_index, self.crew_max, self.drift_index, tuple(self.drift_bounds),
+                self.thrust_index, self.required_thrust)
 
-        self.output_resources: dict[str, type(BaseResource)] = {}
-        for output_resource_name, output_resource in output_resources.items():
-            self.output_resources[output_resource_name]: type(BaseResource) = output_resource.copy()
+    def to_state(self, resources: dict[str, type(BaseResource)]) -> tuple[int, ...]:
+        """
+        Converts a dictionary of resources into a state vector. Resources missing from the dictionary are 0.
+        """
+        state: list[int] = [0] * len(RESOURCE_NAMES)
+        for resource_name, resource in resources.items():
+            state[RESOURCE_INDEX[resource_name]] = resource.value
+        return tuple(state)
+
+    def to_resources(self, state: tuple[int, ...]) -> dict[str, type(BaseResource)]:
+        """
+        Materialises a state vector into a dictionary of resource objects, like the starting resources.
+        """
+        resources: dict[str, type(BaseResource)] = {}
+        for resource_name, template in self.templates.items():
+            resources[resource_name]: type(BaseResource) = template.copy()
+            resources[resource_name].value = state[RESOURCE_INDEX[resource_name]]
+        return resources
+
+    def is_valid_state(self, state: tuple[int, ...]) -> bool:
+        """
+        Checks the numerical validity of every value in the state vector.
+        """
+        for value, min_value, max_value in zip(state, self.min_values, self.max_values):
+            if not min_value <= value <= max_value:
+                return False
+        return True
+
+    def is_valid_end_of_route(self, state: tuple[int, ...]) -> bool:
+        """
+        The state vector equivalent of calling is_valid_end_of_route on every resource: Heat must be below the
+        overheat limit, Drift within its bounds and Thrust at least the required amount.
+        """
+        if not self.is_valid_state(state):
+            return False
+        if self.heat_index >= 0 and not state[self.heat_index] < self.overheat_limit:
+            return False
+        if self.drift_index >= 0 and not self.drift_bounds[0] <= state[self.drift_index] <= self.drift_bounds[1]:
+            return False
+        if self.thrust_index >= 0 and not state[self.thrust_index] >= self.required_thrust:
+            return False
+        return True
+
+    def next_turn(self, state: tuple[int, ...]) -> tuple[tuple[int, ...], bool]:
+        """
+        The state vector equivalent of calling next_turn on every resource: Crew is regained, Heat gains a random
+        amount and must stay below the overheat limit, and every other value must still be valid.
+        Returns the new state and whether it is valid.
+        """
+        if self.crew_index < 0 and self.heat_index < 0:
+            return state, self.is_valid_state(state)
+
+        new_state: list[int] = list(state)
+        if self.crew_index >= 0:
+            new_state[self.crew_index] = self.crew_max
+        if self.heat_index >= 0:
+            new_state[self.heat_index] += random.randint(self.min_heat_increase, self.max_heat_increase)
+            if not new_state[self.heat_index] < self.overheat_limit:
+                return tuple(new_state), False
+        new_state: tuple[int, ...] = tuple(new_state)
+        return new_state, self.is_valid_state(new_state)
+
+
+def compile_objective(objective: dict[str, type(BaseResource)]) -> tuple[tuple[int, int], ...]:
+    """
+    Converts an objective into (resource index, minimum value) pairs, which can be checked against a state vector.
+    """
+    return tuple((RESOURCE_INDEX[resource_name], resource.value) for resource_name, resource in objective.items())
+
+
+def state_satisfies_objective(state: tuple[int, ...], objective: tuple[tuple[int, int], ...]) -> bool:
+    """
+    Checks a state vector against an objective converted by compile_objective.
+    """
+    for resource_index, required_value in objective:
+        if not state[resource_index] >= required_value:
+            return False
+    return True
+
+
+class Command:
+    """
+    Contains a ratio for exchanging input resources into output resources.
+    The ratio is also kept as (resource index, amount) pairs, and as the net change it makes to a state vector, so that
+    it can be applied directly to a state vector.
+    Commands are immutable and interned: creating a Command with the same name and amounts as one that already exists
+    returns that one instead, so every Turn, TurnMacro and Route shares the same instance by reference, and copying one
+    returns itself. The resources given to a Command are copied once, when it's first created, and must not be changed.
+    Commands sent to another process are interned again when they arrive.
+    """
+    __slots__ = ("name", "input_resources", "output_resources", "input_amounts", "output_amounts", "delta",
+                 "__weakref__")
+
+    # Every Command still in use, by its name and amounts
+    interned: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+    def __new__(cls, name: str,
+                input_resources: dict[str, type(BaseResource)], output_resources: dict[str, type(BaseResource)]):
+        input_amounts: tuple[tuple[int, int], ...] = tuple(
+            (RESOURCE_INDEX[resource_name], resource.value) for resource_name, resource in input_resources.items())
+        output_amounts: tuple[tuple[int, int], ...] = tuple(
+            (RESOURCE_INDEX[resource_name], resource.value) for resource_name, resource in output_resources.items())
+        key: tuple = (cls, name, input_amounts, output_amounts)
+        command: Command = cls.interned.get(key)
+        if command is not None:
+            return command
+
+        delta: list[int] = [0] * len(RESOURCE_NAMES)
+        for amounts, sign in ((input_amounts, -1), (output_amounts, 1)):
+            for resource_index, amount in amounts:
+                delta[resource_index] += sign * amount
+
+        command = super(Command, cls).__new__(cls)
+        object.__setattr__(command, "name", name)
+        object.__setattr__(command, "input_resources", types.MappingProxyType(
+            {resource_name: resource.copy() for resource_name, resource in input_resources.items()}))
+        object.__setattr__(command, "output_resources", types.MappingProxyType(
+            {resource_name: resource.copy() for resource_name, resource in output_resources.items()}))
+        object.__setattr__(command, "input_amounts", input_amounts)
+        object.__setattr__(command, "output_amounts", output_amounts)
+        object.__setattr__(command, "delta", tuple(delta))
+        return cls.interned.setdefault(key, command)
+
+    def __setattr__(self, name: str, value: any) -> None:
+        raise AttributeError("Commands can't be changed")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("Commands can't be changed")
+
+    def __reduce__(self) -> tuple:
+        return self.__class__, (self.name, dict(self.input_resources), dict(self.output_resources))
+
+    def __copy__(self) -> type(__name__):
+        return self
+
+    def __deepcopy__(self, memo: dict) -> type(__name__):
+        return self
 
     def __repr__(self) -> str:
-        output = f"Command({self.name}, {self.input_resources}, {self.output_resources})"
+        output = f"Command({self.name}, {dict(self.input_resources)}, {dict(self.output_resources)})"
         return output
 
     def copy(self) -> type(__name__):
-        input_resources_copy: dict[str, type(BaseResource)] = {}
-        for input_resource_name, input_resource in self.input_resources.items():
-            input_resources_copy[input_resource_name]: type(BaseResource) = input_resource
-
-        output_resources_copy: dict[str, type(BaseResource)] = {}
-        for output_resource_name, output_resource in self.output_resources.items():
-            output_resources_copy[output_resource_name]: type(BaseResource) = output_resource
-        return Command(self.name, input_resources_copy, output_resources_copy)
+        return self
 
 
 class Turn:
     """
     Contains a set of commands up to a maximum specified amount.
-    Also contains a dictionary of the current resources, which is the result of executing all the commands in sequence,
-    starting with a set of starting recourses specified in the init. This current resources dictionary gets updated each
-    time a new command is appended to this object.
+    Also contains a state vector of the current resources, which is the result of executing all the commands in
+    sequence, starting with a set of starting recourses specified in the init. This state gets updated each time a new
+    command is appended to this object.
     Whenever the last possible command is appended (determined by the maximum specified in init),
-    the next_turn function gets called on every item in current_resources, which is populated by subclasses of Resource.
+    the end of turn effects of the task's ResourceBounds are applied to the state.
+    A turn found by a TurnTable which groups orderings also contains the other orderings of the same commands which
+    are possible, and lead to the same state.
     """
 
     def __init__(self, starting_resources: dict[str, type(BaseResource)],
@@ -88,11 +290,32 @@ class Turn:
             self.commands: list[Command] = []
         else:
             if len(commands) <= self.max_commands:
-                self.commands: list[Command] = [command.copy() for command in commands]
+                self.commands: list[Command] = list(commands)
 
-        self.current_resources: dict[str, type(BaseResource)] = {}
-        for starting_resource_name, starting_resource in starting_resources.items():
-            self.current_resources[starting_resource_name]: BaseResource = starting_resource.copy()
+        self.other_orderings: tuple[tuple[Command, ...], ...] = ()
+
+        self.bounds: ResourceBounds = ResourceBounds(starting_resources)
+        self.state: tuple[int, ...] = self.bounds.to_state(starting_resources)
+
+    @classmethod
+    def from_state(cls, state: tuple[int, ...], bounds: ResourceBounds, max_commands: int,
+                   commands: list[Command] = None,
+                   other_orderings: tuple[tuple[Command, ...], ...] = ()) -> type(__name__):
+        """
+        Creates a Turn directly from a state vector, without going through any resource objects.
+        The given list of commands is used as it is, without copying it.
+        """
+        turn: Turn = cls.__new__(cls)
+        turn.max_commands = max_commands
+        turn.commands = [] if commands is None else commands
+        turn.other_orderings = other_orderings
+        turn.bounds = bounds
+        turn.state = state
+        return turn
+
+    @property
+    def current_resources(self) -> dict[str, type(BaseResource)]:
+        return self.bounds.to_resources(self.state)
 
     def __repr__(self) -> str:
         output = f"Turn({self.current_resources}, {self.max_commands}, commands={self.commands})"
@@ -102,35 +325,36 @@ class Turn:
         return len(self.commands)
 
     def copy(self) -> type(__name__):
-        commands_copy: list[Command] = [command.copy() for command in self.commands]
-        resource_copy: dict[str, type(BaseResource)] = {}
-        for resource_name, resource in self.current_resources.items():
-            resource_copy[resource_name]: type(BaseResource) = resource.copy()
-
-        return Turn(resource_copy, self.max_commands, commands=commands_copy)
+        """
+        Commands are immutable, so the copy shares them, and only the list of them is copied.
+        """
+        return Turn.from_state(self.state, self.bounds, self.max_commands, commands=list(self.commands),
+                               other_orderings=self.other_orderings)
 
     def append(self, command: Command) -> bool:
         """
         As long as there is room for one more, this function appends a given command to the local list of commands and
-        applies the command's changes to the resource pool (current_resources).
+        applies the command's changes to the state vector.
         If, after appending this command, the length of local commands has reached the specified limit, the turn is
-        considered complete, and the next_turn function is run on every resource in self.current_resources.
+        considered complete, and the end of turn effects are applied to the state.
         """
         # Check if room for one more
         if len(self.commands) < self.max_commands:
 
             # Append command
-            self.commands.append(command.copy())
-
-            # Apply changes to resource pool (current_resources)
-            for resource_name, resource in self.commands[-1].input_resources.items():
-                self.current_resources[resource_name].value -= resource.value
-                if not self.current_resources[resource_name].is_valid_value():
-                    return False
-            for resource_name, resource in self.commands[-1].output_resources.items():
-                self.current_resources[resource_name].value += resource.value
-                if not self.current_resources[resource_name].is_valid_value():
-                    return False
+            self.commands.append(command)
+
+            # Apply changes to the state, checking every value that changes
+            min_values: tuple[int, ...] = self.bounds.min_values
+            max_values: tuple[int, ...] = self.bounds.max_values
+            state: list[int] = list(self.state)
+            for amounts, sign in ((command.input_amounts, -1), (command.output_amounts, 1)):
+                for resource_index, amount in amounts:
+                    state[resource_index] += sign * amount
+                    if not min_values[resource_index] <= state[resource_index] <= max_values[resource_index]:
+                        self.state = tuple(state)
+                        return False
+            self.state = tuple(state)
 
             # If turn is complete
             if len(self.commands) == self.max_commands:
@@ -145,136 +369,578 @@ class Turn:
 
     def apply_end_of_turn_effects(self) -> bool:
         """
-        Calls the next_turn on every resource in current_resources.
+        Applies the end of turn effects of every resource to the state.
         # TODO: Prevent this from being run after the last turn is complete (if this indeed matches the game)
         """
-        for resource_name, resource in self.current_resources.items():
-            if not resource.next_turn():
-                return False
-        return True
+        self.state, valid = self.bounds.next_turn(self.state)
+        return valid
 
     def is_valid(self) -> bool:
         """
-        Checks the validity of every resource value in current_resources.
+        Checks the validity of every value in the state.
         """
-        for resource in self.current_resources.values():
-            if not resource.is_valid_value():
-                return False
-        return True
+        return self.bounds.is_valid_state(self.state)
+
+
+class RouteNode:
+    """
+    One turn of a Route, along with a reference to the node of the turn before it.
+    Nodes are never changed after being created, so every route expanded from the same route shares the nodes of the
+    turns they have in common.
+    Since a turn's validity is settled once it's complete, each node also caches whether its turn and every turn before
+    it is valid, so that only the new turn has to be checked when a node is added.
+    """
+
+    def __init__(self, parent: type(__name__), turn: Turn):
+        self.parent: RouteNode = parent
+        self.turn: Turn = turn
+        if parent is None:
+            self.length: int = 1
+            self.valid: bool = turn.is_valid()
+        else:
+            self.length: int = parent.length + 1
+            self.valid: bool = parent.valid and turn.is_valid()
+
+    def __repr__(self) -> str:
+        output = f"RouteNode({self.turn}, length={self.length}, valid={self.valid})"
+        return output
 
 
 class Route:
     """
     Contains a set of turns up to a maximum specified amount.
-    Also contains a reference to the last turn's current_resources. Since every turn appended to a Route is supposed to
-    already be complete, the last turn's current_resources is assumed to be the resulting resources from all the turns
+    Also contains the last turn's state vector. Since every turn appended to a Route is supposed to
+    already be complete, the last turn's state is assumed to be the resulting resources from all the turns
     contained in this route.
     A route is considered valid if all turns within the Route is considered valid.
     It's considered finished if it contains an amount of turns equal to the max_turns specified in init, although this
     has to be checked from outside this class.
 
+    The turns are stored as a chain of RouteNodes, where only the last one is referenced by the Route. Copying,
+    appending to or extending a Route therefore takes the same time no matter how many turns it has, and the turns are
+    only gathered into a list when the turns property is accessed, for presenting the Route.
+    Since the turns are shared rather than copied, a Turn must not be changed after being appended to a Route.
+
     If a Route is found to be finished, elsewhere in the script, we may call this class' satisfies_objectives function
     to see if this Route indeed is to be considered a candidate for the player's choices.
 
-    Yet to be implemented, this class will also contain the get_possible_turns function, which will serve to provide
-    a list of turns possible based on the route's current_resources
-    (which is the current - or rather soon to be previous, turn's current_resources).
+    The get_possible_turns function provides a list of turns possible based on the route's state
+    (which is the current - or rather soon to be previous, turn's state), using the task's TurnTable.
     """
 
     def __init__(self, starting_resources: dict[str, type(BaseResource)], max_turns: int, turns=None):
 
         self.max_turns: int = max_turns
+        self.last_node: RouteNode = None
 
-        if turns is None:
-            self.turns = []
-        else:
-            if len(turns) < self.max_turns:
-                self.turns: list[Turn] = turns.copy()
+        self.bounds: ResourceBounds = ResourceBounds(starting_resources)
+        self.state: tuple[int, ...] = self.bounds.to_state(starting_resources)
 
-        self.current_resources: dict[str, type(BaseResource)] = {}
-        for starting_resource_name, starting_resource in starting_resources.items():
-            self.current_resources[starting_resource_name]: type(BaseResource) = starting_resource.copy()
+        if turns is not None:
+            if len(turns) < self.max_turns:
+                for turn in turns:
+                    self.append(turn)
+
+    @property
+    def turns(self) -> list[Turn]:
+        turns: list[Turn] = []
+        node: RouteNode = self.last_node
+        while node is not None:
+            turns.append(node.turn)
+            node = node.parent
+        turns.reverse()
+        return turns
+
+    @property
+    def current_resources(self) -> dict[str, type(BaseResource)]:
+        return self.bounds.to_resources(self.state)
 
     def __repr__(self) -> str:
         output = f"Route({self.current_resources}, {self.max_turns}, turns={self.turns})"
         return output
 
     def __len__(self) -> int:
-        return len(self.turns)
+        return 0 if self.last_node is None else self.last_node.length
 
     def copy(self) -> type(__name__):
-        turns_copy: list[Turn] = [turn.copy() for turn in self.turns]
-        resource_copy: dict[str, type(BaseResource)] = {}
-        for resource_name, resource in self.current_resources.items():
-            resource_copy[resource_name]: type(BaseResource) = resource.copy()
-        return Route(resource_copy, self.max_turns, turns=turns_copy)
+        route_copy: Route = Route.__new__(Route)
+        route_copy.max_turns = self.max_turns
+        route_copy.last_node = self.last_node
+        route_copy.bounds = self.bounds
+        route_copy.state = self.state
+        return route_copy
 
     def append(self, turn) -> bool:
         """
         Appends the specified turn to the Route, as long as there's room.
-        Updates the Route's current_resources to the specified turn's current_resources.
+        Updates the Route's state to the specified turn's state.
         """
-        if len(self.turns) < self.max_turns:
-            self.turns.append(turn.copy())
-            self.current_resources: dict[str, type(BaseResource)] = self.turns[-1].current_resources
+        if len(self) < self.max_turns:
+            self.last_node = RouteNode(self.last_node, turn)
+            self.state: tuple[int, ...] = turn.state
             return self.is_valid()
         else:
             raise AttributeError(
                 "Error when attempting to add turn to Route object beyond its specified max turn amount!")
 
+    def extend(self, turn: Turn) -> type(__name__):
+        """
+        Returns a new Route consisting of this Route's turns followed by the specified turn, leaving this Route as it is.
+        """
+        extended_route: Route = self.copy()
+        extended_route.append(turn)
+        return extended_route
+
     def is_valid(self) -> bool:
+        """
+        Uses the validity cached in the last turn's RouteNode, instead of checking every turn again.
+        """
+        return self.last_node is None or self.last_node.valid
+
+    def get_heat_gains(self, starting_state: tuple[int, ...]) -> list[int]:
+        """
+        Works out the random amount Heat gained at the end of each turn of the Route, from the states of its turns and
+        the state it started from.
+        """
+        heat_index: int = self.bounds.heat_index
+        if heat_index < 0:
+            return [0] * len(self)
+        heat_gains: list[int] = []
+        heat: int = starting_state[heat_index]
         for turn in self.turns:
-            if not turn.is_valid():
-                return False
-        return True
+            for command in turn.commands:
+                heat += command.delta[heat_index]
+            heat_gains.append(turn.state[heat_index] - heat)
+            heat = turn.state[heat_index]
+        return heat_gains
 
     def is_finished(self, objective: dict[str, type(BaseResource)]) -> bool:
-        return len(self.turns) == self.max_turns and self.satisfies_objective(objective)
+        return len(self) == self.max_turns and self.satisfies_objective(objective)
 
-    def satisfies_objective(self, objective: dict[str, type(BaseResource)]) -> bool:
+    def satisfies_objective(self, objective) -> bool:
         """
+        Accepts either an objective dictionary or one already converted by compile_objective.
         TODO: Implement bonus objectives (might be done somewhere else, in the main script for example)
         """
-        for objective_resource_name, objective_resource in objective.items():
-            if not self.current_resources[objective_resource_name].value >= objective_resource.value:
+        if isinstance(objective, dict):
+            objective = compile_objective(objective)
+        return state_satisfies_objective(self.state, objective)
+
+    def get_possible_turns(self, available_commands: dict[str, Command], commands_per_turn: int,
+                           turn_table: "TurnTable" = None) -> list[Turn]:
+        """
+        Returns every turn that is possible from the Route's state.
+        The permutations of the available commands are compiled into a TurnTable, unless one compiled for this task is
+        given, in which case it is reused.
+        """
+        if turn_table is None:
+            turn_table = TurnTable(available_commands, commands_per_turn, self.bounds)
+        return turn_table.get_possible_turns(self.state)
+
+
+class StateNode:
+    """
+    A distinct state reached after a certain amount of turns, in a StateGraph.
+    Instead of belonging to a single route, it keeps a back-pointer to every previous node and turn leading to it.
+    """
+
+    def __init__(self, state: tuple[int, ...], turn_index: int):
+        self.state: tuple[int, ...] = state
+        self.turn_index: int = turn_index
+        self.predecessors: list[tuple[StateNode, Turn]] = []
+
+    def __repr__(self) -> str:
+        output = f"StateNode({self.state}, {self.turn_index}, predecessors={len(self.predecessors)})"
+        return output
+
+
+class StateGraph:
+    """
+    A transposition table of every distinct state reached after each turn, keyed by turn index and state.
+    Routes which reach the same state after the same amount of turns share a single StateNode, which turns the tree of
+    routes into a directed acyclic graph where each distinct state only has to be expanded once.
+    The full routes are enumerated on demand, by walking the back-pointers from a node to the empty route.
+    """
+
+    def __init__(self, empty_route: Route):
+        self.empty_route: Route = empty_route
+        self.root: StateNode = StateNode(empty_route.state, 0)
+        self.levels: list[dict[tuple[int, ...], StateNode]] = [{self.root.state: self.root}]
+
+    def __repr__(self) -> str:
+        output = f"StateGraph({[len(level) for level in self.levels]})"
+        return output
+
+    def __len__(self) -> int:
+        return len(self.levels) - 1
+
+    def add_level(self) -> None:
+        self.levels.append({})
+
+    def add_turn(self, previous_node: StateNode, turn: Turn) -> bool:
+        """
+        Adds the node reached by the given turn to the level after the previous node's, or merges it into the node
+        already there with the same state. Returns whether a new node was created.
+        """
+        level: dict[tuple[int, ...], StateNode] = self.levels[previous_node.turn_index + 1]
+        node: StateNode = level.get(turn.state)
+        created: bool = node is None
+        if created:
+            node = StateNode(turn.state, previous_node.turn_index + 1)
+            level[turn.state] = node
+        node.predecessors.append((previous_node, turn))
+        return created
+
+    def count_routes(self, nodes: Iterable[StateNode]) -> int:
+        """
+        Counts the routes leading to the given nodes, without enumerating them.
+        """
+        route_counts: dict[int, int] = {id(self.root): 1}
+        for level in self.levels[1:]:
+            for node in level.values():
+                route_counts[id(node)] = sum(route_counts[id(previous_node)]
+                                             for previous_node, turn in node.predecessors)
+        return sum(route_counts[id(node)] for node in nodes)
+
+    def iterate_routes(self, node: StateNode) -> Iterator[Route]:
+        """
+        Yields every route leading to the given node, walking the back-pointers. Routes sharing a prefix share its
+        turns as well.
+        """
+        if node is self.root:
+            yield self.empty_route
+            return
+        for previous_node, turn in node.predecessors:
+            for previous_route in self.iterate_routes(previous_node):
+                yield previous_route.extend(turn)
+
+
+class TurnMacro:
+    """
+    A permutation of commands compiled against a task's ResourceBounds.
+    Since the effect of a permutation never changes, it's reduced to the range of starting values every resource it
+    touches must be within for every step of the turn to stay within bounds (the requirements), as well as the net
+    change it makes to the state (the delta).
+    """
+
+    def __init__(self, commands: tuple[Command, ...], bounds: ResourceBounds):
+        self.commands: tuple[Command, ...] = commands
+
+        offsets: list[int] = [0] * len(RESOURCE_NAMES)
+        lowest_values: dict[int, int] = {}
+        highest_values: dict[int, int] = {}
+        for command in commands:
+            for amounts, sign in ((command.input_amounts, -1), (command.output_amounts, 1)):
+                for resource_index, amount in amounts:
+                    offsets[resource_index] += sign * amount
+                    lowest_value: int = bounds.min_values[resource_index] - offsets[resource_index]
+                    highest_value: int = bounds.max_values[resource_index] - offsets[resource_index]
+                    lowest_values[resource_index] = max(lowest_values.get(resource_index, lowest_value), lowest_value)
+                    highest_values[resource_index] = min(highest_values.get(resource_index, highest_value),
+                                                         highest_value)
+
+        self.requirements: tuple[tuple[int, int, int], ...] = tuple(
+            (resource_index, lowest_values[resource_index], highest_values[resource_index])
+            for resource_index in lowest_values)
+        self.delta: tuple[int, ...] = tuple(offsets)
+
+    def __repr__(self) -> str:
+        output = f"TurnMacro({[command.name for command in self.commands]}, {self.requirements}, {self.delta})"
+        return output
+
+    def is_possible(self) -> bool:
+        """
+        Checks if there is any starting state at all that satisfies the requirements.
+        """
+        for resource_index, lowest_value, highest_value in self.requirements:
+            if lowest_value > highest_value:
                 return False
         return True
 
-    def get_possible_turns(self, available_commands: dict[str, Command], commands_per_turn: int) -> list[Turn]:
+    def accepts(self, state: tuple[int, ...]) -> bool:
         """
-        Starts off by generating a list of permutations based on available commands.
-        Then tests all permutations for validity (through the Turn class' built-in validity checks when appending).
-        Adds all valid permutations to the list of possible turns.
+        Checks if every command in the permutation can be executed in sequence, starting with the given state.
         """
-        possible_turns: list[Turn] = []
+        for resource_index, lowest_value, highest_value in self.requirements:
+            if not lowest_value <= state[resource_index] <= highest_value:
+                return False
+        return True
 
-        # Get all the permutations of the commands in this task
-        command_permutations: list[tuple[Command]] =\
-            list(itertools.product(list(available_commands.values()).copy(), repeat=commands_per_turn))
+    def apply(self, state: tuple[int, ...]) -> tuple[int, ...]:
+        """
+        Returns the state after every command in the permutation has been executed, before the end of turn effects.
+        """
+        return tuple([value + change for value, change in zip(state, self.delta)])
+
+
+class TurnGroup:
+    """
+    Every ordering of the same multiset of commands, compiled into TurnMacros.
+    All the orderings make the same net change to the state, so it only has to be applied once per group. They only
+    differ in which intermediate steps stay within bounds, so the group also keeps the widest requirements of any of its
+    orderings, which a state has to meet for any ordering to be possible at all.
+    """
+
+    def __init__(self, commands: tuple[Command, ...], bounds: ResourceBounds):
+        self.commands: tuple[Command, ...] = commands
+
+        self.macros: list[TurnMacro] = []
+        for ordering in dict.fromkeys(itertools.permutations(commands)):
+            macro: TurnMacro = TurnMacro(ordering, bounds)
+            if macro.is_possible():
+                self.macros.append(macro)
+
+        lowest_values: dict[int, int] = {}
+        highest_values: dict[int, int] = {}
+        for macro in self.macros:
+            for resource_index, lowest_value, highest_value in macro.requirements:
+                lowest_values[resource_index] = min(lowest_values.get(resource_index, lowest_value), lowest_value)
+                highest_values[resource_index] = max(highest_values.get(resource_index, highest_value), highest_value)
+        self.requirements: tuple[tuple[int, int, int], ...] = tuple(
+            (resource_index, lowest_values[resource_index], highest_values[resource_index])
+            for resource_index in lowest_values)
+        self.delta: tuple[int, ...] = self.macros[0].delta if self.macros else (0,) * len(RESOURCE_NAMES)
+
+    def __repr__(self) -> str:
+        output = f"TurnGroup({[command.name for command in self.commands]}, orderings={len(self.macros)})"
+        return output
+
+    def might_accept(self, state: tuple[int, ...]) -> bool:
+        """
+        Checks the widest requirements, which have to be met for any of the orderings to be possible.
+        """
+        for resource_index, lowest_value, highest_value in self.requirements:
+            if not lowest_value <= state[resource_index] <= highest_value:
+                return False
+        return True
 
-        # Loop through each permutation
-        for command_permutation in command_permutations:
+    def apply(self, state: tuple[int, ...]) -> tuple[int, ...]:
+        return tuple([value + change for value, change in zip(state, self.delta)])
 
-            # Create a hypothetical turn object based on the Route's current_resources
-            hypothetical_resource_pool: dict[str, type(BaseResource)] = self.current_resources.copy()
-            hypothetical_turn: Turn = Turn(hypothetical_resource_pool, commands_per_turn)
 
-            # Loop through each command in the current permutation
-            for command in command_permutation:
-                QApplication.processEvents()
+TURN_CACHE_ENTRIES = 100000  # The default most states a PossibleTurnsCache keeps the possible turns of
 
-                # If appending the command to the hypothetical turn, this permutation is invalid, so we discard it.
-                if not hypothetical_turn.append(command):
-                    break
 
-                # If it succeeds, we can move on to try appending the next command in the permutation,
-                # except if the hypothetical turn has reached its required amount of commands, in which case the entire
-                # permutation is valid, so we'll add it to the possible_turns list.
-                else:
-                    if len(hypothetical_turn) == commands_per_turn:
-                        possible_turns.append(hypothetical_turn.copy())
+class PossibleTurnsCache:
+    """
+    A least recently used cache of which turn macros are possible from a state, and the state they lead to
+    before the end of turn effects. It belongs to a single TurnTable, since it's only keyed by the state.
+    The end of turn effects aren't cached, so that Heat still gains a new random amount every time.
+    Once either the maximum amount of entries or the (estimated) maximum amount of bytes is exceeded, the least
+    recently used entries are evicted.
+    """
+
+    def __init__(self, max_entries: int = TURN_CACHE_ENTRIES, max_bytes: int = None):
+        self.max_entries: int = max_entries
+        self.max_bytes: int = max_bytes
+        self.entries: OrderedDict[tuple[int, ...], tuple[tuple[tuple[TurnMacro, ...], tuple[int, ...]], ...]] = \
+            OrderedDict()
+        self.entry_sizes: dict[tuple[int, ...], int] = {}
+        self.size_in_bytes: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
 
-        return possible_turns
+    def __repr__(self) -> str:
+        output = f"PossibleTurnsCache({self.max_entries}, {self.max_bytes}, entries={len(self.entries)}, " \
+                 f"hits={self.hits}, misses={self.misses}, evictions={self.evictions})"
+        return output
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, state: tuple[int, ...]) -> Optional[tuple[tuple[tuple[TurnMacro, ...], tuple[int, ...]], ...]]:
+        """
+        Returns the cached macros and states for the given state, or None if it isn't cached.
+        """
+        applicable_macros = self.entries.get(state)
+        if applicable_macros is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(state)
+        return applicable_macros
+
+    def put(self, state: tuple[int, ...],
+            applicable_macros: tuple[tuple[tuple[TurnMacro, ...], tuple[int, ...]], ...]) -> None:
+        """
+        Caches the macros and states for the given state, and evicts entries until the limits are respected again.
+        """
+        if state in self.entries:
+            return
+        entry_size: int = sys.getsizeof(state) + sys.getsizeof(applicable_macros) + \
+            sum(sys.getsizeof(applicable_macro) + sys.getsizeof(applicable_macro[1])
+                for applicable_macro in applicable_macros)
+        self.entries[state] = applicable_macros
+        self.entry_sizes[state] = entry_size
+        self.size_in_bytes += entry_size
+
+        while self.entries and (len(self.entries) > self.max_entries or
+                                (self.max_bytes is not None and self.size_in_bytes > self.max_bytes)):
+            evicted_state, evicted_macros = self.entries.popitem(last=False)
+            self.size_in_bytes -= self.entry_sizes.pop(evicted_state)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.entry_sizes.clear()
+        self.size_in_bytes = 0
+
+
+class TurnTable:
+    """
+    Contains every multiset of a task's commands as a TurnGroup of its orderings, compiled into TurnMacros once per
+    task. Orderings that can't be executed from any state are left out.
+    If group_orderings is enabled, every possible ordering of the same commands is presented as a single Turn (with the
+    others as its other_orderings) instead of one Turn per ordering.
+    If a PossibleTurnsCache is given, the macros possible from each state are cached in it.
+    """
+
+    def __init__(self, available_commands: dict[str, Command], commands_per_turn: int, bounds: ResourceBounds,
+                 cache: PossibleTurnsCache = None, group_orderings: bool = False):
+        self.available_commands: dict[str, Command] = available_commands
+        self.commands_per_turn: int = commands_per_turn
+        self.bounds: ResourceBounds = bounds
+        self.cache: PossibleTurnsCache = cache
+        self.group_orderings: bool = group_orderings
+
+        self.groups: list[TurnGroup] = []
+        for command_multiset in itertools.combinations_with_replacement(list(available_commands.values()),
+                                                                         commands_per_turn):
+            group: TurnGroup = TurnGroup(command_multiset, bounds)
+            if group.macros:
+                self.groups.append(group)
+        self.macros: list[TurnMacro] = [macro for group in self.groups for macro in group.macros]
+
+    def __repr__(self) -> str:
+        output = f"TurnTable({self.commands_per_turn}, groups={self.groups})"
+        return output
+
+    def __len__(self) -> int:
+        return len(self.macros)
+
+    def only_with_commands(self, commands: Iterable[Command]) -> type(__name__):
+        """
+        Returns a copy of this table with only the groups which use at least one of the given commands, and no cache,
+        for finding the turns that having those commands adds.
+        """
+        commands: set[Command] = set(commands)
+        table_copy: TurnTable = copy.copy(self)
+        table_copy.cache = None
+        table_copy.groups = [group for group in self.groups if not commands.isdisjoint(group.commands)]
+        table_copy.macros = [macro for group in table_copy.groups for macro in group.macros]
+        return table_copy
+
+    def get_possible_turns(self, state: tuple[int, ...]) -> list[Turn]:
+        """
+        Checks every macro against the given state, and returns a completed Turn for each one that is possible,
+        including the end of turn effects.
+        """
+        return list(self.iterate_possible_turns(state))
+
+    def iterate_possible_turns(self, state: tuple[int, ...]) -> Iterator[Turn]:
+        """
+        Same as get_possible_turns, but yields each possible Turn as soon as it's found.
+        """
+        for macros, applied_state in self.get_applicable_macros(state):
+            next_state, valid = self.bounds.next_turn(applied_state)
+            if valid:
+                yield Turn.from_state(next_state, self.bounds, self.commands_per_turn, list(macros[0].commands),
+                                      tuple(macro.commands for macro in macros[1:]))
+
+    def get_applicable_macros(self, state: tuple[int, ...]) -> Iterable[tuple[tuple[TurnMacro, ...],
+                                                                              tuple[int, ...]]]:
+        """
+        Same as iterate_applicable_macros, but taken from the cache if there is one, and cached otherwise.
+        """
+        if self.cache is None:
+            return self.iterate_applicable_macros(state)
+        applicable_macros: tuple[tuple[tuple[TurnMacro, ...], tuple[int, ...]], ...] = self.cache.get(state)
+        if applicable_macros is None:
+            applicable_macros = tuple(self.iterate_applicable_macros(state))
+            self.cache.put(state, applicable_macros)
+        return applicable_macros
+
+    def iterate_applicable_macros(self, state: tuple[int, ...]) -> Iterator[tuple[tuple[TurnMacro, ...],
+                                                                                  tuple[int, ...]]]:
+        """
+        Yields the macros which can be executed from the given state, along with the state they lead to before the end
+        of turn effects. Each possible macro is yielded on its own, unless orderings are grouped, in which case all the
+        possible macros of a TurnGroup are yielded together.
+        """
+        for group in self.groups:
+            if not group.might_accept(state):
+                continue
+            applied_state: tuple[int, ...] = group.apply(state)
+            if self.group_orderings:
+                accepted_macros: tuple[TurnMacro, ...] = tuple(macro for macro in group.macros
+                                                               if macro.accepts(state))
+                if accepted_macros:
+                    yield accepted_macros, applied_state
+            else:
+                for macro in group.macros:
+                    if macro.accepts(state):
+                        yield (macro,), applied_state
+
+
+class RoutePruner:
+    """
+    Decides whether a route can still be finished successfully, so that routes which can't are cut as soon as possible
+    instead of being expanded until the last turn.
+    Each turn can change a resource by no more than the largest net change of any of the task's turn macros, and by no
+    less than the smallest one. From that, an upper bound on what the remaining turns can produce is checked against the
+    objective and the required thrust, and the interval of reachable drift is checked against the drift bounds.
+    Heat and Crew are reset or randomly changed at the end of each turn, so they are only checked once no turns remain.
+    On the last turn the checks are exact, and the end of route criteria of every resource are enforced.
+    """
+
+    def __init__(self, turn_table: TurnTable, objective: dict[str, type(BaseResource)], amount_of_turns: int):
+        self.bounds: ResourceBounds = turn_table.bounds
+        self.amount_of_turns: int = amount_of_turns
+
+        self.max_gains: list[int] = [0] * len(RESOURCE_NAMES)
+        self.min_gains: list[int] = [0] * len(RESOURCE_NAMES)
+        if turn_table.macros:
+            self.max_gains = [max(changes) for changes in zip(*[macro.delta for macro in turn_table.macros])]
+            self.min_gains = [min(changes) for changes in zip(*[macro.delta for macro in turn_table.macros])]
+        for resource_index in (self.bounds.heat_index, self.bounds.crew_index):
+            if resource_index >= 0:
+                self.max_gains[resource_index] = self.bounds.max_values[resource_index] - \
+                                                 self.bounds.min_values[resource_index]
+
+        self.minimums: list[tuple[int, int]] = list(compile_objective(objective))
+        if self.bounds.thrust_index >= 0:
+            self.minimums.append((self.bounds.thrust_index, self.bounds.required_thrust))
+
+    def __repr__(self) -> str:
+        output = f"RoutePruner({self.minimums}, {self.amount_of_turns})"
+        return output
+
+    def can_succeed(self, state: tuple[int, ...], turns_completed: int) -> bool:
+        """
+        Checks whether a route with the given state after the given amount of turns can still be finished with the
+        objective satisfied and every end of route criteria met.
+        """
+        remaining_turns: int = self.amount_of_turns - turns_completed
+        if remaining_turns <= 0:
+            return state_satisfies_objective(state, self.minimums) and self.bounds.is_valid_end_of_route(state)
+
+        for resource_index, required_value in self.minimums:
+            highest_value: int = min(state[resource_index] + remaining_turns * self.max_gains[resource_index],
+                                     self.bounds.max_values[resource_index])
+            if highest_value < required_value:
+                return False
+
+        drift_index: int = self.bounds.drift_index
+        if drift_index >= 0:
+            lowest_drift: int = max(state[drift_index] + remaining_turns * self.min_gains[drift_index],
+                                    self.bounds.min_values[drift_index])
+            highest_drift: int = min(state[drift_index] + remaining_turns * self.max_gains[drift_index],
+                                     self.bounds.max_values[drift_index])
+            if highest_drift < self.bounds.drift_bounds[0] or lowest_drift > self.bounds.drift_bounds[1]:
+                return False
+
+        return True
 
 
 class Heat(BaseResource):
@@ -493,6 +1159,30 @@ class Power(BaseResource):
         return output
 
 
+def get_resource_from_name(name: str, value: int) -> type(BaseResource):
+    """
+    Creates the resource with the given name and value. Heat, Drift and Thrust get the default parameters of the
+    game's usual tasks.
+    """
+    if name == REGULAR_RESOURCE_NAMES["comms"]:
+        return Comms(value=value)
+    elif name == REGULAR_RESOURCE_NAMES["navs"]:
+        return Navs(value=value)
+    elif name == REGULAR_RESOURCE_NAMES["data"]:
+        return Data(value=value)
+    elif name == REGULAR_RESOURCE_NAMES["power"]:
+        return Power(value=value)
+
+    elif name == SPECIAL_RESOURCE_NAMES["heat"]:
+        return Heat(4, 0, 3, value=value)
+    elif name == SPECIAL_RESOURCE_NAMES["drift"]:
+        return Drift([-2, 2], -4, 4, value=value)
+    elif name == SPECIAL_RESOURCE_NAMES["thrust"]:
+        return Thrust(4, value=value)
+    elif name == SPECIAL_RESOURCE_NAMES["crew"]:
+        return Crew(value=value)
+
+
 def indent_string(string: str) -> str:
     """
     Indents every line within a string, including the first one.
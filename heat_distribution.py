@@ -0,0 +1,215 @@
+from typing import Iterator
+
+from solver import Task
+from task_calculator import SearchControl, SearchStats, iterate_with_stats
+from data_structure import Command, Route, Turn, TurnTable, TurnMacro, RoutePruner, PossibleTurnsCache, \
+    ResourceBounds, BaseResource, Heat, compile_objective, state_satisfies_objective
+
+# Failure probabilities closer than this to the threshold count as equal to it, so that rounding doesn't decide
+FAILURE_TOLERANCE = 1e-12
+
+
+class HeatSteps:
+    """
+    Everything about the task's Heat needed to simulate it along routes: its starting value, random gain and overheat
+    limit, the smallest final value the objective allows, and each turn's range of starting Heat and net change of
+    Heat, taken from the TurnMacro of the turn's commands.
+    """
+
+    def __init__(self, task: Task):
+        self.bounds: ResourceBounds = ResourceBounds(task.starting_resources)
+        self.heat_index: int = self.bounds.heat_index
+        self.starting_heat: int = 0
+        self.minimum_final_heat: int = 0
+        if self.heat_index >= 0:
+            self.starting_heat = self.bounds.to_state(task.starting_resources)[self.heat_index]
+            self.minimum_final_heat = self.bounds.min_values[self.heat_index]
+            for resource_index, minimum_value in compile_objective(task.objective):
+                if resource_index == self.heat_index:
+                    self.minimum_final_heat = max(self.minimum_final_heat, minimum_value)
+
+        self.turn_steps: dict[tuple[Command, ...], tuple[int, int, int]] = {}
+
+    def get_turn_step(self, commands: tuple[Command, ...]) -> tuple[int, int, int]:
+        """
+        Returns the lowest and highest Heat the turn can start with, and the net change of Heat it makes.
+        """
+        turn_step: tuple[int, int, int] = self.turn_steps.get(commands)
+        if turn_step is None:
+            macro: TurnMacro = TurnMacro(commands, self.bounds)
+            lowest_value: int = self.bounds.min_values[self.heat_index]
+            highest_value: int = self.bounds.max_values[self.heat_index]
+            for resource_index, lowest_requirement, highest_requirement in macro.requirements:
+                if resource_index == self.heat_index:
+                    lowest_value, highest_value = lowest_requirement, highest_requirement
+            turn_step = (lowest_value, highest_value, macro.delta[self.heat_index])
+            self.turn_steps[commands] = turn_step
+        return turn_step
+
+
+class HeatRisk:
+    """
+    A route along with the exact distribution of the Heat it ends with, over the outcomes where it never failed because
+    of the random Heat gains. The distribution's total is therefore the route's probability of success.
+    """
+
+    def __init__(self, route: Route, distribution: dict[int, float]):
+        self.route: Route = route
+        self.distribution: dict[int, float] = distribution
+        self.success_probability: float = sum(distribution.values())
+        self.failure_probability: float = max(0.0, 1.0 - self.success_probability)
+
+    def __repr__(self) -> str:
+        output = f"HeatRisk({self.success_probability:.6f}, {self.distribution})"
+        return output
+
+
+def propagate_heat(distribution: dict[int, float], lowest_value: int, highest_value: int, change: int,
+                   min_increase: int, max_increase: int, overheat_limit: int) -> dict[int, float]:
+    """
+    Returns the distribution of Heat after a turn, given the distribution before it. The outcomes where the turn can't
+    start because Heat is outside its lowest and highest value are dropped, the rest are changed by the turn, and then
+    spread evenly over the random gains at the end of the turn, dropping the outcomes which overheat.
+    """
+    share: float = 1 / (max_increase - min_increase + 1)
+    next_distribution: dict[int, float] = {}
+    for heat, probability in distribution.items():
+        if not lowest_value <= heat <= highest_value:
+            continue
+        for increase in range(min_increase, max_increase + 1):
+            next_heat: int = heat + change + increase
+            if next_heat < overheat_limit:
+                next_distribution[next_heat] = next_distribution.get(next_heat, 0.0) + probability * share
+    return next_distribution
+
+
+class HeatRiskSearch:
+    """
+    Searches the routes of a task depth first like iterate_depth_first_routes, but instead of drawing a random Heat
+    gain for every turn, every route carries the exact distribution of its Heat, which is updated by propagate_heat
+    once per turn. Each command sequence is therefore found once, with its exact probability of success, instead of
+    once per lucky draw.
+    The commands possible from a state are found with a TurnTable that ignores Heat, and Heat is then checked against
+    the distribution alone. The Heat value of each route's state is the lowest Heat it can have, so that the pruner and
+    the end of route criteria see the most optimistic outcome.
+    Routes whose probability of failing goes above max_failure are cut as soon as it does, since it can only grow.
+    """
+
+    def __init__(self, task: Task, max_failure: float = 1.0, prune: bool = True, turn_cache: PossibleTurnsCache = None):
+        self.task: Task = task
+        self.max_failure: float = max_failure
+        self.heat_steps: HeatSteps = HeatSteps(task)
+
+        self.empty_route: Route = Route(task.starting_resources, task.amount_of_turns)
+        self.bounds: ResourceBounds = self.empty_route.bounds
+        self.turn_table: TurnTable = TurnTable(task.available_commands, task.commands_per_turn,
+                                               self.bounds.without_heat(), turn_cache)
+
+        # Heat in the objective is checked against the distribution instead of the state
+        objective: dict[str, type(BaseResource)] = {resource_name: resource
+                                                    for resource_name, resource in task.objective.items()
+                                                    if not isinstance(resource, Heat)}
+        self.objective: tuple[tuple[int, int], ...] = compile_objective(objective)
+        self.pruner: RoutePruner = None
+        if prune:
+            self.pruner = RoutePruner(self.turn_table, objective, task.amount_of_turns)
+
+    def iterate_possible_turns(self, state: tuple[int, ...],
+                               distribution: dict[int, float]) -> Iterator[tuple[Turn, dict[int, float]]]:
+        """
+        Yields every turn possible from the state for at least some of the Heat outcomes, along with the distribution
+        of Heat after it, as long as its probability of failing doesn't go above max_failure.
+        """
+        bounds: ResourceBounds = self.bounds
+        for macros, applied_state in self.turn_table.get_applicable_macros(state):
+            macro: TurnMacro = macros[0]
+            next_state, valid = self.turn_table.bounds.next_turn(applied_state)
+            if not valid:
+                continue
+
+            next_distribution: dict[int, float] = distribution
+            if bounds.heat_index >= 0:
+                next_distribution = propagate_heat(distribution, *self.heat_steps.get_turn_step(macro.commands),
+                                                   bounds.min_heat_increase, bounds.max_heat_increase,
+                                                   bounds.overheat_limit)
+                if not next_distribution or \
+                        1.0 - sum(next_distribution.values()) > self.max_failure + FAILURE_TOLERANCE:
+                    continue
+                next_state: tuple[int, ...] = next_state[:bounds.heat_index] + (min(next_distribution),) + \
+                    next_state[bounds.heat_index + 1:]
+
+            yield Turn.from_state(next_state, bounds, self.turn_table.commands_per_turn, list(macro.commands)), \
+                next_distribution
+
+    def finish(self, route: Route, distribution: dict[int, float]) -> HeatRisk:
+        """
+        Returns the HeatRisk of a finished route, or None if it can't satisfy the objective for any Heat outcome.
+        """
+        if not state_satisfies_objective(route.state, self.objective):
+            return None
+        if self.bounds.heat_index >= 0:
+            distribution = {heat: probability for heat, probability in distribution.items()
+                            if heat >= self.heat_steps.minimum_final_heat}
+            if not distribution or 1.0 - sum(distribution.values()) > self.max_failure + FAILURE_TOLERANCE:
+                return None
+        return HeatRisk(route, distribution)
+
+    def iterate_routes(self, control: SearchControl = None) -> Iterator[HeatRisk]:
+        """
+        Walks the routes depth first, with a stack of routes and their Heat distributions, and yields the HeatRisk of
+        every finished route which satisfies the objective.
+        """
+        if control is None:
+            control = SearchControl()
+        stats: SearchStats = control.stats
+        amount_of_turns: int = self.task.amount_of_turns
+
+        starting_distribution: dict[int, float] = {self.heat_steps.starting_heat: 1.0}
+
+        current_routes: list[tuple[Route, dict[int, float]]] = [(self.empty_route, starting_distribution)]
+        remaining_turns: list[Iterator[tuple[Turn, dict[int, float]]]] = [
+            self.iterate_possible_turns(self.empty_route.state, starting_distribution)]
+        control.expand(0)
+        while remaining_turns:
+            if control.is_cancelled():
+                break
+
+            next_turn, next_distribution = next(remaining_turns[-1], (None, None))
+
+            # Every possible turn from here has been tried, so backtrack
+            if next_turn is None:
+                remaining_turns.pop()
+                current_routes.pop()
+                continue
+
+            turns_completed: int = len(current_routes[-1][0]) + 1
+            if self.pruner is not None and not self.pruner.can_succeed(next_turn.state, turns_completed):
+                if stats is not None:
+                    stats.reject(turns_completed - 1)
+                continue
+            if stats is not None:
+                stats.accept(turns_completed - 1)
+
+            next_route: Route = current_routes[-1][0].extend(next_turn)
+            if turns_completed >= amount_of_turns:
+                heat_risk: HeatRisk = self.finish(next_route, next_distribution)
+                if heat_risk is not None:
+                    yield heat_risk
+            else:
+                current_routes.append((next_route, next_distribution))
+                remaining_turns.append(self.iterate_possible_turns(next_turn.state, next_distribution))
+                control.expand(turns_completed)
+
+
+def iterate_heat_risks(task: Task, max_failure: float = 1.0, prune: bool = True, turn_cache: PossibleTurnsCache = None,
+                       control: SearchControl = None) -> Iterator[HeatRisk]:
+    """
+    Yields every route of the task which can satisfy the objective, with its exact probability of not failing because
+    of the random Heat gains, leaving out the routes more likely than max_failure to fail.
+    Only depth first search is supported, since routes reaching the same state can still differ in their distribution
+    of Heat, which rules out merging them like the state graph search mode does.
+    """
+    search: HeatRiskSearch = HeatRiskSearch(task, max_failure, prune, turn_cache)
+    if control is not None and control.stats is not None:
+        return iterate_with_stats(search.iterate_routes(control), control.stats, task.amount_of_turns, turn_cache)
+    return search.iterate_routes(control)
@@ -0,0 +1,195 @@
+import itertools
+import math
+import statistics
+import sys
+from typing import Iterator
+
+from solver import Task, solve
+from heat_distribution import HeatSteps
+from task_calculator import SearchControl, DEPTH_FIRST
+from data_structure import Route, ResourceBounds, TurnTable, BaseResource, Heat
+
+# NumPy is only needed for estimating success probabilities, so the rest of the calculator works without it
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SAMPLES = 10000
+CONFIDENCE = 0.95
+ROUTES_PER_BATCH = 256
+
+
+class HeatEstimate:
+    """
+    A route along with the estimated probability of it never overheating (or otherwise failing because of the random
+    Heat gains), and the confidence interval of that probability.
+    """
+
+    def __init__(self, route: Route, successes: int, samples: int, confidence: float = CONFIDENCE):
+        self.route: Route = route
+        self.successes: int = successes
+        self.samples: int = samples
+        self.probability: float = successes / samples
+        self.confidence_interval: tuple[float, float] = wilson_interval(successes, samples, confidence)
+
+    def __repr__(self) -> str:
+        output = f"HeatEstimate({self.probability:.4f}, {self.confidence_interval}, samples={self.samples})"
+        return output
+
+
+def require_numpy() -> None:
+    if numpy is None:
+        raise ImportError("Estimating success probabilities needs NumPy, which can be installed with pip install numpy")
+
+
+def wilson_interval(successes: int, samples: int, confidence: float = CONFIDENCE) -> tuple[float, float]:
+    """
+    The Wilson score interval of a success probability, which unlike the normal approximation stays within 0 and 1
+    and is still meaningful when every sample (or none) succeeded.
+    """
+    z: float = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    proportion: float = successes / samples
+    denominator: float = 1 + z * z / samples
+    centre: float = (proportion + z * z / (2 * samples)) / denominator
+    margin: float = z * math.sqrt(proportion * (1 - proportion) / samples + z * z / (4 * samples * samples)) / \
+        denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def candidate_task(task: Task) -> tuple[Task, TurnTable]:
+    """
+    Returns a copy of the task without Heat in its objective, and a TurnTable for it where Heat is unbounded and never
+    overheats, but still gains its minimum amount at the end of each turn. Searching with them finds every route which
+    succeeds for at least some of the Heat outcomes, with the lowest Heat it can end with, so that the simulation alone
+    decides each route's probability. Routes which never succeed are found too.
+    """
+    bounds: ResourceBounds = ResourceBounds(task.starting_resources)
+    candidate_bounds: ResourceBounds = bounds.without_heat()
+    if bounds.heat_index >= 0:
+        candidate_bounds.heat_index = bounds.heat_index
+        candidate_bounds.overheat_limit = sys.maxsize
+        candidate_bounds.max_heat_increase = bounds.min_heat_increase
+    objective: dict[str, type(BaseResource)] = {resource_name: resource
+                                                for resource_name, resource in task.objective.items()
+                                                if not isinstance(resource, Heat)}
+    return Task(task.available_commands, task.starting_resources, task.amount_of_turns, task.commands_per_turn,
+                objective, task.name), \
+        TurnTable(task.available_commands, task.commands_per_turn, candidate_bounds)
+
+
+def compile_heat_steps(heat_steps: HeatSteps, routes: list[Route]) -> tuple:
+    """
+    Returns the lowest starting Heat, highest starting Heat and Heat change of every turn of the routes, as
+    (routes, turns) arrays.
+    """
+    steps: list[list[tuple[int, int, int]]] = [[heat_steps.get_turn_step(tuple(turn.commands))
+                                                for turn in route.turns] for route in routes]
+    steps_array = numpy.array(steps, dtype=numpy.int32).reshape(len(routes), -1, 3)
+    return steps_array[:, :, 0], steps_array[:, :, 1], steps_array[:, :, 2]
+
+
+def simulate_heat(starting_heat: int, minimum_final_heat: int, overheat_limit: int, min_increase: int,
+                  max_increase: int, lowest_values, highest_values, changes, samples: int, seed_sequence):
+    """
+    Simulates the given amount of Heat trajectories for every route at once, as a (routes, samples) array, and returns
+    how many of each route's samples never broke a turn's Heat requirements or overheated.
+    Runs in the worker processes of estimate_success_probabilities, so it only takes arrays and numbers.
+    """
+    generator = numpy.random.default_rng(seed_sequence)
+    heat = numpy.full((lowest_values.shape[0], samples), starting_heat, dtype=numpy.int32)
+    alive = numpy.ones(heat.shape, dtype=bool)
+    for turn in range(lowest_values.shape[1]):
+        alive &= (heat >= lowest_values[:, turn, None]) & (heat <= highest_values[:, turn, None])
+        heat += changes[:, turn, None]
+        heat += generator.integers(min_increase, max_increase + 1, size=heat.shape, dtype=numpy.int32)
+        alive &= heat < overheat_limit
+    alive &= heat >= minimum_final_heat
+    return alive.sum(axis=1)
+
+
+def iterate_seed_sequences(seed: int = None) -> Iterator:
+    """
+    Yields an endless amount of independent NumPy seed sequences, which are always the same for the same seed.
+    """
+    root_seed_sequence = numpy.random.SeedSequence(seed)
+    for index in itertools.count():
+        yield numpy.random.SeedSequence(root_seed_sequence.entropy, spawn_key=(index,))
+
+
+def estimate_success_probabilities(routes: list[Route], heat_steps: HeatSteps, samples: int = SAMPLES,
+                                   seed_sequences: Iterator = None, confidence: float = CONFIDENCE,
+                                   executor=None) -> list[HeatEstimate]:
+    """
+    Estimates the success probability of every route, in batches of ROUTES_PER_BATCH routes, each simulated with the
+    next of the seed_sequences. The batches are simulated by the executor's processes if one is given.
+    """
+    require_numpy()
+    if heat_steps.heat_index < 0:
+        return [HeatEstimate(route, samples, samples, confidence) for route in routes]
+    if seed_sequences is None:
+        seed_sequences = iterate_seed_sequences()
+
+    bounds: ResourceBounds = heat_steps.bounds
+    batches: list[list[Route]] = [routes[start:start + ROUTES_PER_BATCH]
+                                  for start in range(0, len(routes), ROUTES_PER_BATCH)]
+    simulations: list[tuple] = []
+    for batch in batches:
+        simulations.append((heat_steps.starting_heat, heat_steps.minimum_final_heat, bounds.overheat_limit,
+                            bounds.min_heat_increase, bounds.max_heat_increase, *compile_heat_steps(heat_steps, batch),
+                            samples, next(seed_sequences)))
+
+    if executor is None:
+        successes: list = [simulate_heat(*simulation) for simulation in simulations]
+    else:
+        successes: list = list(executor.map(simulate_heat, *zip(*simulations)))
+
+    estimates: list[HeatEstimate] = []
+    for batch, batch_successes in zip(batches, successes):
+        for route, route_successes in zip(batch, batch_successes):
+            estimates.append(HeatEstimate(route, int(route_successes), samples, confidence))
+    return estimates
+
+
+def iterate_successful(estimates: list[HeatEstimate]) -> Iterator[HeatEstimate]:
+    for estimate in estimates:
+        if estimate.successes > 0:
+            yield estimate
+
+
+def iterate_heat_estimates(task: Task, samples: int = SAMPLES, seed: int = None, confidence: float = CONFIDENCE,
+                           processes: int = 1, search_mode: str = DEPTH_FIRST, prune: bool = True,
+                           control: SearchControl = None) -> Iterator[HeatEstimate]:
+    """
+    Finds the candidate routes of the task with candidate_task, and yields each of them with its estimated
+    success probability under the task's real random Heat gains. Candidates are estimated in groups of
+    ROUTES_PER_BATCH routes per process as they're found. Like a single search leaves out the routes which overheat,
+    candidates which didn't succeed in any sample are left out.
+    Every batch is simulated with its own seed sequence spawned from the seed, in the order the candidates are found,
+    so the same seed gives the same estimates no matter how many processes are used.
+    """
+    require_numpy()
+    heat_steps: HeatSteps = HeatSteps(task)
+    seed_sequences: Iterator = iterate_seed_sequences(seed)
+
+    executor = None
+    if processes > 1:
+        # Imported here like in task_calculator, since it's only needed for estimating with several processes
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=processes)
+
+    try:
+        candidates: list[Route] = []
+        search_task, turn_table = candidate_task(task)
+        for route in solve(search_task, search_mode, prune, control=control, turn_table=turn_table):
+            candidates.append(route)
+            if len(candidates) >= ROUTES_PER_BATCH * processes:
+                yield from iterate_successful(estimate_success_probabilities(candidates, heat_steps, samples,
+                                                                             seed_sequences, confidence, executor))
+                candidates = []
+        if candidates:
+            yield from iterate_successful(estimate_success_probabilities(candidates, heat_steps, samples,
+                                                                         seed_sequences, confidence, executor))
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,217 @@
+"""
+Solves a task again after one of its inputs was changed, by reusing as much of the previous solve as possible.
+
+The previous solve's StateGraph is kept, and what the change invalidates is worked out from the difference between the
+two tasks:
+ - A different objective only needs the final states to be filtered again.
+ - Fewer turns only needs the graph to be truncated, and more turns only needs its deepest level to be expanded.
+ - Added commands only need the turns which use them to be added as edges, to the states already in the graph, while
+   the states those turns reach for the first time are expanded with every command.
+ - Removed commands only need the edges using them to be removed, along with every state no longer reachable.
+Anything else (the starting resources, or the amount of commands per turn) needs the graph to be built again.
+
+Since pruning depends on the objective and the amount of turns, the graph is built without it, and the end of route
+criteria pruning enforces are only checked on the final states instead. That way, every edge stays reusable.
+"""
+
+from typing import Iterator
+
+from solver import Task
+from task_calculator import SearchControl, SearchStats, iterate_with_stats
+from data_structure import Command, Route, ResourceBounds, PossibleTurnsCache, TurnTable, StateGraph, StateNode, \
+    compile_objective, state_satisfies_objective, TURN_CACHE_ENTRIES
+
+# What the last solve had to do, from least to most work
+UNCHANGED = "unchanged"
+FILTERED = "filtered"
+TRUNCATED = "truncated"
+EXTENDED = "extended"
+COMMANDS_CHANGED = "commands changed"
+REBUILT = "rebuilt"
+
+
+class IncrementalSolver:
+    """
+    Keeps the StateGraph, TurnTable and PossibleTurnsCache of the last task it solved, and updates them to solve the
+    next task instead of starting over. The graph keeps every level it has expanded, so going back to more turns after
+    solving with fewer doesn't expand them again, as long as the commands didn't change in between.
+    Heat gained at the end of each turn is random, but only drawn once per edge of the graph, so re-solving gives the
+    same Heat as the previous solve did, for every route the two have in common.
+    If end_of_route_criteria is enabled, only routes which meet the end of route criteria (like the ones pruning
+    enforces) are returned. A cancelled solve leaves a graph which can't be reused, so the next one starts over.
+    """
+
+    def __init__(self, turn_cache_entries: int = TURN_CACHE_ENTRIES, end_of_route_criteria: bool = True):
+        self.turn_cache_entries: int = turn_cache_entries
+        self.end_of_route_criteria: bool = end_of_route_criteria
+        self.task: Task = None
+        self.state_graph: StateGraph = None
+        self.turn_table: TurnTable = None
+        self.last_change: str = None
+
+    def __repr__(self) -> str:
+        output = f"IncrementalSolver({self.task}, {self.state_graph}, last_change={self.last_change!r})"
+        return output
+
+    def reset(self) -> None:
+        """
+        Forgets the last task, so that the next one is solved from scratch.
+        """
+        self.task = None
+        self.state_graph = None
+        self.turn_table = None
+
+    def solve(self, task: Task, control: SearchControl = None) -> Iterator[Route]:
+        """
+        Returns an iterator over every route of the task which satisfies the objective, like solve does with the state
+        graph search mode. The graph is updated when the iterator is first advanced, and routes are yielded from it
+        afterwards, so the iterator must be used up (or closed) before solving another task.
+        """
+        if control is None:
+            control = SearchControl()
+        return self.iterate_routes(task, control)
+
+    def iterate_routes(self, task: Task, control: SearchControl) -> Iterator[Route]:
+        previous_task: Task = self.prepare(task)
+        routes: Iterator[Route] = self.iterate_updated_routes(task, previous_task, control)
+        if control.stats is not None:
+            # Only started once prepare has settled which TurnTable, and so which cache, is used
+            routes = iterate_with_stats(routes, control.stats, task.amount_of_turns, self.turn_table.cache)
+        yield from routes
+
+    def iterate_updated_routes(self, task: Task, previous_task: Task, control: SearchControl) -> Iterator[Route]:
+        if not self.update(task, previous_task, control):
+            return
+
+        bounds: ResourceBounds = self.state_graph.empty_route.bounds
+        compiled_objective: tuple[tuple[int, int], ...] = compile_objective(task.objective)
+        for node in self.state_graph.levels[task.amount_of_turns].values():
+            if self.end_of_route_criteria and not bounds.is_valid_end_of_route(node.state):
+                continue
+            if state_satisfies_objective(node.state, compiled_objective):
+                for route in self.state_graph.iterate_routes(node):
+                    if control.is_cancelled():
+                        return
+                    yield route
+
+    def prepare(self, task: Task) -> Task:
+        """
+        Works out what the difference from the last task invalidates, and starts over with a new graph, or compiles a
+        new TurnTable, if it has to. Returns the last task, which is forgotten until the graph is up to date again.
+        """
+        empty_route: Route = Route(task.starting_resources, task.amount_of_turns)
+        if self.task is None or not self.has_same_start(task, empty_route):
+            self.last_change = REBUILT
+            self.turn_table = TurnTable(task.available_commands, task.commands_per_turn, empty_route.bounds,
+                                        PossibleTurnsCache(self.turn_cache_entries))
+            self.state_graph = StateGraph(empty_route)
+        else:
+            self.last_change = self.get_change(task)
+            # Routes are rebuilt from the graph's empty route, which must have room for the new amount of turns
+            self.state_graph.empty_route = empty_route
+
+        if self.last_change == COMMANDS_CHANGED:
+            self.turn_table = TurnTable(task.available_commands, task.commands_per_turn, empty_route.bounds,
+                                        PossibleTurnsCache(self.turn_cache_entries))
+        previous_task: Task = self.task
+        self.task = None
+        return previous_task
+
+    def update(self, task: Task, previous_task: Task, control: SearchControl) -> bool:
+        """
+        Brings the graph up to date with the task, once prepared for it, doing as little as the difference from the
+        last task allows. Returns False if it was cancelled, in which case the graph is dropped.
+        """
+        if self.last_change == COMMANDS_CHANGED:
+            previous_commands: set[Command] = set(previous_task.available_commands.values())
+            commands: set[Command] = set(task.available_commands.values())
+            del self.state_graph.levels[task.amount_of_turns + 1:]
+            if previous_commands - commands:
+                self.remove_commands(previous_commands - commands)
+            if commands - previous_commands and not self.add_commands(commands - previous_commands, control):
+                self.reset()
+                return False
+
+        if not self.expand_levels(task.amount_of_turns, control):
+            self.reset()
+            return False
+        self.task = task
+        return True
+
+    def has_same_start(self, task: Task, empty_route: Route) -> bool:
+        """
+        Checks if the task starts from the same state, with the same bounds and commands per turn, as the last one.
+        """
+        graph_route: Route = self.state_graph.empty_route
+        return task.commands_per_turn == self.task.commands_per_turn and empty_route.state == graph_route.state and \
+            empty_route.bounds.key() == graph_route.bounds.key()
+
+    def get_change(self, task: Task) -> str:
+        """
+        Works out what has to be done to the graph to solve the task, given that it has the same start as the last one.
+        """
+        if set(task.available_commands.values()) != set(self.task.available_commands.values()):
+            return COMMANDS_CHANGED
+        if task.amount_of_turns > len(self.state_graph):
+            return EXTENDED
+        if task.amount_of_turns < self.task.amount_of_turns:
+            return TRUNCATED
+        if task.amount_of_turns > self.task.amount_of_turns or \
+                compile_objective(task.objective) != compile_objective(self.task.objective):
+            return FILTERED
+        return UNCHANGED
+
+    def expand_levels(self, amount_of_turns: int, control: SearchControl) -> bool:
+        """
+        Expands the deepest level of the graph with every command, until it has the given amount of turns.
+        Returns False if it was cancelled.
+        """
+        stats: SearchStats = control.stats
+        while len(self.state_graph) < amount_of_turns:
+            level: int = len(self.state_graph)
+            self.state_graph.add_level()
+            for node in self.state_graph.levels[level].values():
+                if control.is_cancelled():
+                    return False
+                control.expand(level)
+                for possible_turn in self.turn_table.iterate_possible_turns(node.state):
+                    self.state_graph.add_turn(node, possible_turn)
+                    if stats is not None:
+                        stats.accept(level)
+        return True
+
+    def add_commands(self, commands: set[Command], control: SearchControl) -> bool:
+        """
+        Adds the turns using any of the given commands to every level of the graph, and expands the states those turns
+        reach for the first time with every command, since none of their turns are in the graph yet.
+        Returns False if it was cancelled.
+        """
+        stats: SearchStats = control.stats
+        added_turns_table: TurnTable = self.turn_table.only_with_commands(commands)
+        new_nodes: set[int] = set()
+        for level in range(len(self.state_graph)):
+            next_level: dict[tuple[int, ...], StateNode] = self.state_graph.levels[level + 1]
+            for node in list(self.state_graph.levels[level].values()):
+                if control.is_cancelled():
+                    return False
+                control.expand(level)
+                turn_table: TurnTable = self.turn_table if id(node) in new_nodes else added_turns_table
+                for possible_turn in turn_table.iterate_possible_turns(node.state):
+                    if self.state_graph.add_turn(node, possible_turn):
+                        new_nodes.add(id(next_level[possible_turn.state]))
+                    if stats is not None:
+                        stats.accept(level)
+        return True
+
+    def remove_commands(self, commands: set[Command]) -> None:
+        """
+        Removes every edge whose turn uses any of the given commands, and every state no longer reachable because of it.
+        """
+        levels: list[dict[tuple[int, ...], StateNode]] = self.state_graph.levels
+        for level in levels[1:]:
+            for state, node in list(level.items()):
+                node.predecessors = [(previous_node, turn) for previous_node, turn in node.predecessors
+                                     if levels[previous_node.turn_index].get(previous_node.state) is previous_node and
+                                     commands.isdisjoint(turn.commands)]
+                if not node.predecessors:
+                    del level[state]
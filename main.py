@@ -1,16 +1,26 @@
-import time
-
-from PyQt5.QtCore import QRegExp
+from PyQt5.QtCore import QRegExp, QThread, pyqtSignal
 from PyQt5.QtWidgets import QApplication, QMainWindow, QDesktopWidget, QWidget, QVBoxLayout, QHBoxLayout, QLabel, \
     QGroupBox, QFormLayout, QLineEdit, QCheckBox, QPushButton, QSizePolicy
 from PyQt5.QtGui import QRegExpValidator
+import logging
 import sys
+from typing import Iterator
 
-from task_calculator import calculator
-from data_structure import Command, Route, BaseResource, REGULAR_RESOURCE_NAMES, SPECIAL_RESOURCE_NAMES, \
-    Comms, Navs, Data, Heat, Drift, Thrust, Power, Crew
+from solver import Task, solve, debug_task
+from incremental_solver import IncrementalSolver
+from route_ranking import RouteScore, RouteScorer, TopRoutes
+from task_calculator import present_routes, SearchControl, SearchStats, STREAMING
+from data_structure import Command, Route, BaseResource, PossibleTurnsCache, REGULAR_RESOURCE_NAMES, \
+    SPECIAL_RESOURCE_NAMES, TURN_CACHE_ENTRIES, get_resource_from_name
 
 DEBUG = True
+SEARCH_MODE = STREAMING
+PRUNE = True
+INCREMENTAL = True  # Re-solves by updating the last calculation's state graph, instead of SEARCH_MODE
+PROGRESS_INTERVAL = 0.1  # The least amount of seconds between each progress update from the calculator
+TOP_ROUTES = 5  # The amount of most robust routes presented
+
+logger: logging.Logger = logging.getLogger(__name__)
 
 # TODO: Heat is still calculated for some reason. Have to find a solution to have the certain resources not calculate each round if they're not a part of the task
 
@@ -46,7 +56,12 @@ class MainWindow(QMainWindow):
         self.commands_per_turn = SingularIntInput(self, "Amount of commands per turn: ", 3)
         self.local_layout.addWidget(self.commands_per_turn)
 
-        self.continue_calculating = False
+        self.calculator_worker: CalculatorWorker = None
+        self.incremental_solver: IncrementalSolver = None
+        if INCREMENTAL:
+            self.incremental_solver = IncrementalSolver(TURN_CACHE_ENTRIES, PRUNE)
+        self.progress_message: str = ""
+        self.estimate_message: str = ""
         self.calculate_button = QPushButton("Calculate", parent=self)
         self.local_layout.addWidget(self.calculate_button)
         self.calculate_button.clicked.connect(self.calculate_button_clicked)
@@ -63,122 +78,113 @@ class MainWindow(QMainWindow):
         self.add_row_button.clicked.connect(self.available_commands_widget.add_row)
 
     def calculate_button_clicked(self):
-        if not self.continue_calculating:
-            calculation_arguments: dict[str, any] = self.parse_input()
+        if self.calculator_worker is None:
+            task: Task = self.parse_input()
             self.calculate_button.setText("Stop")
-            self.continue_calculating = True
             self.output_field.setText("Calculating...")
-            QApplication.processEvents()
-            calculator(**calculation_arguments)
+            self.calculator_worker = CalculatorWorker(task, self.incremental_solver, parent=self)
+            self.progress_message = ""
+            self.estimate_message = ""
+            self.calculator_worker.progress.connect(self.present_progress)
+            self.calculator_worker.estimate.connect(self.present_estimate)
+            self.calculator_worker.finished.connect(self.calculation_finished)
+            self.calculator_worker.start()
         else:
-            self.continue_calculating = False
+            self.calculator_worker.control.cancel()
             self.output_field.setText("Stopping...")
-            QApplication.processEvents()
 
-    def parse_input(self) -> dict[str, any]:
+    def present_progress(self, message: str) -> None:
+        self.progress_message = message
+        self.present_calculating()
+
+    def present_estimate(self, message: str) -> None:
+        self.estimate_message = message
+        self.present_calculating()
+
+    def present_calculating(self) -> None:
+        if self.calculator_worker is not None and not self.calculator_worker.control.is_cancelled():
+            self.output_field.setText("\n".join(["Calculating... " + self.progress_message, self.estimate_message]))
+
+    def calculation_finished(self) -> None:
+        calculator_worker: CalculatorWorker = self.calculator_worker
+        self.calculator_worker = None
+        calculator_worker.deleteLater()
+        logger.debug("Search stats:\n%s", calculator_worker.control.stats.summary())
+        if self.incremental_solver is not None:
+            logger.debug("Incremental solve: %s", self.incremental_solver.last_change)
+        self.present_results(calculator_worker.routes_found, calculator_worker.top_routes.best())
+
+    def parse_input(self) -> Task:
         if not DEBUG:
-            output: dict[str, any] = {"available_commands": get_available_commands(self),
-                                      "starting_resources": get_starting_resources(self),
-                                      "amount_of_turns": get_amount_of_turns(self),
-                                      "commands_per_turn": get_commands_per_turn(self),
-                                      "objective": get_objective(self),
-                                      "gui": self}
-        else:
-            output: dict[str, any] = {
-                "available_commands": {
-                    "Power to comms": Command("Power to comms",
-                                              {
-                                                  REGULAR_RESOURCE_NAMES["power"]: Power(value=1),
-                                              },
-                                              {
-                                                  REGULAR_RESOURCE_NAMES["comms"]: Comms(value=2)
-                                              }
-                                              ),
-
-                    "Comms and power to navs": Command("Comms and power to navs",
-                                                       {
-                                                           REGULAR_RESOURCE_NAMES["comms"]: Comms(value=2),
-                                                           REGULAR_RESOURCE_NAMES["power"]: Power(value=1)
-                                                       },
-                                                       {
-                                                           REGULAR_RESOURCE_NAMES["navs"]: Navs(value=5)
-                                                       }
-                                                       ),
-
-                    "Navs to data and comms": Command("Navs to data and comms",
-                                                      {
-                                                          REGULAR_RESOURCE_NAMES["navs"]: Navs(value=3)
-                                                      },
-                                                      {
-                                                          REGULAR_RESOURCE_NAMES["data"]: Data(value=2),
-                                                          REGULAR_RESOURCE_NAMES["comms"]: Comms(value=2)
-                                                      }
-                                                      ),
-                    "Heat to power": Command("Heat to power",
-                                             {
-                                                 SPECIAL_RESOURCE_NAMES["heat"]: Heat(4, 1, 3, value=2)
-                                             },
-                                             {
-                                                 REGULAR_RESOURCE_NAMES["power"]: Data(value=2)
-                                             }
-                                             ),
-                    "Crew and data to navs": Command("Crew and data to navs",
-                                                     {
-                                                         SPECIAL_RESOURCE_NAMES["crew"]: Navs(value=2),
-                                                         REGULAR_RESOURCE_NAMES["data"]: Data(value=2)
-                                                     },
-                                                     {
-                                                         REGULAR_RESOURCE_NAMES["navs"]: Navs(value=8)
-                                                     }
-                                                     ),
-                    "Drift to data": Command("Drift to data",
-                                             {
-                                                 SPECIAL_RESOURCE_NAMES["drift"]: Drift([-2, 2], -4, 4, value=-1)
-                                             },
-                                             {
-                                                 REGULAR_RESOURCE_NAMES["data"]: Data(value=3)
-                                             }
-                                             ),
-                    "Power to thrust and drift": Command("Power to thrust and drift",
-                                                         {
-                                                             REGULAR_RESOURCE_NAMES["power"]: Power(value=2)
-                                                         },
-                                                         {
-                                                             SPECIAL_RESOURCE_NAMES["thrust"]: Thrust(4, value=1),
-                                                             SPECIAL_RESOURCE_NAMES["drift"]: Drift([-2, 2], -4, 4,
-                                                                                                    value=1)
-                                                         }
-                                                         )
-                },
-                "starting_resources": {
-                    REGULAR_RESOURCE_NAMES["comms"]: Comms(value=1),
-                    REGULAR_RESOURCE_NAMES["navs"]: Navs(),
-                    REGULAR_RESOURCE_NAMES["data"]: Data(),
-                    REGULAR_RESOURCE_NAMES["power"]: Power(value=10),
-
-                    SPECIAL_RESOURCE_NAMES["heat"]: Heat(4, 1, 3, 2),
-                    SPECIAL_RESOURCE_NAMES["crew"]: Crew(2),
-                    SPECIAL_RESOURCE_NAMES["drift"]: Drift([-2, 2], -4, 4, value=2),
-                    SPECIAL_RESOURCE_NAMES["thrust"]: Thrust(4, value=3)
-                },
-                "amount_of_turns": 2,
-                "commands_per_turn": 3,
-                "objective": {
-                    REGULAR_RESOURCE_NAMES["comms"]: Comms(value=7),
-                    REGULAR_RESOURCE_NAMES["navs"]: Navs(value=7)
-                },
-                "gui": self
-            }
-        return output
-
-    def present_results(self, valid_routes: list[Route]) -> None:
-        self.continue_calculating = False
-        self.output_field.setText("Done: " + str(len(valid_routes)))
+            return Task(get_available_commands(self), get_starting_resources(self), get_amount_of_turns(self),
+                        get_commands_per_turn(self), get_objective(self))
+        return debug_task()
+
+    def present_results(self, routes_found: int, best_routes: list[tuple[Route, RouteScore]] = None) -> None:
+        """
+        Presents the amount of valid routes found once calculating is done, along with the most robust of them.
+        """
+        lines: list[str] = ["Done: " + str(routes_found)]
+        for place, (route, score) in enumerate(best_routes or [], 1):
+            turns: str = " | ".join(", ".join(command.name for command in turn.commands) for turn in route.turns)
+            lines.append(f"{place}. {turns}")
+            lines.append(f"    Critical commands: {score.critical_commands} of {score.commands}, "
+                         f"heat risk: {score.heat_failure_probability:.1%}, least slack: {score.min_slack}")
+        self.output_field.setText("\n".join(lines))
         self.calculate_button.setText("Calculate")
-        QApplication.processEvents()
         print()
 
 
+class CalculatorWorker(QThread):
+    """
+    Runs the headless solver on its own thread, so that the GUI stays responsive while calculating, counts the
+    valid routes it finds, and keeps the TOP_ROUTES most robust of them. The solver's progress is sent through the
+    progress signal, and the estimated time left through the estimate signal, no more than once every
+    PROGRESS_INTERVAL seconds each, and it can be stopped by cancelling the control.
+    If an IncrementalSolver is given, it's used instead of solving from scratch, so that only what changed since the
+    last calculation is calculated again.
+    """
+    progress = pyqtSignal(str)
+    estimate = pyqtSignal(str)
+
+    def __init__(self, task: Task, incremental_solver: IncrementalSolver = None, parent: QWidget = None):
+        super(CalculatorWorker, self).__init__(parent)
+        self.task: Task = task
+        self.incremental_solver: IncrementalSolver = incremental_solver
+        self.control: SearchControl = SearchControl(self.progress.emit, PROGRESS_INTERVAL,
+                                                    stats=SearchStats(self.present_stats, PROGRESS_INTERVAL))
+        self.routes_found: int = 0
+        self.top_routes: TopRoutes = TopRoutes(RouteScorer(task, PRUNE), TOP_ROUTES)
+
+    def run(self) -> None:
+        if self.incremental_solver is not None:
+            routes: Iterator[Route] = self.incremental_solver.solve(self.task, self.control)
+        else:
+            routes: Iterator[Route] = solve(self.task, SEARCH_MODE, PRUNE, PossibleTurnsCache(TURN_CACHE_ENTRIES),
+                                            control=self.control)
+        present_routes(routes, self.present_route, self.control)
+
+    def present_route(self, route: Route) -> None:
+        """
+        Receives each valid route as soon as it's found.
+        """
+        self.routes_found += 1
+        self.top_routes.add(route)
+
+    def present_stats(self, stats: SearchStats) -> None:
+        """
+        Receives the solver's stats periodically, and sends the estimated time left, along with the turn being expanded
+        and how many routes have been expanded on it, so that the turn which blows up can be seen.
+        """
+        if not stats.levels:
+            return
+        remaining_seconds: float = stats.estimate_remaining_seconds()
+        estimate: str = "unknown" if remaining_seconds is None else f"{remaining_seconds:.0f} s"
+        level: int = stats.current_level
+        self.estimate.emit(f"Time left: {estimate} (turn {level + 1} of {len(stats.levels)}, "
+                           f"{stats.levels[level].frontier} routes expanded)")
+
+
 class SingularIntInput(QWidget):
     def __init__(self, parent: QWidget, label: str = "", value: int = 0):
         super(SingularIntInput, self).__init__(parent=parent)
@@ -277,26 +283,6 @@ class ResourceWidget(QWidget):
         self.local_layout.addWidget(self.value)
 
 
-def get_resource_from_name(name: str, value: int) -> type(BaseResource):
-    if name == REGULAR_RESOURCE_NAMES["comms"]:
-        return Comms(value=value)
-    elif name == REGULAR_RESOURCE_NAMES["navs"]:
-        return Navs(value=value)
-    elif name == REGULAR_RESOURCE_NAMES["data"]:
-        return Data(value=value)
-    elif name == REGULAR_RESOURCE_NAMES["power"]:
-        return Power(value=value)
-
-    elif name == SPECIAL_RESOURCE_NAMES["heat"]:
-        return Heat(4, 0, 3, value=value)
-    elif name == SPECIAL_RESOURCE_NAMES["drift"]:
-        return Drift([-2, 2], -4, 4, value=value)
-    elif name == SPECIAL_RESOURCE_NAMES["thrust"]:
-        return Thrust(4, value=value)
-    elif name == SPECIAL_RESOURCE_NAMES["crew"]:
-        return Crew(value=value)
-
-
 def get_amount_of_turns(gui: MainWindow) -> int:
     if not gui.amount_of_turns.input.text():
         value: int = 0
@@ -469,6 +455,8 @@ def list_available_resource_types(list_of_names: dict[str, str]) -> None:
 '''
 
 if __name__ == "__main__":
+    # The search stats and incremental solves of every calculation are only logged while debugging
+    logging.basicConfig(level=logging.DEBUG if DEBUG else logging.WARNING)
     app = QApplication(sys.argv)
     win = MainWindow()
     win.show()
@@ -0,0 +1,177 @@
+import heapq
+import itertools
+import sys
+from typing import Iterable
+
+from solver import Task
+from heat_distribution import HeatSteps, propagate_heat
+from data_structure import Command, Route, ResourceBounds, compile_objective, state_satisfies_objective
+
+TOP_ROUTES = 10
+
+
+class RouteScore:
+    """
+    How close a route is to failing:
+    - min_slack is the smallest distance of any resource to any of its bounds, after any command, turn or at the end
+      of the route, where the objective, required Thrust and Drift bounds count as bounds too.
+    - critical_commands is how many of the route's commands would make it fail if they failed on their own. A failed
+      command still uses its inputs, but gives none of its outputs.
+    - heat_failure_probability is the exact probability of the route failing because of the random Heat gains.
+    Routes are ranked by fewest critical commands first, then lowest Heat risk, then most slack.
+    """
+
+    def __init__(self, min_slack: int, critical_commands: int, commands: int, heat_failure_probability: float):
+        self.min_slack: int = min_slack
+        self.critical_commands: int = critical_commands
+        self.commands: int = commands
+        self.heat_failure_probability: float = heat_failure_probability
+
+    def __repr__(self) -> str:
+        output = f"RouteScore(min_slack={self.min_slack}, critical_commands={self.critical_commands}/" \
+                 f"{self.commands}, heat_failure_probability={self.heat_failure_probability:.4f})"
+        return output
+
+    def key(self) -> tuple[int, float, int]:
+        """
+        The score as a tuple where a bigger one means a more robust route.
+        """
+        return -self.critical_commands, -self.heat_failure_probability, self.min_slack
+
+
+class RouteScorer:
+    """
+    Scores the routes of a task, by replaying their commands on the state vector with the Heat gains each route
+    actually drew, once as they are and once with each of their commands failing.
+    The end of route criteria of Drift and Thrust are only required of the replayed routes if end_of_route_criteria is
+    enabled, which should match whether the routes were searched with prune enabled, since only then are they enforced.
+    """
+
+    def __init__(self, task: Task, end_of_route_criteria: bool = True):
+        self.end_of_route_criteria: bool = end_of_route_criteria
+        self.bounds: ResourceBounds = ResourceBounds(task.starting_resources)
+        self.starting_state: tuple[int, ...] = self.bounds.to_state(task.starting_resources)
+        self.objective: tuple[tuple[int, int], ...] = compile_objective(task.objective)
+        self.heat_steps: HeatSteps = HeatSteps(task)
+
+    def score(self, route: Route) -> RouteScore:
+        turns_commands: list[list[Command]] = [turn.commands for turn in route.turns]
+        heat_gains: list[int] = route.get_heat_gains(self.starting_state)
+
+        valid, min_slack = self.replay(turns_commands, heat_gains)
+        if not valid:
+            min_slack = -1
+
+        commands: int = 0
+        critical_commands: int = 0
+        for turn_index, commands_of_turn in enumerate(turns_commands):
+            for command_index in range(len(commands_of_turn)):
+                commands += 1
+                if not self.replay(turns_commands, heat_gains, (turn_index, command_index))[0]:
+                    critical_commands += 1
+
+        return RouteScore(min_slack, critical_commands, commands, self.get_heat_failure_probability(turns_commands))
+
+    def get_heat_failure_probability(self, turns_commands: list[list[Command]]) -> float:
+        bounds: ResourceBounds = self.bounds
+        if bounds.heat_index < 0:
+            return 0.0
+        distribution: dict[int, float] = {self.heat_steps.starting_heat: 1.0}
+        for commands in turns_commands:
+            distribution = propagate_heat(distribution, *self.heat_steps.get_turn_step(tuple(commands)),
+                                          bounds.min_heat_increase, bounds.max_heat_increase, bounds.overheat_limit)
+        success_probability: float = sum(probability for heat, probability in distribution.items()
+                                         if heat >= self.heat_steps.minimum_final_heat)
+        return max(0.0, 1.0 - success_probability)
+
+    def replay(self, turns_commands: list[list[Command]], heat_gains: list[int],
+               failed_command: tuple[int, int] = None) -> tuple[bool, int]:
+        """
+        Executes the commands of every turn from the starting state, with the given Heat gains, and the outputs of the
+        failed command (given by its turn and place in the turn) left out.
+        Returns whether the route still succeeds, and the smallest distance to a bound along the way.
+        """
+        bounds: ResourceBounds = self.bounds
+        min_values: tuple[int, ...] = bounds.min_values
+        max_values: tuple[int, ...] = bounds.max_values
+        state: list[int] = list(self.starting_state)
+        min_slack: int = sys.maxsize
+
+        for turn_index, commands in enumerate(turns_commands):
+            for command_index, command in enumerate(commands):
+                for amounts, sign in ((command.input_amounts, -1), (command.output_amounts, 1)):
+                    if sign > 0 and (turn_index, command_index) == failed_command:
+                        continue
+                    for resource_index, amount in amounts:
+                        state[resource_index] += sign * amount
+                        slack: int = min(state[resource_index] - min_values[resource_index],
+                                         max_values[resource_index] - state[resource_index])
+                        if slack < 0:
+                            return False, slack
+                        min_slack = min(min_slack, slack)
+
+            # The end of turn effects, with the Heat gain the route drew
+            if bounds.crew_index >= 0:
+                state[bounds.crew_index] = bounds.crew_max
+            if bounds.heat_index >= 0:
+                state[bounds.heat_index] += heat_gains[turn_index]
+                slack: int = bounds.overheat_limit - 1 - state[bounds.heat_index]
+                if slack < 0:
+                    return False, slack
+                min_slack = min(min_slack, slack)
+
+        final_state: tuple[int, ...] = tuple(state)
+        if not state_satisfies_objective(final_state, self.objective):
+            return False, min_slack
+        for resource_index, required_value in self.objective:
+            min_slack = min(min_slack, final_state[resource_index] - required_value)
+        if not self.end_of_route_criteria:
+            return True, min_slack
+
+        if not bounds.is_valid_end_of_route(final_state):
+            return False, min_slack
+        if bounds.thrust_index >= 0:
+            min_slack = min(min_slack, final_state[bounds.thrust_index] - bounds.required_thrust)
+        if bounds.drift_index >= 0:
+            min_slack = min(min_slack, final_state[bounds.drift_index] - bounds.drift_bounds[0],
+                            bounds.drift_bounds[1] - final_state[bounds.drift_index])
+        return True, min_slack
+
+
+class TopRoutes:
+    """
+    Keeps the best routes seen so far, and their scores, in a heap of at most max_routes, so that routes can be ranked
+    while they're being found without keeping or sorting all of them. The worst of the kept routes is always at the
+    top of the heap, ready to be replaced by a better one.
+    Routes with the same score are kept in the order they were found.
+    """
+
+    def __init__(self, scorer: RouteScorer, max_routes: int = TOP_ROUTES):
+        self.scorer: RouteScorer = scorer
+        self.max_routes: int = max_routes
+        self.heap: list[tuple[tuple, int, RouteScore, Route]] = []
+        self.counter: itertools.count = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def add(self, route: Route) -> None:
+        if self.max_routes <= 0:
+            return
+        score: RouteScore = self.scorer.score(route)
+        entry: tuple[tuple, int, RouteScore, Route] = (score.key(), -next(self.counter), score, route)
+        if len(self.heap) < self.max_routes:
+            heapq.heappush(self.heap, entry)
+        elif entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+
+    def extend(self, routes: Iterable[Route]) -> None:
+        for route in routes:
+            self.add(route)
+
+    def best(self) -> list[tuple[Route, RouteScore]]:
+        """
+        Returns the kept routes and their scores, the best one first.
+        """
+        return [(route, score) for key, order, score, route in sorted(self.heap, key=lambda entry: entry[:2],
+                                                                       reverse=True)]
@@ -0,0 +1,316 @@
+"""
+Stores routes on disk instead of in memory, for tasks with more routes than fit in memory.
+
+Routes are encoded by a RouteEncoder, as the indices of their commands and the random amount Heat gained at the end of
+each of their turns, and appended to a binary file along with the state they end in. Every record is a
+little endian uint16 amount of turns, followed by that many turns of uint16 command indices, that many int16 Heat
+gains and the int32 values of the state. The file is only ever appended to, and read through a memory map.
+"""
+
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Iterable, Iterator, Sequence, TextIO
+
+from data_structure import Command, Route, RouteNode, Turn, ResourceBounds, RESOURCE_NAMES, RESOURCE_INDEX, \
+    state_satisfies_objective
+
+MEMORY_BUDGET = 512 * 1024 * 1024  # The default amount of bytes a RouteList can keep in memory
+# sys.getsizeof leaves out the values of an object's attributes, which are kept beside it: a header, and a pointer for
+# each attribute. Route, RouteNode and Turn have four or five each
+ATTRIBUTE_VALUES_BYTES = 56
+LIST_ITEM_BYTES = 8
+
+
+class RouteEncoder:
+    """
+    Encodes the routes of a task as the indices of their commands, turn by turn, and the random amount Heat gained at
+    the end of each of their turns, and materialises them back into Routes, by replaying the commands and Heat gains
+    from the starting state, which gives the exact same states the routes had.
+    Only the first ordering of each turn is encoded, so the other orderings of a turn found with grouped orderings are
+    left out.
+    """
+
+    def __init__(self, empty_route: Route, available_commands: dict[str, Command], commands_per_turn: int):
+        self.empty_route: Route = empty_route
+        self.bounds: ResourceBounds = empty_route.bounds
+        self.commands_per_turn: int = commands_per_turn
+        self.commands: list[Command] = list(available_commands.values())
+        self.command_indices: dict[Command, int] = {command: index for index, command in enumerate(self.commands)}
+
+    def encode_commands(self, route: Route) -> list[int]:
+        return [self.command_indices[command] for turn in route.turns for command in turn.commands]
+
+    def encode_heat_gains(self, route: Route) -> list[int]:
+        return route.get_heat_gains(self.empty_route.state)
+
+    def materialise(self, command_indices: Sequence[int], heat_gains: Sequence[int]) -> Route:
+        """
+        Rebuilds a Route from the indices of its commands and its Heat gains, by applying its commands and end of turn
+        effects to the starting state.
+        """
+        bounds: ResourceBounds = self.bounds
+        route: Route = self.empty_route
+        state: list[int] = list(route.state)
+        for turn_index, heat_gain in enumerate(heat_gains):
+            commands: list[Command] = [self.commands[command_index] for command_index in command_indices[
+                turn_index * self.commands_per_turn:(turn_index + 1) * self.commands_per_turn]]
+            for command in commands:
+                for resource_index, change in enumerate(command.delta):
+                    state[resource_index] += change
+            if bounds.crew_index >= 0:
+                state[bounds.crew_index] = bounds.crew_max
+            if bounds.heat_index >= 0:
+                state[bounds.heat_index] += heat_gain
+            route = route.extend(Turn.from_state(tuple(state), bounds, self.commands_per_turn, commands))
+        return route
+
+
+class RouteStore:
+    """
+    An append-only file of encoded routes of any amount of turns, which can be read back level by level (by amount of
+    turns), by index, or all at once, and exported to CSV or JSON lines.
+    The file is a temporary one, deleted when the store is closed, unless a path is given, in which case it's created
+    there (replacing any file already there) and kept. The offsets of the records are kept in memory, eight bytes per
+    route, so that they can be found again without reading the whole file.
+    """
+
+    def __init__(self, encoder: RouteEncoder, path: str = None):
+        self.encoder: RouteEncoder = encoder
+        self.temporary: bool = path is None
+        if path is None:
+            file_descriptor, path = tempfile.mkstemp(prefix="routes-", suffix=".bin")
+            os.close(file_descriptor)
+        self.path: str = path
+        self.file = open(path, "wb+")
+        self.size: int = 0
+        self.memory_map: mmap.mmap = None
+        self.mapped_size: int = 0
+        self.offsets: array = array("Q")
+        self.level_offsets: dict[int, array] = {}
+
+    def __repr__(self) -> str:
+        output = f"RouteStore({self.path!r}, {len(self)} routes, {self.size} bytes)"
+        return output
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> Route:
+        return self.read(self.offsets[index])
+
+    def __iter__(self) -> Iterator[Route]:
+        return self.iterate()
+
+    def iterate(self, objective: tuple[tuple[int, int], ...] = None) -> Iterator[Route]:
+        """
+        Yields every route, level by level, or only the ones which satisfy the objective (converted by
+        compile_objective), if one is given.
+        """
+        for level in sorted(self.level_offsets):
+            yield from self.iterate_level(level, objective)
+
+    def __enter__(self) -> type(__name__):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback) -> None:
+        self.close()
+
+    def append(self, route: Route) -> None:
+        turns: int = len(route)
+        command_indices: list[int] = self.encoder.encode_commands(route)
+        record: bytes = struct.pack(f"<H{len(command_indices)}H{turns}h{len(RESOURCE_NAMES)}i", turns,
+                                    *command_indices, *self.encoder.encode_heat_gains(route), *route.state)
+        self.offsets.append(self.size)
+        self.level_offsets.setdefault(turns, array("Q")).append(self.size)
+        self.file.write(record)
+        self.size += len(record)
+
+    def extend(self, routes: Iterable[Route]) -> None:
+        for route in routes:
+            self.append(route)
+
+    def get_view(self) -> mmap.mmap:
+        """
+        Returns a memory map of the whole file, mapped again if routes have been appended since it was last mapped.
+        """
+        if self.mapped_size != self.size:
+            self.file.flush()
+            if self.memory_map is not None:
+                self.memory_map.close()
+            self.memory_map = mmap.mmap(self.file.fileno(), self.size, access=mmap.ACCESS_READ)
+            self.mapped_size = self.size
+        return self.memory_map
+
+    def read_record(self, offset: int) -> tuple[tuple[int, ...], tuple[int, ...], tuple[int, ...]]:
+        """
+        Returns the command indices, Heat gains and state of the route at the given offset.
+        """
+        view: mmap.mmap = self.get_view()
+        turns: int = struct.unpack_from("<H", view, offset)[0]
+        commands: int = turns * self.encoder.commands_per_turn
+        values: tuple[int, ...] = struct.unpack_from(f"<{commands}H{turns}h{len(RESOURCE_NAMES)}i", view, offset + 2)
+        return values[:commands], values[commands:commands + turns], values[commands + turns:]
+
+    def read(self, offset: int) -> Route:
+        command_indices, heat_gains, state = self.read_record(offset)
+        return self.encoder.materialise(command_indices, heat_gains)
+
+    def iterate_level(self, level: int, objective: tuple[tuple[int, int], ...] = None) -> Iterator[Route]:
+        """
+        Yields every route of the given amount of turns, in the order they were appended. If an objective is given,
+        routes which don't satisfy it are left out before being materialised.
+        """
+        for offset in self.level_offsets.get(level, ()):
+            command_indices, heat_gains, state = self.read_record(offset)
+            if objective is None or state_satisfies_objective(state, objective):
+                yield self.encoder.materialise(command_indices, heat_gains)
+
+    def iterate_rows(self) -> Iterator[tuple[int, list[list[str]], dict[str, int]]]:
+        """
+        Yields the amount of turns, the names of the commands of each turn and the resources of every route, level by
+        level, without materialising them.
+        """
+        commands: list[Command] = self.encoder.commands
+        commands_per_turn: int = self.encoder.commands_per_turn
+        resource_names: list[str] = list(self.encoder.bounds.templates)
+        for level in sorted(self.level_offsets):
+            for offset in self.level_offsets[level]:
+                command_indices, heat_gains, state = self.read_record(offset)
+                turns: list[list[str]] = [[commands[command_index].name for command_index in
+                                           command_indices[start:start + commands_per_turn]]
+                                          for start in range(0, len(command_indices), commands_per_turn)]
+                yield level, turns, {name: state[RESOURCE_INDEX[name]] for name in resource_names}
+
+    def export_json_lines(self, output: TextIO) -> None:
+        """
+        Writes every route as a JSON line, like route_to_json describes it.
+        """
+        for level, turns, resources in self.iterate_rows():
+            output.write(json.dumps({"turns": turns, "resources": resources}) + "\n")
+
+    def export_csv(self, output: TextIO) -> None:
+        """
+        Writes every route as a CSV row of its amount of turns, its turns (each turn's commands separated by commas,
+        and the turns by vertical bars) and the value of each of its resources.
+        """
+        writer = csv.writer(output)
+        resource_names: list[str] = list(self.encoder.bounds.templates)
+        writer.writerow(["Turns", "Commands", *resource_names])
+        for level, turns, resources in self.iterate_rows():
+            writer.writerow([level, " | ".join(", ".join(turn) for turn in turns),
+                             *(resources[name] for name in resource_names)])
+
+    def close(self) -> None:
+        if self.memory_map is not None:
+            self.memory_map.close()
+            self.memory_map = None
+        if not self.file.closed:
+            self.file.close()
+            if self.temporary:
+                os.remove(self.path)
+
+
+def estimate_node_bytes(node: RouteNode) -> int:
+    """
+    Estimates how many bytes a RouteNode takes up in memory, along with its Turn.
+    """
+    turn: Turn = node.turn
+    return sys.getsizeof(node) + sys.getsizeof(turn) + 2 * ATTRIBUTE_VALUES_BYTES + sys.getsizeof(turn.commands) + \
+        sys.getsizeof(turn.state)
+
+
+class RouteList:
+    """
+    A list of routes which is kept in memory until it's estimated to take up more than memory_budget bytes, at which
+    point every route is moved into a RouteStore, where the rest are appended too. Either way, it's iterated in the
+    order the routes were appended. It must be closed once it's no longer needed, to delete the store's file.
+    The estimate counts every Route, and every RouteNode kept alive by them, once. Since the routes a list is filled
+    with usually extend the routes of another one, which is kept in memory until this one is filled, retained_bytes
+    of that one's memory are counted against the budget as well. The nodes both lists keep alive are then counted
+    twice, which errs on the side of moving the routes to disk early.
+    """
+
+    def __init__(self, encoder: RouteEncoder, memory_budget: int = MEMORY_BUDGET, retained_bytes: int = 0):
+        self.encoder: RouteEncoder = encoder
+        self.memory_budget: int = memory_budget
+        self.retained_bytes: int = retained_bytes
+        self.routes: list[Route] = []
+        self.route_bytes: int = 0
+        self.last_nodes: list[RouteNode] = []
+        self.store: RouteStore = None
+
+    def __repr__(self) -> str:
+        output = f"RouteList({len(self)} routes, store={self.store})"
+        return output
+
+    def __len__(self) -> int:
+        return len(self.routes) if self.store is None else len(self.store)
+
+    def __getitem__(self, index: int) -> Route:
+        return self.routes[index] if self.store is None else self.store[index]
+
+    def __iter__(self) -> Iterator[Route]:
+        return self.iterate()
+
+    def iterate(self, objective: tuple[tuple[int, int], ...] = None) -> Iterator[Route]:
+        """
+        Yields every route, or only the ones which satisfy the objective (converted by compile_objective), if one is
+        given, without materialising the others.
+        """
+        if self.store is not None:
+            return self.store.iterate(objective)
+        if objective is None:
+            return iter(self.routes)
+        return (route for route in self.routes if state_satisfies_objective(route.state, objective))
+
+    @property
+    def memory_bytes(self) -> int:
+        """
+        The estimated amount of bytes the routes kept in memory take up, which is none once they've been moved to disk.
+        """
+        return self.route_bytes if self.store is None else 0
+
+    def count_new_bytes(self, route: Route) -> int:
+        """
+        Estimates how many bytes the route adds to the memory taken up by the routes before it, which is the Route
+        itself (and its place in the list), and every RouteNode it doesn't share with the route appended just before it.
+        Routes are appended in the order of the routes they extend, so a node shared with any earlier route is shared
+        with that one as well.
+        """
+        new_bytes: int = sys.getsizeof(route) + ATTRIBUTE_VALUES_BYTES + LIST_ITEM_BYTES
+        new_nodes: list[RouteNode] = []
+        node: RouteNode = route.last_node
+        while node is not None and not (node.length <= len(self.last_nodes) and
+                                        self.last_nodes[node.length - 1] is node):
+            new_bytes += estimate_node_bytes(node)
+            new_nodes.append(node)
+            node = node.parent
+        new_nodes.reverse()
+        self.last_nodes = self.last_nodes[:0 if node is None else node.length] + new_nodes
+        return new_bytes
+
+    def append(self, route: Route) -> None:
+        if self.store is not None:
+            self.store.append(route)
+            return
+        self.routes.append(route)
+        self.route_bytes += self.count_new_bytes(route)
+        if self.retained_bytes + self.route_bytes > self.memory_budget:
+            self.store = RouteStore(self.encoder)
+            self.store.extend(self.routes)
+            self.routes = []
+            self.last_nodes = []
+
+    def extend(self, routes: Iterable[Route]) -> None:
+        for route in routes:
+            self.append(route)
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
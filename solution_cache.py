@@ -0,0 +1,263 @@
+"""
+Keeps solved tasks, and the possible turns of every state expanded while solving them, in an SQLite file, so that they
+don't have to be solved again in later sessions.
+
+Solutions are keyed by the hash of their task's canonical JSON (see canonical_task_json), along with the options which
+change what a search finds: whether it was pruned, the search mode (which decides how the random Heat gains are drawn,
+and the order of the routes) and, if Heat gains a random amount, the seed the gains were drawn with. They hold the
+routes compacted like CompactRoutes does, with the commands in order of their names. The canonical JSON is stored as
+well, so that a hash collision is a miss instead of a wrong result. Routes come back with the exact same random Heat
+gains they had when the task was solved, so without a seed, a hit gives the gains of whichever solve was stored.
+
+Turn caches are keyed by everything a TurnTable depends on (the commands in order, the amount of commands per turn,
+whether orderings are grouped, and the resource bounds), so a task with the same commands as an earlier one starts
+with every state the earlier one expanded already cached, even if its objective, amount of turns or starting values
+differ. Each is stored as one int32 array of, for every cached state, its values, the amount of applicable macros and
+each of them as the amount of its orderings followed by their indices in the TurnTable's macros.
+
+Once the stored solutions and turn caches take up more than max_bytes, the least recently used are evicted.
+"""
+
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Iterator, Optional
+
+from solver import Task, solve
+from compact_routes import CompactRoutes
+from task_file import canonical_task_json, task_hash
+from task_calculator import SearchControl, DEPTH_FIRST
+from data_structure import Route, ResourceBounds, PossibleTurnsCache, TurnTable, TurnMacro, RESOURCE_NAMES, \
+    TURN_CACHE_ENTRIES
+
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".mars_horizon_solutions.sqlite3")
+CACHE_VERSION = 2  # Files with any other version are emptied when opened, since their tables are laid out differently
+MAX_BYTES = 256 * 1024 * 1024
+
+
+def sorted_commands_task(task: Task) -> Task:
+    """
+    Returns the same task with its commands in order of their names, which is the order stored routes are encoded in.
+    """
+    return Task(dict(sorted(task.available_commands.items())), task.starting_resources, task.amount_of_turns,
+                task.commands_per_turn, task.objective, task.name)
+
+
+def solution_options(task: Task, prune: bool, search_mode: str, seed: int = None) -> str:
+    """
+    The options a solution of the task is stored with, as canonical JSON. The seed is only kept if Heat gains a random
+    amount, since it makes no difference otherwise.
+    """
+    bounds: ResourceBounds = ResourceBounds(task.starting_resources)
+    random_heat: bool = bounds.heat_index >= 0 and bounds.min_heat_increase < bounds.max_heat_increase
+    return json.dumps({"prune": prune, "search_mode": search_mode, "seed": seed if random_heat else None},
+                      sort_keys=True, separators=(",", ":"))
+
+
+def turn_table_key(turn_table: TurnTable) -> str:
+    """
+    A stable hash of everything a TurnTable depends on, in the order its macros depend on.
+    """
+    description: dict[str, any] = {
+        "commands": [[command.name, command.input_amounts, command.output_amounts]
+                     for command in turn_table.available_commands.values()],
+        "commands_per_turn": turn_table.commands_per_turn,
+        "group_orderings": turn_table.group_orderings,
+        "bounds": turn_table.bounds.key()}
+    return hashlib.sha256(json.dumps(description, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class SolutionCache:
+    """
+    An SQLite file of solved tasks and turn caches, which can be used from several threads at once.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = MAX_BYTES):
+        self.path: str = path
+        self.max_bytes: int = max_bytes
+        self.lock: threading.Lock = threading.Lock()
+        self.connection: sqlite3.Connection = sqlite3.connect(path, check_same_thread=False)
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        with self.lock, self.connection:
+            if self.connection.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+                self.connection.execute("DROP TABLE IF EXISTS solutions")
+                self.connection.execute("DROP TABLE IF EXISTS turn_caches")
+                self.connection.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS solutions (key TEXT, options TEXT, task TEXT, "
+                                    "route_commands BLOB, heat_gains BLOB, size INTEGER, last_used REAL, "
+                                    "PRIMARY KEY (key, options))")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS turn_caches (key TEXT PRIMARY KEY, entries BLOB, "
+                                    "size INTEGER, last_used REAL)")
+
+    def __repr__(self) -> str:
+        output = f"SolutionCache({self.path!r}, {self.max_bytes}, size={self.size_in_bytes}, hits={self.hits}, " \
+                 f"misses={self.misses}, evictions={self.evictions})"
+        return output
+
+    def __enter__(self) -> type(__name__):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback) -> None:
+        self.close()
+
+    @property
+    def size_in_bytes(self) -> int:
+        with self.lock:
+            return self.get_size()
+
+    def get_size(self) -> int:
+        return self.connection.execute("SELECT (SELECT COALESCE(SUM(size), 0) FROM solutions) + "
+                                       "(SELECT COALESCE(SUM(size), 0) FROM turn_caches)").fetchone()[0]
+
+    def get_routes(self, task: Task, prune: bool = True, search_mode: str = DEPTH_FIRST,
+                   seed: int = None) -> Optional[CompactRoutes]:
+        """
+        Returns the stored routes of the task, or None if it hasn't been solved with the same options (see
+        solution_options).
+        """
+        key: str = task_hash(task)
+        options: str = solution_options(task, prune, search_mode, seed)
+        with self.lock, self.connection:
+            row: tuple = self.connection.execute(
+                "SELECT task, route_commands, heat_gains FROM solutions WHERE key = ? AND options = ?",
+                (key, options)).fetchone()
+            if row is None or row[0] != canonical_task_json(task):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.connection.execute("UPDATE solutions SET last_used = ? WHERE key = ? AND options = ?",
+                                    (time.time(), key, options))
+        return CompactRoutes.from_bytes(sorted_commands_task(task), row[1], row[2])
+
+    def put_routes(self, task: Task, routes: CompactRoutes, prune: bool = True, search_mode: str = DEPTH_FIRST,
+                   seed: int = None) -> None:
+        """
+        Stores every route of the task, which must be encoded with the commands in order of their names, like
+        CompactRoutes(sorted_commands_task(task)) does.
+        """
+        route_commands, heat_gains = routes.to_bytes()
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                    (task_hash(task), solution_options(task, prune, search_mode, seed),
+                                     canonical_task_json(task), route_commands, heat_gains,
+                                     len(route_commands) + len(heat_gains), time.time()))
+            self.evict()
+
+    def load_turn_cache(self, turn_table: TurnTable) -> int:
+        """
+        Fills the turn table's cache with the stored one of a table like it, if there is one. Returns the amount of
+        states loaded.
+        """
+        if turn_table.cache is None:
+            return 0
+        key: str = turn_table_key(turn_table)
+        with self.lock, self.connection:
+            row: tuple = self.connection.execute("SELECT entries FROM turn_caches WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return 0
+            self.connection.execute("UPDATE turn_caches SET last_used = ? WHERE key = ?", (time.time(), key))
+
+        values: array = array("i")
+        values.frombytes(row[0])
+        macros: list[TurnMacro] = turn_table.macros
+        state_length: int = len(RESOURCE_NAMES)
+        position: int = 0
+        states: int = 0
+        while position < len(values):
+            state: tuple[int, ...] = tuple(values[position:position + state_length])
+            amount_of_applicable: int = values[position + state_length]
+            position += state_length + 1
+            applicable_macros: list[tuple[tuple[TurnMacro, ...], tuple[int, ...]]] = []
+            for _ in range(amount_of_applicable):
+                amount_of_macros: int = values[position]
+                orderings: tuple[TurnMacro, ...] = tuple(macros[macro_index] for macro_index in
+                                                         values[position + 1:position + 1 + amount_of_macros])
+                applicable_macros.append((orderings, orderings[0].apply(state)))
+                position += 1 + amount_of_macros
+            turn_table.cache.put(state, tuple(applicable_macros))
+            states += 1
+        return states
+
+    def save_turn_cache(self, turn_table: TurnTable) -> None:
+        """
+        Stores the turn table's cache, from the least to the most recently used state, replacing the stored one.
+        """
+        if turn_table.cache is None or not turn_table.cache.entries:
+            return
+        macro_indices: dict[TurnMacro, int] = {macro: index for index, macro in enumerate(turn_table.macros)}
+        values: array = array("i")
+        for state, applicable_macros in list(turn_table.cache.entries.items()):
+            values.extend(state)
+            values.append(len(applicable_macros))
+            for orderings, applied_state in applicable_macros:
+                values.append(len(orderings))
+                values.extend(macro_indices[macro] for macro in orderings)
+        entries: bytes = values.tobytes()
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO turn_caches VALUES (?, ?, ?, ?)",
+                                    (turn_table_key(turn_table), entries, len(entries), time.time()))
+            self.evict()
+
+    def evict(self) -> None:
+        """
+        Deletes the least recently used solutions and turn caches until they take up no more than max_bytes.
+        Must be called while holding the lock, within a transaction.
+        """
+        size: int = self.get_size()
+        if size <= self.max_bytes:
+            return
+        rows: list[tuple] = self.connection.execute(
+            "SELECT 'solutions', rowid, size, last_used FROM solutions UNION ALL "
+            "SELECT 'turn_caches', rowid, size, last_used FROM turn_caches ORDER BY last_used").fetchall()
+        for table, row_id, row_size, last_used in rows:
+            if size <= self.max_bytes:
+                break
+            self.connection.execute(f"DELETE FROM {table} WHERE rowid = ?", (row_id,))
+            size -= row_size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM solutions")
+            self.connection.execute("DELETE FROM turn_caches")
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+    def solve(self, task: Task, search_mode: str = DEPTH_FIRST, prune: bool = True, workers: int = 1,
+              control: SearchControl = None, turn_cache_entries: int = TURN_CACHE_ENTRIES,
+              seed: int = None) -> Iterator[Route]:
+        """
+        Same as solve, but returns the stored routes if the task has been solved before with the same options.
+        Otherwise, the task is solved starting from the stored turn cache of a task with the same commands, if there is
+        one, and once every route has been found (without being cancelled), they're stored along with the turn cache.
+        If a seed is given, the random Heat gains are seeded with it before solving.
+        """
+        routes: CompactRoutes = self.get_routes(task, prune, search_mode, seed)
+        if routes is not None:
+            yield from routes
+            return
+
+        if control is None:
+            control = SearchControl()
+        turn_table: TurnTable = TurnTable(task.available_commands, task.commands_per_turn,
+                                          ResourceBounds(task.starting_resources),
+                                          PossibleTurnsCache(turn_cache_entries) if turn_cache_entries > 0 else None)
+        self.load_turn_cache(turn_table)
+        if seed is not None:
+            random.seed(seed)
+        routes = CompactRoutes(sorted_commands_task(task))
+        for route in solve(task, search_mode, prune, workers=workers, control=control, turn_table=turn_table):
+            routes.append(route)
+            yield route
+        if not control.is_cancelled():
+            self.put_routes(task, routes, prune, search_mode, seed)
+            self.save_turn_cache(turn_table)
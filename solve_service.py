@@ -0,0 +1,266 @@
+"""
+A long running service which solves tasks sent to it as JSON lines on the standard input, and writes the result of
+each as a JSON line on the standard output as soon as it's done. Requests look like:
+
+{"id": "a", "task": {...}, "options": {"search_mode": "depth_first", "prune": true, "max_routes": 100}}
+{"id": "a", "cancel": true}
+
+The task is described like in a task file (see task_file.py), and the options are all optional. Besides those above,
+they are "group_orderings", and "workers" to spread a single request over worker processes. Results look like
+{"id": "a", "task": "...", "routes_found": 26, "routes": [...], "seconds": 0.02, "cancelled": false}, or
+{"id": "a", "error": "..."} if the request couldn't be solved.
+
+Requests are solved in parallel by a pool of worker processes, since the search is pure Python and threads would only
+take turns at it. Each worker process keeps its own TurnTableRegistry, where tasks with the same commands, commands per
+turn and resource bounds share a single TurnTable, and with it its cache of possible turns, so overlapping tasks solved
+by the same process don't compile and expand the same states again.
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import TextIO
+
+from solver import Task, solve
+from compact_routes import CompactRoutes
+from task_file import task_from_json, route_to_json, write_json_line
+from task_calculator import SearchControl, DEPTH_FIRST
+from data_structure import ResourceBounds, TurnTable, PossibleTurnsCache, TURN_CACHE_ENTRIES
+
+WORKERS = 4
+MAX_TURN_TABLES = 32
+CANCEL_POLL_INTERVAL = 0.1  # The most seconds a worker process takes to notice its request being cancelled
+
+
+class TurnTableRegistry:
+    """
+    Keeps the TurnTables of the most recently solved tasks, keyed by everything a TurnTable depends on, so that tasks
+    with the same commands, commands per turn and resource bounds share one, along with its cache. Once there are more
+    than max_tables, the least recently used one is dropped.
+    """
+
+    def __init__(self, max_tables: int = MAX_TURN_TABLES, turn_cache_entries: int = TURN_CACHE_ENTRIES):
+        self.max_tables: int = max_tables
+        self.turn_cache_entries: int = turn_cache_entries
+        self.turn_tables: OrderedDict[tuple, TurnTable] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __repr__(self) -> str:
+        output = f"TurnTableRegistry({self.max_tables}, tables={len(self.turn_tables)}, hits={self.hits}, " \
+                 f"misses={self.misses})"
+        return output
+
+    @staticmethod
+    def key(task: Task, bounds: ResourceBounds, group_orderings: bool) -> tuple:
+        commands: tuple = tuple(sorted((command_name, command.input_amounts, command.output_amounts)
+                                       for command_name, command in task.available_commands.items()))
+        return commands, task.commands_per_turn, group_orderings, bounds.key()
+
+    def get(self, task: Task, group_orderings: bool = False) -> TurnTable:
+        """
+        Returns the TurnTable for the task, compiling it first if no task like it has been seen recently.
+        """
+        bounds: ResourceBounds = ResourceBounds(task.starting_resources)
+        key: tuple = self.key(task, bounds, group_orderings)
+        turn_table: TurnTable = self.turn_tables.get(key)
+        if turn_table is not None:
+            self.hits += 1
+            self.turn_tables.move_to_end(key)
+            return turn_table
+        self.misses += 1
+
+        turn_cache: PossibleTurnsCache = None
+        if self.turn_cache_entries > 0:
+            turn_cache = PossibleTurnsCache(self.turn_cache_entries)
+        turn_table = TurnTable(task.available_commands, task.commands_per_turn, bounds, turn_cache, group_orderings)
+        self.turn_tables[key] = turn_table
+        while len(self.turn_tables) > self.max_tables:
+            self.turn_tables.popitem(last=False)
+        return turn_table
+
+
+class PolledEvent:
+    """
+    Wraps an event shared with another process, which takes a round trip to that process to check, so that it's only
+    checked once every poll_interval seconds, however often the search asks if it's been cancelled.
+    """
+
+    def __init__(self, event, poll_interval: float = CANCEL_POLL_INTERVAL):
+        self.event = event
+        self.poll_interval: float = poll_interval
+        self.last_poll_time: float = 0.0
+        self.was_set: bool = False
+
+    def set(self) -> None:
+        self.event.set()
+        self.was_set = True
+
+    def is_set(self) -> bool:
+        if not self.was_set and time.monotonic() - self.last_poll_time >= self.poll_interval:
+            self.last_poll_time = time.monotonic()
+            self.was_set = self.event.is_set()
+        return self.was_set
+
+
+def solve_request(request: dict[str, any], control: SearchControl, registry: TurnTableRegistry) -> dict[str, any]:
+    """
+    Solves a single request, using the TurnTable of its task from the registry. The routes are returned as the bytes of
+    a CompactRoutes, so that they're sent back from a worker process as compactly as they're kept.
+    """
+    task: Task = task_from_json(request.get("task"))
+    options: dict[str, any] = request.get("options", {})
+    search_mode: str = options.get("search_mode", DEPTH_FIRST)
+    prune: bool = bool(options.get("prune", True))
+    workers: int = int(options.get("workers", 1))
+    max_routes: int = options.get("max_routes")
+    turn_table: TurnTable = registry.get(task, bool(options.get("group_orderings", False)))
+
+    start_time: float = time.perf_counter()
+    routes_found: int = 0
+    routes: CompactRoutes = CompactRoutes(task)
+    for route in solve(task, search_mode, prune, workers=workers, control=control, turn_table=turn_table):
+        routes_found += 1
+        if max_routes is None or len(routes) < max_routes:
+            routes.append(route)
+
+    return {"task": task.name,
+            "routes_found": routes_found,
+            "routes": routes.to_bytes(),
+            "seconds": round(time.perf_counter() - start_time, 3),
+            "cancelled": control.is_cancelled()}
+
+
+# The TurnTableRegistry of the current worker process
+worker_registry: TurnTableRegistry = None
+
+
+def initialise_worker(max_turn_tables: int, turn_cache_entries: int) -> None:
+    """
+    Runs once in every worker process of a SolveService.
+    """
+    global worker_registry
+    # Forked worker processes would otherwise all draw the same random Heat gains
+    random.seed()
+    worker_registry = TurnTableRegistry(max_turn_tables, turn_cache_entries)
+
+
+def solve_in_worker(request: dict[str, any], cancel_event) -> dict[str, any]:
+    """
+    Runs in a worker process of a SolveService, for each request. Whatever goes wrong with the request is sent back as
+    its result, instead of being lost in the worker process.
+    """
+    try:
+        return solve_request(request, SearchControl(cancel_event=PolledEvent(cancel_event)), worker_registry)
+    except Exception as error:
+        return {"error": str(error)}
+
+
+class SolveService:
+    """
+    Solves the requests it's given on a pool of worker processes, and writes each result to the output as soon as it's
+    done. Every request has its own SearchControl, whose event is shared with the worker process through a manager, so
+    that it can be cancelled while pending or running.
+    """
+
+    def __init__(self, output: TextIO, workers: int = WORKERS, max_turn_tables: int = MAX_TURN_TABLES,
+                 turn_cache_entries: int = TURN_CACHE_ENTRIES):
+        self.output: TextIO = output
+        self.output_lock: threading.Lock = threading.Lock()
+        self.manager = multiprocessing.Manager()
+        self.executor: ProcessPoolExecutor = ProcessPoolExecutor(max_workers=workers, initializer=initialise_worker,
+                                                                 initargs=(max_turn_tables, turn_cache_entries))
+        self.controls: dict[any, SearchControl] = {}
+        self.controls_lock: threading.Lock = threading.Lock()
+
+    def handle_line(self, line: str) -> None:
+        """
+        Handles a single request line, by either cancelling a request or scheduling a new one.
+        """
+        try:
+            request: any = json.loads(line)
+        except json.JSONDecodeError as error:
+            self.write({"id": None, "error": f"Request is not valid JSON: {error}"})
+            return
+        if not isinstance(request, dict):
+            self.write({"id": None, "error": "Expected a request object"})
+            return
+
+        request_id: any = request.get("id")
+        if not isinstance(request_id, (str, int)):
+            self.write({"id": None, "error": "Every request needs a string or integer id"})
+            return
+        if request.get("cancel"):
+            with self.controls_lock:
+                control: SearchControl = self.controls.get(request_id)
+            if control is not None:
+                control.cancel()
+            return
+
+        with self.controls_lock:
+            if request_id in self.controls:
+                self.write({"id": request_id, "error": "A request with this id is already being solved"})
+                return
+            control: SearchControl = SearchControl(cancel_event=self.manager.Event())
+            self.controls[request_id] = control
+        future: Future = self.executor.submit(solve_in_worker, request, control.cancel_event)
+        future.add_done_callback(lambda done: self.finish_request(request_id, request, done))
+
+    def finish_request(self, request_id: any, request: dict[str, any], future: Future) -> None:
+        """
+        Writes the result of a request once its worker process is done with it.
+        """
+        try:
+            result: dict[str, any] = {"id": request_id, **future.result()}
+            if "routes" in result:
+                # The routes are kept compact, and only materialised one by one as they're written
+                routes: CompactRoutes = CompactRoutes.from_bytes(task_from_json(request["task"]), *result["routes"])
+                result["routes"] = (route_to_json(route) for route in routes)
+        # Such as the worker process dying
+        except Exception as error:
+            result: dict[str, any] = {"id": request_id, "error": str(error)}
+        finally:
+            with self.controls_lock:
+                self.controls.pop(request_id, None)
+        self.write(result)
+
+    def write(self, result: dict[str, any]) -> None:
+        with self.output_lock:
+            write_json_line(self.output, result)
+            self.output.flush()
+
+    def run(self, requests: TextIO) -> None:
+        """
+        Handles every request line until the input ends, and then waits for the scheduled requests to finish.
+        """
+        for line in requests:
+            if line.strip():
+                self.handle_line(line)
+        self.executor.shutdown(wait=True)
+        self.manager.shutdown()
+
+
+def main(arguments: list[str] = None) -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Solves tasks sent as JSON lines on the standard input, writing each result as a JSON line.")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="The amount of worker processes solving requests at once")
+    parser.add_argument("--max-turn-tables", type=int, default=MAX_TURN_TABLES,
+                        help="The most compiled turn tables each worker process keeps for reuse")
+    parser.add_argument("--turn-cache-entries", type=int, default=TURN_CACHE_ENTRIES,
+                        help="The most states each turn table caches the possible turns of, 0 to disable the caches")
+    options: argparse.Namespace = parser.parse_args(arguments)
+
+    service: SolveService = SolveService(sys.stdout, options.workers, options.max_turn_tables,
+                                         options.turn_cache_entries)
+    service.run(sys.stdin)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
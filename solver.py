@@ -0,0 +1,156 @@
+from typing import Iterator
+
+from task_calculator import search_routes, SearchControl, DEPTH_FIRST
+from data_structure import Command, Route, BaseResource, PossibleTurnsCache, TurnTable, REGULAR_RESOURCE_NAMES, \
+    SPECIAL_RESOURCE_NAMES, Comms, Navs, Data, Heat, Drift, Thrust, Power, Crew
+
+
+class Task:
+    """
+    Everything needed to calculate the routes of a task: the available commands, the starting resources, the amount
+    of turns, the amount of commands per turn and the objective. The name is only used to tell tasks apart.
+    """
+
+    def __init__(self, available_commands: dict[str, Command], starting_resources: dict[str, type(BaseResource)],
+                 amount_of_turns: int, commands_per_turn: int, objective: dict[str, type(BaseResource)],
+                 name: str = ""):
+        self.name: str = name
+        self.available_commands: dict[str, Command] = available_commands
+        self.starting_resources: dict[str, type(BaseResource)] = starting_resources
+        self.amount_of_turns: int = amount_of_turns
+        self.commands_per_turn: int = commands_per_turn
+        self.objective: dict[str, type(BaseResource)] = objective
+
+    def __repr__(self):
+        return f"Task({self.name!r}, {list(self.available_commands)}, {self.amount_of_turns} turns, " \
+               f"{self.commands_per_turn} commands per turn)"
+
+    def search_arguments(self) -> dict[str, any]:
+        """
+        Returns the task as the keyword arguments of search_routes and calculator.
+        """
+        return {"available_commands": self.available_commands,
+                "starting_resources": self.starting_resources,
+                "amount_of_turns": self.amount_of_turns,
+                "commands_per_turn": self.commands_per_turn,
+                "objective": self.objective}
+
+
+def solve(task: Task, search_mode: str = DEPTH_FIRST, prune: bool = True, turn_cache: PossibleTurnsCache = None,
+          group_orderings: bool = False, workers: int = 1, shard_turns: int = 1,
+          control: SearchControl = None, turn_table: TurnTable = None, memory_budget: int = None) -> Iterator[Route]:
+    """
+    Returns an iterator over every route of the task which satisfies the objective, without needing a GUI.
+    Progress is reported to the control's progress_callback, and cancelling the control from any thread stops the
+    search, which simply ends the iterator. See search_routes for the search options.
+    Nothing on this path imports Qt, so it can be used from scripts, batch jobs and tests.
+    """
+    return search_routes(**task.search_arguments(), search_mode=search_mode, prune=prune, turn_cache=turn_cache,
+                         group_orderings=group_orderings, workers=workers, shard_turns=shard_turns, control=control,
+                         turn_table=turn_table, memory_budget=memory_budget)
+
+
+def debug_task() -> Task:
+    """
+    The task calculated by main.py while DEBUG is enabled.
+    """
+    task_arguments: dict[str, any] = {
+        "available_commands": {
+            "Power to comms": Command("Power to comms",
+                                      {
+                                          REGULAR_RESOURCE_NAMES["power"]: Power(value=1),
+                                      },
+                                      {
+                                          REGULAR_RESOURCE_NAMES["comms"]: Comms(value=2)
+                                      }
+                                      ),
+
+            "Comms and power to navs": Command("Comms and power to navs",
+                                               {
+                                                   REGULAR_RESOURCE_NAMES["comms"]: Comms(value=2),
+                                                   REGULAR_RESOURCE_NAMES["power"]: Power(value=1)
+                                               },
+                                               {
+                                                   REGULAR_RESOURCE_NAMES["navs"]: Navs(value=5)
+                                               }
+                                               ),
+
+            "Navs to data and comms": Command("Navs to data and comms",
+                                              {
+                                                  REGULAR_RESOURCE_NAMES["navs"]: Navs(value=3)
+                                              },
+                                              {
+                                                  REGULAR_RESOURCE_NAMES["data"]: Data(value=2),
+                                                  REGULAR_RESOURCE_NAMES["comms"]: Comms(value=2)
+                                              }
+                                              ),
+            "Heat to power": Command("Heat to power",
+                                     {
+                                         SPECIAL_RESOURCE_NAMES["heat"]: Heat(4, 1, 3, value=2)
+                                     },
+                                     {
+                                         REGULAR_RESOURCE_NAMES["power"]: Data(value=2)
+                                     }
+                                     ),
+            "Crew and data to navs": Command("Crew and data to navs",
+                                             {
+                                                 SPECIAL_RESOURCE_NAMES["crew"]: Navs(value=2),
+                                                 REGULAR_RESOURCE_NAMES["data"]: Data(value=2)
+                                             },
+                                             {
+                                                 REGULAR_RESOURCE_NAMES["navs"]: Navs(value=8)
+                                             }
+                                             ),
+            "Drift to data": Command("Drift to data",
+                                     {
+                                         SPECIAL_RESOURCE_NAMES["drift"]: Drift([-2, 2], -4, 4, value=-1)
+                                     },
+                                     {
+                                         REGULAR_RESOURCE_NAMES["data"]: Data(value=3)
+                                     }
+                                     ),
+            "Power to thrust and drift": Command("Power to thrust and drift",
+                                                 {
+                                                     REGULAR_RESOURCE_NAMES["power"]: Power(value=2)
+                                                 },
+                                                 {
+                                                     SPECIAL_RESOURCE_NAMES["thrust"]: Thrust(4, value=1),
+                                                     SPECIAL_RESOURCE_NAMES["drift"]: Drift([-2, 2], -4, 4,
+                                                                                            value=1)
+                                                 }
+                                                 )
+        },
+        "starting_resources": {
+            REGULAR_RESOURCE_NAMES["comms"]: Comms(value=1),
+            REGULAR_RESOURCE_NAMES["navs"]: Navs(),
+            REGULAR_RESOURCE_NAMES["data"]: Data(),
+            REGULAR_RESOURCE_NAMES["power"]: Power(value=10),
+
+            SPECIAL_RESOURCE_NAMES["heat"]: Heat(4, 1, 3, 2),
+            SPECIAL_RESOURCE_NAMES["crew"]: Crew(2),
+            SPECIAL_RESOURCE_NAMES["drift"]: Drift([-2, 2], -4, 4, value=2),
+            SPECIAL_RESOURCE_NAMES["thrust"]: Thrust(4, value=3)
+        },
+        "amount_of_turns": 2,
+        "commands_per_turn": 3,
+        "objective": {
+            REGULAR_RESOURCE_NAMES["comms"]: Comms(value=7),
+            REGULAR_RESOURCE_NAMES["navs"]: Navs(value=7)
+        }
+    }
+    return Task(**task_arguments, name="Debug task")
+
+
+def optimistic_heat_task(task: Task) -> Task:
+    """
+    Returns a copy of the task where Heat always gains its minimum amount at the end of each turn, so that searching it
+    finds the routes which don't overheat with the best luck, the same every time.
+    Routes that only work because Heat gained more than its minimum, to pay for a command using Heat, aren't found.
+    """
+    starting_resources: dict = dict(task.starting_resources)
+    for resource_name, resource in task.starting_resources.items():
+        if isinstance(resource, Heat):
+            starting_resources[resource_name] = Heat(resource.overheat_limit, resource.min_random_increase,
+                                                     resource.min_random_increase, value=resource.value)
+    return Task(task.available_commands, starting_resources, task.amount_of_turns, task.commands_per_turn,
+                task.objective, task.name)
@@ -1,69 +1,731 @@
-from data_structure import Command, Turn, Route, BaseResource
-from PyQt5.Qt import QMainWindow, QApplication
+import random
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Optional
+
+from route_store import RouteEncoder, RouteList
+from data_structure import Command, Turn, Route, TurnTable, PossibleTurnsCache, StateGraph, RoutePruner, \
+    BaseResource, compile_objective, state_satisfies_objective
+
+# The different ways calculator can search through the routes
+BREADTH_FIRST: str = "breadth_first"
+STREAMING: str = "streaming"
+DEPTH_FIRST: str = "depth_first"
+STATE_GRAPH: str = "state_graph"
+SEARCH_MODES: tuple[str, ...] = (BREADTH_FIRST, STREAMING, DEPTH_FIRST, STATE_GRAPH)
+
+
+class LevelStats:
+    """
+    What the search did from the routes (or states) of a single amount of turns completed: how many of them were
+    expanded (the frontier), how many of the turns possible from them were accepted into a longer route or rejected,
+    by the pruner or as invalid, how many turn cache hits expanding them had, and how many seconds it took.
+    """
+
+    def __init__(self):
+        self.frontier: int = 0
+        self.accepted: int = 0
+        self.rejected: int = 0
+        self.cache_hits: int = 0
+        self.seconds: float = 0.0
+
+    def __repr__(self) -> str:
+        output = f"LevelStats(frontier={self.frontier}, generated={self.generated}, rejected={self.rejected}, " \
+                 f"accepted={self.accepted}, cache_hits={self.cache_hits}, seconds={self.seconds:.3f})"
+        return output
+
+    @property
+    def generated(self) -> int:
+        return self.accepted + self.rejected
+
+    def branching_factor(self) -> float:
+        """
+        The average amount of turns accepted per route expanded.
+        """
+        return self.accepted / self.frontier
+
+    def add(self, other: type(__name__)) -> None:
+        self.frontier += other.frontier
+        self.accepted += other.accepted
+        self.rejected += other.rejected
+        self.cache_hits += other.cache_hits
+        self.seconds += other.seconds
+
+
+class SearchStats:
+    """
+    Counts what a search does per level, that is, per amount of turns completed by the routes being expanded, so that
+    the level which blows up can be seen while the search is still running. Searches only keep these counts when given
+    a SearchControl with a SearchStats, so they cost nothing otherwise.
+    The time between two routes being expanded is added to the level of the first of them, and so are the turn cache
+    hits in between. If a callback is given, it's called with the stats no more than once every interval seconds, and
+    once more when the search is done.
+    """
+
+    def __init__(self, callback: Callable[[type(__name__)], None] = None, interval: float = 0.5):
+        self.callback: Callable[[SearchStats], None] = callback
+        self.interval: float = interval
+        self.levels: list[LevelStats] = []
+        self.turn_cache: PossibleTurnsCache = None
+        self.start_time: float = 0.0
+        self.end_time: float = None
+        self.last_time: float = 0.0
+        self.last_report_time: float = 0.0
+        self.last_cache_hits: int = 0
+        self.current_level: int = 0
+
+    def __repr__(self) -> str:
+        output = f"SearchStats({self.levels})"
+        return output
+
+    def start(self, amount_of_turns: int, turn_cache: PossibleTurnsCache = None) -> None:
+        self.levels = [LevelStats() for _ in range(amount_of_turns)]
+        self.turn_cache = turn_cache
+        self.start_time = self.last_time = self.last_report_time = time.perf_counter()
+        self.end_time = None
+        self.last_cache_hits = 0 if turn_cache is None else turn_cache.hits
+        self.current_level = 0
+
+    def expand(self, level: int) -> None:
+        """
+        Records a route of the given amount of turns being expanded.
+        """
+        now: float = self.update()
+        self.current_level = level
+        self.levels[level].frontier += 1
+        if self.callback is not None and now - self.last_report_time >= self.interval:
+            self.last_report_time = now
+            self.callback(self)
+
+    def accept(self, level: int) -> None:
+        self.levels[level].accepted += 1
+
+    def reject(self, level: int) -> None:
+        self.levels[level].rejected += 1
+
+    def merge(self, levels: list[LevelStats]) -> None:
+        """
+        Adds the stats of a part of the search done elsewhere, like in a worker process, whose turn cache hits have
+        been (or will be) added to turn_cache's. The time spent waiting for it isn't added to any level.
+        """
+        for level, level_stats in enumerate(levels):
+            self.levels[level].add(level_stats)
+            self.last_cache_hits += level_stats.cache_hits
+        self.last_time = time.perf_counter()
+
+    def update(self) -> float:
+        """
+        Adds the time and turn cache hits since the last update to the current level, and returns the current time.
+        """
+        now: float = time.perf_counter()
+        if self.levels:
+            self.levels[self.current_level].seconds += now - self.last_time
+            if self.turn_cache is not None:
+                self.levels[self.current_level].cache_hits += self.turn_cache.hits - self.last_cache_hits
+        self.last_time = now
+        if self.turn_cache is not None:
+            self.last_cache_hits = self.turn_cache.hits
+        return now
+
+    def finish(self) -> None:
+        self.end_time = self.update()
+        if self.callback is not None:
+            self.callback(self)
+
+    @property
+    def routes_expanded(self) -> int:
+        return sum(level_stats.frontier for level_stats in self.levels)
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return (time.perf_counter() if self.end_time is None else self.end_time) - self.start_time
+
+    def estimate_routes_expanded(self) -> float:
+        """
+        Estimates how many routes the whole search will expand, from the branching factor seen so far on each level.
+        Levels that haven't been reached yet are assumed to branch like the deepest one that has. The estimate is never
+        below what has already been expanded on each level.
+        """
+        routes: float = 1.0
+        branching_factor: float = None
+        estimate: float = 0.0
+        for level_stats in self.levels:
+            routes = max(routes, level_stats.frontier)
+            estimate += routes
+            if level_stats.frontier > 0:
+                branching_factor = level_stats.branching_factor()
+            if branching_factor is None:
+                break
+            routes *= branching_factor
+        return estimate
+
+    def estimate_remaining_seconds(self) -> Optional[float]:
+        """
+        Estimates how many seconds are left of the search, from how long the routes expanded so far took on average,
+        or returns None if nothing has been expanded yet.
+        """
+        if self.end_time is not None:
+            return 0.0
+        routes_expanded: int = self.routes_expanded
+        if routes_expanded == 0:
+            return None
+        remaining_routes: float = max(0.0, self.estimate_routes_expanded() - routes_expanded)
+        return remaining_routes * self.elapsed_seconds / routes_expanded
+
+    def summary(self) -> str:
+        """
+        A table of every level's stats, one line per level.
+        """
+        lines: list[str] = [f"{'Level':>5}{'Frontier':>12}{'Generated':>12}{'Rejected':>12}{'Accepted':>12}"
+                            f"{'Cache hits':>12}{'Seconds':>10}"]
+        for level, level_stats in enumerate(self.levels):
+            lines.append(f"{level:>5}{level_stats.frontier:>12}{level_stats.generated:>12}{level_stats.rejected:>12}"
+                         f"{level_stats.accepted:>12}{level_stats.cache_hits:>12}{level_stats.seconds:>10.3f}")
+        return "\n".join(lines)
+
+
+class SearchControl:
+    """
+    Lets a search running on one thread be cancelled from another, through a thread-safe event, and reports the
+    search's progress to a callback no more than once every progress_interval seconds.
+    It also counts how many routes (or states, in the state graph search mode) the search has expanded, that is, found
+    the possible turns from, and keeps the search's SearchStats if it's given one.
+    """
+
+    def __init__(self, progress_callback: Callable[[str], None] = None, progress_interval: float = 0.1,
+                 cancel_event=None, stats: SearchStats = None):
+        self.cancel_event = threading.Event() if cancel_event is None else cancel_event
+        self.progress_callback: Callable[[str], None] = progress_callback
+        self.progress_interval: float = progress_interval
+        self.last_progress_time: float = 0.0
+        self.routes_expanded: int = 0
+        self.stats: SearchStats = stats
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def expand(self, level: int) -> None:
+        """
+        Records a route of the given amount of turns being expanded.
+        """
+        self.routes_expanded += 1
+        if self.stats is not None:
+            self.stats.expand(level)
+
+    def progress_due(self) -> bool:
+        """
+        Checks if enough time has passed since the last progress report for a new one to be sent.
+        """
+        return self.progress_callback is not None and \
+            time.monotonic() - self.last_progress_time >= self.progress_interval
+
+    def report_progress(self, message: str) -> None:
+        self.last_progress_time = time.monotonic()
+        if self.progress_callback is not None:
+            self.progress_callback(message)
 
 
 def calculator(available_commands: dict[str, Command], starting_resources: dict[str, type(BaseResource)],
                amount_of_turns: int, commands_per_turn: int, objective: dict[str, type(BaseResource)],
-               gui: type(QMainWindow)) -> None:
+               gui: any, search_mode: str = BREADTH_FIRST,
+               route_callback: Callable[[Route], None] = None, prune: bool = False,
+               turn_cache: PossibleTurnsCache = None, group_orderings: bool = False, workers: int = 1,
+               shard_turns: int = 1, control: SearchControl = None, memory_budget: int = None) -> None:
+    """
+    Finds every route of the given amount of turns that satisfies the objective through search_routes, and presents
+    them through the gui, which can be any object with a present_results and a present_route function.
+    With the breadth first search mode, the resulting list of routes is given to gui.present_results. With a
+    memory_budget, it's a RouteList instead, which may keep the routes on disk, and is closed once
+    gui.present_results returns.
+    With every other search mode, or with more than one worker, every valid route is given to route_callback
+    (gui.present_route by default) as soon as it's found, and gui.present_results is called without any routes at the
+    end. Routes can be ranked by how close they are to failing with route_ranking.
+    """
+    if control is None:
+        control = SearchControl()
+    routes: Iterator[Route] = search_routes(available_commands, starting_resources, amount_of_turns,
+                                            commands_per_turn, objective, search_mode, prune, turn_cache,
+                                            group_orderings, workers, shard_turns, control,
+                                            memory_budget=memory_budget)
+
+    if search_mode == BREADTH_FIRST and workers <= 1:
+        if memory_budget is None:
+            gui.present_results(list(routes))
+            return
+        empty_route: Route = Route(starting_resources, amount_of_turns)
+        route_list: RouteList = RouteList(RouteEncoder(empty_route, available_commands, commands_per_turn),
+                                          memory_budget)
+        try:
+            route_list.extend(routes)
+            gui.present_results(route_list)
+        finally:
+            route_list.close()
+        return
+
+    if route_callback is None:
+        route_callback = gui.present_route
+    present_routes(routes, route_callback, control)
+    gui.present_results(None)
+
+
+def search_routes(available_commands: dict[str, Command], starting_resources: dict[str, type(BaseResource)],
+                  amount_of_turns: int, commands_per_turn: int, objective: dict[str, type(BaseResource)],
+                  search_mode: str = BREADTH_FIRST, prune: bool = False, turn_cache: PossibleTurnsCache = None,
+                  group_orderings: bool = False, workers: int = 1, shard_turns: int = 1,
+                  control: SearchControl = None, turn_table: TurnTable = None,
+                  memory_budget: int = None) -> Iterator[Route]:
     """
-    TODO: Fill this description and comment/typehint this function
-    TODO: Find a way to rank the different routes based on how close they are to failing if a command fails
+    Returns an iterator over every route of the given amount of turns that satisfies the objective. The search stops
+    early if the given SearchControl is cancelled, and its progress is reported through it.
+    With the breadth first search mode, every route of a turn is found before moving on to the next turn, so nothing is
+    yielded before the whole search is done. With a memory_budget, the routes of each turn are kept in a RouteList,
+    which moves them into a RouteStore on disk once they're estimated to take up more than memory_budget bytes, so that
+    tasks with more routes than fit in memory still finish, only slower.
+    With the streaming search mode, routes are generated one by one through a chain of generators, and every valid
+    route is yielded as soon as it's found. Nothing is kept in memory apart from the routes currently being expanded.
+    The depth first search mode yields its routes the same way as the streaming one, but walks the routes with a
+    single stack of turns instead, so memory only depends on the amount of turns.
+    The state graph search mode also yields its routes one by one, but merges every route reaching the same state
+    after the same amount of turns into a single node of a StateGraph, so each distinct state is only expanded once.
+    Since Heat gains a random amount at the end of each turn, the random amount is then drawn once per distinct state
+    and turn, rather than once per route.
+    With prune enabled, every search mode uses a RoutePruner to cut routes as soon as they can no longer satisfy the
+    objective or the end of route criteria of Drift and Thrust, which are then also enforced on the finished routes.
+    If a turn_cache is given, the turns possible from each state are cached in it. It must be empty, or have been
+    used for the exact same available commands, commands per turn and starting resources before.
+    With group_orderings enabled, the possible orderings of the same commands in a turn are yielded as a single turn,
+    so a route stands for every combination of the orderings of its turns.
+    With more than one worker, the routes of the first shard_turns turns are found here, and the rest of the search
+    from each of them is sent to a pool of worker processes, which search their part depth first. The routes are
+    yielded as each worker's part is done. Each worker process has its own turn cache (with the same limits as
+    turn_cache), and their hits and misses are added to turn_cache's.
+    A turn_table already compiled for the same available commands, commands per turn and resource bounds can be given
+    to share it (and its cache) between searches, in which case turn_cache and group_orderings are taken from it.
+    If the control has a SearchStats, it's started when the search starts, counts what the search does per turn, and
+    is finished once the search is done.
+    Invalid search options raise a ValueError right away, rather than once the iterator is first used.
+    """
+    if search_mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode {search_mode}, expected one of {SEARCH_MODES}")
+    if workers > 1 and search_mode == STATE_GRAPH:
+        raise ValueError("The state graph search mode can't be split between worker processes")
+    if control is None:
+        control = SearchControl()
+
+    empty_route: Route = Route(starting_resources, amount_of_turns)
+
+    # Every permutation of commands is compiled once, and reused for every route on every turn
+    if turn_table is None:
+        turn_table = TurnTable(available_commands, commands_per_turn, empty_route.bounds, turn_cache, group_orderings)
+
+    pruner: RoutePruner = RoutePruner(turn_table, objective, amount_of_turns) if prune else None
+
+    if workers > 1:
+        task_arguments: dict[str, any] = {"available_commands": available_commands,
+                                          "starting_resources": starting_resources,
+                                          "amount_of_turns": amount_of_turns,
+                                          "commands_per_turn": commands_per_turn,
+                                          "objective": objective}
+        search_options: dict[str, any] = {"prune": prune,
+                                          "group_orderings": turn_table.group_orderings,
+                                          "turn_cache": turn_cache,
+                                          "stats": control.stats is not None}
+        routes: Iterator[Route] = iterate_parallel_routes(task_arguments, search_options, control, turn_table, pruner,
+                                                          workers, shard_turns)
+    elif search_mode == STREAMING:
+        routes: Iterator[Route] = iterate_valid_routes(empty_route, amount_of_turns, objective, control, turn_table,
+                                                       pruner)
+    elif search_mode == DEPTH_FIRST:
+        routes: Iterator[Route] = iterate_depth_first_routes(empty_route, amount_of_turns, objective, control,
+                                                             turn_table, pruner)
+    elif search_mode == STATE_GRAPH:
+        routes: Iterator[Route] = iterate_state_graph_routes(empty_route, amount_of_turns, objective, control,
+                                                             turn_table, pruner)
+    else:
+        routes: Iterator[Route] = iterate_breadth_first_routes(empty_route, amount_of_turns, objective, control,
+                                                               turn_table, pruner, memory_budget)
+
+    if control.stats is not None:
+        return iterate_with_stats(routes, control.stats, amount_of_turns, turn_table.cache)
+    return routes
+
+
+def iterate_with_stats(routes: Iterator[Route], stats: SearchStats, amount_of_turns: int,
+                       turn_cache: PossibleTurnsCache) -> Iterator[Route]:
+    """
+    Starts the stats when the search starts, and finishes them when it's done or closed early.
+    """
+    stats.start(amount_of_turns, turn_cache)
+    try:
+        yield from routes
+    finally:
+        stats.finish()
+
+
+def iterate_breadth_first_routes(empty_route: Route, amount_of_turns: int, objective: dict[str, type(BaseResource)],
+                                 control: SearchControl, turn_table: TurnTable, pruner: RoutePruner = None,
+                                 memory_budget: int = None) -> Iterator[Route]:
+    """
+    Finds every valid route of a turn before moving on to the next turn, and then yields the finished routes which
+    satisfy the objective. The routes of each turn are kept in a list, or in a RouteList if there's a memory_budget,
+    which is closed once the routes of the next turn have been found from it.
     """
     starting_routes: list[Route] = []
 
     # Fill the starting routes list with possible routes from the get-go
-    empty_route: Route = Route(starting_resources, amount_of_turns)
-    possible_turns_from_empty_route: list[Turn] = empty_route.get_possible_turns(available_commands, commands_per_turn)
+    stats: SearchStats = control.stats
+    control.expand(0)
+    possible_turns_from_empty_route: list[Turn] = \
+        empty_route.get_possible_turns(turn_table.available_commands, turn_table.commands_per_turn, turn_table)
     for possible_turn in possible_turns_from_empty_route:
-        QApplication.processEvents()
-        starting_routes.append(Route(starting_resources, amount_of_turns))
-        valid = starting_routes[-1].append(possible_turn)
-        if not valid:
-            starting_routes.pop()
+        if pruner is not None and not pruner.can_succeed(possible_turn.state, 1):
+            if stats is not None:
+                stats.reject(0)
+            continue
+        starting_route: Route = empty_route.extend(possible_turn)
+        if starting_route.is_valid():
+            starting_routes.append(starting_route)
+            if stats is not None:
+                stats.accept(0)
+        elif stats is not None:
+            stats.reject(0)
 
-    valid_routes: list[Route] = starting_routes
-    for turn in range(2, amount_of_turns + 1, 1):
-        QApplication.processEvents()
-        valid_routes = get_next_turn_routes(valid_routes, available_commands, commands_per_turn, gui)
+    encoder: RouteEncoder = None
+    if memory_budget is not None:
+        encoder = RouteEncoder(empty_route, turn_table.available_commands, turn_table.commands_per_turn)
 
-    valid_routes: list[Route] = filter_by_objective(valid_routes, objective, gui)
+    valid_routes: list[Route] | RouteList = starting_routes
+    if encoder is not None:
+        valid_routes = RouteList(encoder, memory_budget)
+        valid_routes.extend(starting_routes)
+        del starting_routes
+    try:
+        for turn in range(2, amount_of_turns + 1, 1):
+            if control.progress_due():
+                control.report_progress(f"Turn {turn} of {amount_of_turns}, from {len(valid_routes)} routes")
+            if encoder is None:
+                valid_routes = get_next_turn_routes(valid_routes, turn_table.available_commands,
+                                                    turn_table.commands_per_turn, control, turn_table, pruner)
+                continue
+            # The routes of this turn are kept until the next turn's have all been found
+            next_routes: RouteList = RouteList(encoder, memory_budget, valid_routes.memory_bytes)
+            try:
+                next_routes.extend(iterate_next_turn_routes(valid_routes, control, turn_table, pruner))
+            finally:
+                if isinstance(valid_routes, RouteList):
+                    valid_routes.close()
+                valid_routes = next_routes
 
-    gui.present_results(valid_routes)
+        finished_routes: Iterable[Route] = valid_routes
+        if isinstance(valid_routes, RouteList):
+            # Routes kept on disk which don't satisfy the objective aren't materialised at all
+            finished_routes = valid_routes.iterate(compile_objective(objective))
+        yield from iterate_by_objective(finished_routes, objective, control)
+    finally:
+        if isinstance(valid_routes, RouteList):
+            valid_routes.close()
 
 
-def filter_by_objective(valid_routes: list[Route], objective: dict[str, type(BaseResource)], gui: type(QMainWindow)) -> list[Route]:
+def present_routes(routes: Iterable[Route], route_callback: Callable[[Route], None], control: SearchControl) -> None:
     """
-    # TODO: Fill this description and comment/typehint this function
+    Gives every route to the route_callback, and reports how many have been found so far through the control.
     """
-    output: list[Route] = []
+    routes_found: int = 0
+    for route in routes:
+        route_callback(route)
+        routes_found += 1
+        if control.progress_due():
+            control.report_progress(f"Found: {routes_found}")
 
-    for route in valid_routes:
-        QApplication.processEvents()
-        if not gui.continue_calculating:
+
+def iterate_valid_routes(empty_route: Route, amount_of_turns: int, objective: dict[str, type(BaseResource)],
+                         control: SearchControl, turn_table: TurnTable, pruner: RoutePruner = None) -> Iterator[Route]:
+    """
+    Chains one iterate_next_turn_routes generator per turn, starting with the empty route, and filters the result
+    by the objective. Routes are only generated when the one consuming this generator asks for the next one, so at most
+    one route per turn is being expanded at any time.
+    """
+    routes: Iterator[Route] = iter([empty_route])
+    for turn in range(1, amount_of_turns + 1, 1):
+        routes = iterate_next_turn_routes(routes, control, turn_table, pruner)
+    return iterate_by_objective(routes, objective, control)
+
+
+def iterate_depth_first_routes(starting_route: Route, amount_of_turns: int, objective: dict[str, type(BaseResource)],
+                               control: SearchControl, turn_table: TurnTable,
+                               pruner: RoutePruner = None) -> Iterator[Route]:
+    """
+    Walks the tree of routes starting with the given route (usually the empty one) depth first, and yields every
+    finished route which satisfies the objective.
+    Only the current route and each of its shorter versions are kept, on a stack along with the possible turns still
+    left to try after each of them. Going deeper pushes the route extended by a turn onto the stack, and backtracking
+    pops it off again.
+    """
+    compiled_objective: tuple[tuple[int, int], ...] = compile_objective(objective)
+
+    stats: SearchStats = control.stats
+
+    current_routes: list[Route] = [starting_route]
+    remaining_turns: list[Iterator[Turn]] = [turn_table.iterate_possible_turns(starting_route.state)]
+    control.expand(len(starting_route))
+    while remaining_turns:
+        if control.is_cancelled():
             break
-        if route.satisfies_objective(objective):
-            output.append(route)
 
-    return output
+        next_turn: Turn = next(remaining_turns[-1], None)
+
+        # Every possible turn from here has been tried, so backtrack
+        if next_turn is None:
+            remaining_turns.pop()
+            current_routes.pop()
+            continue
+
+        # Don't go any deeper if the route can't be finished successfully anyway
+        turns_completed: int = len(current_routes[-1]) + 1
+        if pruner is not None and not pruner.can_succeed(next_turn.state, turns_completed):
+            if stats is not None:
+                stats.reject(turns_completed - 1)
+            continue
+        if stats is not None:
+            stats.accept(turns_completed - 1)
+
+        # If the route would be finished with this turn, check it against the objective instead of going deeper
+        if turns_completed >= amount_of_turns:
+            if state_satisfies_objective(next_turn.state, compiled_objective):
+                yield current_routes[-1].extend(next_turn)
+        else:
+            current_routes.append(current_routes[-1].extend(next_turn))
+            remaining_turns.append(turn_table.iterate_possible_turns(next_turn.state))
+            control.expand(turns_completed)
+
+
+def build_state_graph(empty_route: Route, amount_of_turns: int, control: SearchControl,
+                      turn_table: TurnTable, pruner: RoutePruner = None) -> StateGraph:
+    """
+    Expands every distinct state of each turn once, level by level, into a StateGraph.
+    """
+    stats: SearchStats = control.stats
+    state_graph: StateGraph = StateGraph(empty_route)
+    for turn in range(1, amount_of_turns + 1, 1):
+        state_graph.add_level()
+        for node in state_graph.levels[-2].values():
+            if control.is_cancelled():
+                return state_graph
+            control.expand(turn - 1)
+            for possible_turn in turn_table.iterate_possible_turns(node.state):
+                if pruner is not None and not pruner.can_succeed(possible_turn.state, turn):
+                    if stats is not None:
+                        stats.reject(turn - 1)
+                    continue
+                state_graph.add_turn(node, possible_turn)
+                if stats is not None:
+                    stats.accept(turn - 1)
+    return state_graph
+
+
+def iterate_state_graph_routes(empty_route: Route, amount_of_turns: int, objective: dict[str, type(BaseResource)],
+                               control: SearchControl, turn_table: TurnTable,
+                               pruner: RoutePruner = None) -> Iterator[Route]:
+    """
+    Builds the StateGraph of the task, and yields every route leading to a final state which satisfies the objective.
+    """
+    state_graph: StateGraph = build_state_graph(empty_route, amount_of_turns, control, turn_table, pruner)
+    if len(state_graph) < amount_of_turns:
+        return
+
+    compiled_objective: tuple[tuple[int, int], ...] = compile_objective(objective)
+    for node in state_graph.levels[-1].values():
+        if state_satisfies_objective(node.state, compiled_objective):
+            for route in state_graph.iterate_routes(node):
+                if control.is_cancelled():
+                    return
+                yield route
+
+
+def filter_by_objective(valid_routes: list[Route], objective: dict[str, type(BaseResource)],
+                        control: SearchControl) -> list[Route]:
+    """
+    Returns the routes which satisfy the objective.
+    """
+    return list(iterate_by_objective(valid_routes, objective, control))
+
+
+def iterate_by_objective(valid_routes: Iterable[Route], objective: dict[str, type(BaseResource)],
+                         control: SearchControl) -> Iterator[Route]:
+    """
+    Same as filter_by_objective, but yields each route satisfying the objective as soon as it's found.
+    """
+    compiled_objective: tuple[tuple[int, int], ...] = compile_objective(objective)
+
+    for route in valid_routes:
+        if control.is_cancelled():
+            break
+        if route.satisfies_objective(compiled_objective):
+            yield route
 
 
 def get_next_turn_routes(previous_turn_routes: list[Route], available_commands: dict[str, Command],
-                         commands_per_turn: int, gui: type(QMainWindow)) -> list[Route]:
+                         commands_per_turn: int, control: SearchControl, turn_table: TurnTable = None,
+                         pruner: RoutePruner = None) -> list[Route]:
     """
-    TODO: Fill this description and comment/typehint this function
+    Returns every valid route that is one turn longer than one of the given routes.
     """
+    if not previous_turn_routes:
+        return []
+    if turn_table is None:
+        turn_table = TurnTable(available_commands, commands_per_turn, previous_turn_routes[0].bounds)
+    return list(iterate_next_turn_routes(previous_turn_routes, control, turn_table, pruner))
+
 
-    valid_routes: list[Route] = []
+def iterate_next_turn_routes(previous_turn_routes: Iterable[Route], control: SearchControl,
+                             turn_table: TurnTable, pruner: RoutePruner = None) -> Iterator[Route]:
+    """
+    Same as get_next_turn_routes, but yields each new route as soon as it's found.
+    If a pruner is given, new routes which can no longer be finished successfully are left out.
+    """
+    stats: SearchStats = control.stats
     for route in previous_turn_routes:
-        if not gui.continue_calculating:
+        if control.is_cancelled():
             break
-        possible_turns: list[Turn] = route.get_possible_turns(available_commands, commands_per_turn)
-        for possible_turn in possible_turns:
-            QApplication.processEvents()
-            if not gui.continue_calculating:
+        level: int = len(route)
+        control.expand(level)
+        for possible_turn in turn_table.iterate_possible_turns(route.state):
+            if control.is_cancelled():
                 break
-            route_copy: Route = route.copy()
-            if route_copy.append(possible_turn):
-                valid_routes.append(route_copy)
+            if pruner is not None and not pruner.can_succeed(possible_turn.state, level + 1):
+                if stats is not None:
+                    stats.reject(level)
+                continue
+            next_route: Route = route.extend(possible_turn)
+            if next_route.is_valid():
+                if stats is not None:
+                    stats.accept(level)
+                yield next_route
+            elif stats is not None:
+                stats.reject(level)
+
+
+def iterate_parallel_routes(task_arguments: dict[str, any], search_options: dict[str, any], control: SearchControl,
+                            turn_table: TurnTable, pruner: RoutePruner, workers: int,
+                            shard_turns: int) -> Iterator[Route]:
+    """
+    Finds every route of the first shard_turns turns, and sends each of them as a shard to a pool of worker processes,
+    which search the rest of the routes from it depth first. Yields the routes found by each shard as it's done.
+    The routes expanded and SearchStats of each shard are added to the control's.
+    If the control is cancelled, or this generator is closed early, the shards which haven't started yet are cancelled,
+    and the ones already running are told to stop.
+    """
+    amount_of_turns: int = task_arguments["amount_of_turns"]
+    shard_turns = max(1, min(shard_turns, amount_of_turns))
+
+    empty_route: Route = Route(task_arguments["starting_resources"], amount_of_turns)
+    shards: Iterator[Route] = iter([empty_route])
+    for turn in range(1, shard_turns + 1, 1):
+        shards = iterate_next_turn_routes(shards, control, turn_table, pruner)
+
+    # If the shards are already finished routes, there's nothing left for the workers to do
+    if shard_turns == amount_of_turns:
+        yield from iterate_by_objective(shards, task_arguments["objective"], control)
+        return
+
+    # Imported here, since they take longer to import than the rest of the calculator, and are only needed here
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+
+    stop_event = multiprocessing.Event()
+    executor: ProcessPoolExecutor = ProcessPoolExecutor(max_workers=workers, initializer=initialise_worker,
+                                                        initargs=(task_arguments, search_options, stop_event))
+    try:
+        pending: set[Future] = {executor.submit(search_shard, shard.turns) for shard in shards}
+        while pending:
+            if control.is_cancelled():
+                break
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                routes, routes_expanded, cache_hits, cache_misses, levels = future.result()
+                control.routes_expanded += routes_expanded
+                if search_options["turn_cache"] is not None:
+                    search_options["turn_cache"].hits += cache_hits
+                    search_options["turn_cache"].misses += cache_misses
+                if control.stats is not None:
+                    control.stats.merge(levels)
+                yield from routes
+    finally:
+        stop_event.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class WorkerSearch:
+    """
+    The part of the task every worker process of iterate_parallel_routes keeps between shards, so that the TurnTable
+    and turn cache are only built once per process. Its SearchControl is cancelled through the event shared with the
+    process running iterate_parallel_routes.
+    """
+
+    def __init__(self, task_arguments: dict[str, any], search_options: dict[str, any], stop_event):
+        self.amount_of_turns: int = task_arguments["amount_of_turns"]
+        self.objective: dict[str, type(BaseResource)] = task_arguments["objective"]
+        self.control: SearchControl = SearchControl(cancel_event=stop_event,
+                                                    stats=SearchStats() if search_options["stats"] else None)
+
+        self.empty_route: Route = Route(task_arguments["starting_resources"], self.amount_of_turns)
+        turn_cache: PossibleTurnsCache = None
+        if search_options["turn_cache"] is not None:
+            turn_cache = PossibleTurnsCache(search_options["turn_cache"].max_entries,
+                                            search_options["turn_cache"].max_bytes)
+        self.turn_table: TurnTable = TurnTable(task_arguments["available_commands"],
+                                               task_arguments["commands_per_turn"], self.empty_route.bounds,
+                                               turn_cache, search_options["group_orderings"])
+        self.pruner: RoutePruner = None
+        if search_options["prune"]:
+            self.pruner = RoutePruner(self.turn_table, self.objective, self.amount_of_turns)
+
+    def search(self, shard_turns: list[Turn]) -> tuple[list[Route], int, int, int, list[LevelStats]]:
+        """
+        Searches every route starting with the given turns, and returns them along with the amount of routes expanded,
+        the turn cache hits and misses, and the stats of each level (if stats are kept) of this shard.
+        """
+        shard: Route = self.empty_route
+        for turn in shard_turns:
+            shard = shard.extend(turn)
+
+        turn_cache: PossibleTurnsCache = self.turn_table.cache
+        hits_before: int = 0 if turn_cache is None else turn_cache.hits
+        misses_before: int = 0 if turn_cache is None else turn_cache.misses
+        expanded_before: int = self.control.routes_expanded
+        if self.control.stats is not None:
+            self.control.stats.start(self.amount_of_turns, turn_cache)
+        routes: list[Route] = list(iterate_depth_first_routes(shard, self.amount_of_turns, self.objective,
+                                                              self.control, self.turn_table, self.pruner))
+        routes_expanded: int = self.control.routes_expanded - expanded_before
+        levels: list[LevelStats] = []
+        if self.control.stats is not None:
+            self.control.stats.finish()
+            levels = self.control.stats.levels
+        if turn_cache is None:
+            return routes, routes_expanded, 0, 0, levels
+        return routes, routes_expanded, turn_cache.hits - hits_before, turn_cache.misses - misses_before, levels
+
+
+# The WorkerSearch of the current worker process
+worker_search: WorkerSearch = None
 
-    return valid_routes
+
+def initialise_worker(task_arguments: dict[str, any], search_options: dict[str, any], stop_event) -> None:
+    """
+    Runs once in every worker process of iterate_parallel_routes.
+    """
+    global worker_search
+    # Forked worker processes would otherwise all draw the same random Heat gains
+    random.seed()
+    worker_search = WorkerSearch(task_arguments, search_options, stop_event)
+
+
+def search_shard(shard_turns: list[Turn]) -> tuple[list[Route], int, int, int, list[LevelStats]]:
+    """
+    Runs in a worker process of iterate_parallel_routes, for each shard.
+    """
+    return worker_search.search(shard_turns)
@@ -0,0 +1,203 @@
+"""
+A task file holds either a single task, or a list of them. Each task is a JSON object like:
+
+{
+    "name": "Debug task",
+    "amount_of_turns": 2,
+    "commands_per_turn": 3,
+    "starting_resources": {"Comms": 1, "Power": 10, "Crew": 2,
+                           "Heat": {"value": 2, "overheat_limit": 4, "min_increase": 1, "max_increase": 3},
+                           "Drift": {"value": 2, "drift_bounds": [-2, 2], "min_drift": -4, "max_drift": 4},
+                           "Thrust": {"value": 3, "required_thrust": 4}},
+    "commands": {"Power to comms": {"input": {"Power": 1}, "output": {"Comms": 2}}},
+    "objective": {"Comms": 7, "Navs": 7}
+}
+
+Resources are given by their name and value. Heat, Drift and Thrust can instead be given as an object with their
+value and parameters, and any parameter left out gets the same default as in the GUI. The name is optional.
+"""
+
+import hashlib
+import json
+from typing import Iterator, TextIO
+
+from solver import Task
+from task_calculator import SearchStats
+from data_structure import Command, Route, BaseResource, RESOURCE_NAMES, SPECIAL_RESOURCE_NAMES, Heat, Drift, \
+    Thrust, get_resource_from_name
+
+# The parameters of each special resource, besides its value, as (constructor argument, attribute) pairs
+SPECIAL_RESOURCE_PARAMETERS: dict[str, tuple[tuple[str, str], ...]] = {
+    SPECIAL_RESOURCE_NAMES["heat"]: (("overheat_limit", "overheat_limit"),
+                                     ("min_increase", "min_random_increase"),
+                                     ("max_increase", "max_random_increase")),
+    SPECIAL_RESOURCE_NAMES["drift"]: (("drift_bounds", "drift_bounds"),
+                                      ("min_drift", "min_value"),
+                                      ("max_drift", "max_value")),
+    SPECIAL_RESOURCE_NAMES["thrust"]: (("required_thrust", "required_thrust"),)
+}
+SPECIAL_RESOURCE_CLASSES: dict[str, type] = {
+    SPECIAL_RESOURCE_NAMES["heat"]: Heat,
+    SPECIAL_RESOURCE_NAMES["drift"]: Drift,
+    SPECIAL_RESOURCE_NAMES["thrust"]: Thrust
+}
+
+
+def resource_from_json(name: str, description: any) -> type(BaseResource):
+    """
+    Creates a resource from either its value, or an object with its value and parameters.
+    """
+    if name not in RESOURCE_NAMES:
+        raise ValueError(f"Unknown resource {name}, expected one of {RESOURCE_NAMES}")
+    if not isinstance(description, dict):
+        return get_resource_from_name(name, int(description))
+
+    resource: type(BaseResource) = get_resource_from_name(name, int(description.get("value", 0)))
+    parameters: dict[str, any] = {"value": resource.value}
+    for argument, attribute in SPECIAL_RESOURCE_PARAMETERS.get(name, ()):
+        parameters[argument] = description.get(argument, getattr(resource, attribute))
+    unknown_parameters: set[str] = set(description) - set(parameters)
+    if unknown_parameters:
+        raise ValueError(f"Unknown parameters {sorted(unknown_parameters)} for resource {name}")
+    if name not in SPECIAL_RESOURCE_CLASSES:
+        return resource
+    return SPECIAL_RESOURCE_CLASSES[name](**parameters)
+
+
+def resource_to_json(resource: type(BaseResource)) -> any:
+    """
+    The opposite of resource_from_json. Heat, Drift and Thrust are always given with their parameters.
+    """
+    if resource.name not in SPECIAL_RESOURCE_PARAMETERS:
+        return resource.value
+    description: dict[str, any] = {"value": resource.value}
+    for argument, attribute in SPECIAL_RESOURCE_PARAMETERS[resource.name]:
+        description[argument] = getattr(resource, attribute)
+    return description
+
+
+def resources_from_json(descriptions: dict[str, any]) -> dict[str, type(BaseResource)]:
+    return {name: resource_from_json(name, description) for name, description in descriptions.items()}
+
+
+def resources_to_json(resources: dict[str, type(BaseResource)]) -> dict[str, any]:
+    return {name: resource_to_json(resource) for name, resource in resources.items()}
+
+
+def task_from_json(description: dict[str, any], default_name: str = "") -> Task:
+    """
+    Creates a Task from its JSON object. Raises a ValueError if anything is missing or can't be understood.
+    """
+    if not isinstance(description, dict):
+        raise ValueError(f"Expected a task object, got {type(description).__name__}")
+    try:
+        available_commands: dict[str, Command] = {}
+        for command_name, command in description["commands"].items():
+            available_commands[command_name] = Command(command_name,
+                                                       resources_from_json(command.get("input", {})),
+                                                       resources_from_json(command.get("output", {})))
+        return Task(available_commands,
+                    resources_from_json(description["starting_resources"]),
+                    int(description["amount_of_turns"]),
+                    int(description["commands_per_turn"]),
+                    resources_from_json(description.get("objective", {})),
+                    str(description.get("name", default_name)))
+    except KeyError as error:
+        raise ValueError(f"Task is missing {error}") from error
+    except (AttributeError, TypeError) as error:
+        raise ValueError(f"Task is malformed: {error}") from error
+
+
+def task_to_json(task: Task) -> dict[str, any]:
+    """
+    The opposite of task_from_json.
+    """
+    commands: dict[str, any] = {}
+    for command_name, command in task.available_commands.items():
+        commands[command_name] = {
+            "input": {name: resource.value for name, resource in command.input_resources.items()},
+            "output": {name: resource.value for name, resource in command.output_resources.items()}
+        }
+    return {"name": task.name,
+            "amount_of_turns": task.amount_of_turns,
+            "commands_per_turn": task.commands_per_turn,
+            "starting_resources": resources_to_json(task.starting_resources),
+            "commands": commands,
+            "objective": {name: resource.value for name, resource in task.objective.items()}}
+
+
+def canonical_task_json(task: Task) -> str:
+    """
+    Serialises everything about a task which decides its routes, leaving out its name, with every object's keys
+    (including the names of the commands) sorted and no whitespace, so that tasks with the same routes always give the
+    same string, whatever order they were given in.
+    """
+    description: dict[str, any] = task_to_json(task)
+    del description["name"]
+    return json.dumps(description, sort_keys=True, separators=(",", ":"))
+
+
+def task_hash(task: Task) -> str:
+    """
+    A stable hash of the task's canonical JSON, which is the same across runs and machines.
+    """
+    return hashlib.sha256(canonical_task_json(task).encode("utf-8")).hexdigest()
+
+
+def load_tasks(path: str) -> list[Task]:
+    """
+    Reads every task of a task file. Tasks without a name are named after the file, and their place in it.
+    Raises an OSError if the file can't be read, and a ValueError if it isn't a valid task file.
+    """
+    with open(path, encoding="utf-8") as task_file:
+        try:
+            descriptions: any = json.load(task_file)
+        except json.JSONDecodeError as error:
+            raise ValueError(f"{path} is not valid JSON: {error}") from error
+
+    if not isinstance(descriptions, list):
+        return [task_from_json(descriptions, path)]
+    return [task_from_json(description, f"{path}[{index}]") for index, description in enumerate(descriptions)]
+
+
+def route_to_json(route: Route) -> dict[str, any]:
+    """
+    Describes a route by the names of the commands of each turn, in order, and the resources it ends up with.
+    """
+    return {"turns": [[command.name for command in turn.commands] for turn in route.turns],
+            "resources": {name: resource.value for name, resource in route.current_resources.items()}}
+
+
+def write_json_line(output: TextIO, result: dict[str, any]) -> None:
+    """
+    Writes a result as a single JSON line, like json.dumps would. Values which are iterators, like the routes of a
+    result, are written as lists one item at a time, so that their items never have to exist all at once.
+    """
+    output.write("{")
+    for index, (key, value) in enumerate(result.items()):
+        if index > 0:
+            output.write(", ")
+        output.write(json.dumps(key) + ": ")
+        if isinstance(value, Iterator):
+            output.write("[")
+            for item_index, item in enumerate(value):
+                if item_index > 0:
+                    output.write(", ")
+                output.write(json.dumps(item))
+            output.write("]")
+        else:
+            output.write(json.dumps(value))
+    output.write("}\n")
+
+
+def search_stats_to_json(stats: SearchStats) -> list[dict[str, any]]:
+    """
+    Describes what a search did on each level, the amount of turns completed by the routes it expanded, in order.
+    """
+    return [{"frontier": level_stats.frontier,
+             "generated": level_stats.generated,
+             "rejected": level_stats.rejected,
+             "accepted": level_stats.accepted,
+             "cache_hits": level_stats.cache_hits,
+             "seconds": round(level_stats.seconds, 3)}
+            for level_stats in stats.levels]
@@ -0,0 +1,71 @@
+"""
+Helpers and fixtures shared by the tests, which check every alternative way of finding routes against a plain breadth
+first search of the debug task.
+"""
+
+import os
+import random
+import sys
+from typing import Iterable
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from solver import Task, solve, debug_task, optimistic_heat_task
+from task_calculator import BREADTH_FIRST
+from data_structure import Route, Thrust, SPECIAL_RESOURCE_NAMES
+
+SEED = 3
+
+
+def route_key(route: Route, states: bool = True) -> tuple:
+    """
+    Everything that tells routes apart: the commands of every turn and the state each turn ends in, which includes the
+    random Heat gained at the end of it. Without states, only the commands are kept, for comparing routes whose Heat
+    was worked out differently.
+    """
+    if not states:
+        return tuple(tuple(command.name for command in turn.commands) for turn in route.turns)
+    return tuple((tuple(command.name for command in turn.commands), turn.state) for turn in route.turns)
+
+
+def route_keys(routes: Iterable[Route], states: bool = True) -> list[tuple]:
+    return [route_key(route, states) for route in routes]
+
+
+def make_task(amount_of_turns: int = 3, fixed_heat: bool = False) -> Task:
+    """
+    The debug task over the given amount of turns, with a Thrust requirement it can meet, so that pruning still finds
+    routes. With fixed_heat, Heat always gains its minimum amount, so that routes don't depend on the order in which a
+    search draws the random Heat gains.
+    """
+    task: Task = debug_task()
+    starting_resources: dict = dict(task.starting_resources)
+    starting_resources[SPECIAL_RESOURCE_NAMES["thrust"]] = Thrust(1, value=3)
+    task = Task(task.available_commands, starting_resources, amount_of_turns, task.commands_per_turn, task.objective,
+                task.name)
+    return optimistic_heat_task(task) if fixed_heat else task
+
+
+def breadth_first_routes(task: Task, prune: bool = True, seed: int = SEED, memory_budget: int = None) -> list[Route]:
+    """
+    The routes a breadth first search finds, in the order it finds them, with the random Heat gains seeded. Without a
+    memory budget, this is the plain search every other way of finding routes is checked against.
+    """
+    random.seed(seed)
+    return list(solve(task, BREADTH_FIRST, prune, memory_budget=memory_budget))
+
+
+def breadth_first_keys(task: Task, prune: bool = True, seed: int = SEED, memory_budget: int = None) -> list[tuple]:
+    return route_keys(breadth_first_routes(task, prune, seed, memory_budget))
+
+
+@pytest.fixture
+def task() -> Task:
+    return make_task()
+
+
+@pytest.fixture
+def fixed_heat_task() -> Task:
+    return make_task(fixed_heat=True)
@@ -0,0 +1,53 @@
+import json
+import os
+
+from benchmark import compare, get_scenarios, run_scenario, MIN_TIME_TOLERANCE
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks",
+                             "baseline.json")
+
+
+def make_result(wall_time: float = 1.0, peak_rss_kb: int = 1000, routes_returned: int = 10) -> dict:
+    return {"name": "scenario", "wall_time": wall_time, "peak_rss_kb": peak_rss_kb, "routes_expanded": 5,
+            "routes_returned": routes_returned}
+
+
+def test_results_within_the_tolerances_pass():
+    baseline = make_result()
+    assert compare(make_result(), baseline) == []
+    assert compare(make_result(wall_time=1.2, peak_rss_kb=1200), baseline) == []
+    assert compare(make_result(wall_time=0.1, peak_rss_kb=100), baseline) == []
+
+
+def test_every_kind_of_regression_is_found():
+    baseline = make_result()
+    assert len(compare(make_result(routes_returned=11), baseline)) == 1
+    assert len(compare(make_result(wall_time=1.3), baseline)) == 1
+    assert len(compare(make_result(peak_rss_kb=1300), baseline)) == 1
+    assert len(compare(make_result(wall_time=2.0, peak_rss_kb=2000, routes_returned=0), baseline)) == 3
+    assert compare({"name": "scenario", "error": "Timed out"}, baseline) == ["Timed out"]
+
+
+def test_fast_scenarios_get_the_minimum_time_tolerance():
+    baseline = make_result(wall_time=0.01)
+    assert compare(make_result(wall_time=0.01 + MIN_TIME_TOLERANCE * 0.9), baseline) == []
+    assert compare(make_result(wall_time=0.01 + MIN_TIME_TOLERANCE * 1.1), baseline) != []
+
+
+def test_missing_memory_is_not_compared():
+    assert compare(make_result(peak_rss_kb=None), make_result()) == []
+    assert compare(make_result(), {**make_result(), "peak_rss_kb": None}) == []
+
+
+def test_baseline_covers_the_scenarios():
+    with open(BASELINE_PATH, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    assert {result["name"] for result in baseline} == set(get_scenarios())
+
+
+def test_scenario_matches_its_baseline_routes():
+    with open(BASELINE_PATH, encoding="utf-8") as baseline_file:
+        baseline = {result["name"]: result for result in json.load(baseline_file)}
+    result = run_scenario("debug-2-turns")
+    assert result["routes_returned"] == baseline["debug-2-turns"]["routes_returned"]
+    assert result["routes_expanded"] == baseline["debug-2-turns"]["routes_expanded"]
@@ -0,0 +1,63 @@
+import json
+import os
+
+import pytest
+
+from cli import main
+from solver import Task
+from task_file import task_from_json, task_to_json, load_tasks, route_to_json
+from conftest import make_task, breadth_first_routes
+
+EXAMPLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "debug_task.json")
+
+
+def write_task_file(path, tasks: list[Task]) -> str:
+    path.write_text(json.dumps([task_to_json(task) for task in tasks]), encoding="utf-8")
+    return str(path)
+
+
+def run_cli(tmp_path, *arguments: str) -> tuple[int, list[dict]]:
+    output_path = str(tmp_path / "results.jsonl")
+    exit_code = main([*arguments, "-o", output_path])
+    with open(output_path, encoding="utf-8") as output:
+        return exit_code, [json.loads(line) for line in output]
+
+
+def test_tasks_round_trip_through_json():
+    task = make_task()
+    loaded_task = task_from_json(json.loads(json.dumps(task_to_json(task))))
+    assert task_to_json(loaded_task) == task_to_json(task)
+    assert list(loaded_task.available_commands.values()) == list(task.available_commands.values())
+
+
+def test_example_task_file_loads():
+    tasks = load_tasks(EXAMPLE_PATH)
+    assert [task.name for task in tasks] == ["Debug task"]
+
+
+@pytest.mark.parametrize("description", [[], {"commands": {}}, {"commands": {}, "starting_resources": {"Fuel": 1},
+                                                                 "amount_of_turns": 1, "commands_per_turn": 1}])
+def test_invalid_tasks_are_refused(description):
+    with pytest.raises(ValueError):
+        task_from_json(description)
+
+
+def test_results_match_the_breadth_first_routes(tmp_path):
+    tasks = [make_task(fixed_heat=True), make_task(2, fixed_heat=True)]
+    task_path = write_task_file(tmp_path / "tasks.json", tasks)
+    exit_code, results = run_cli(tmp_path, task_path, "--search-mode", "breadth_first", "--max-routes", "5")
+    assert exit_code == 0
+    for task, result in zip(tasks, results):
+        routes = breadth_first_routes(task)
+        assert result["routes_found"] == len(routes)
+        assert result["routes"] == [route_to_json(route) for route in routes[:5]]
+    assert [result["file"] for result in results] == [task_path, task_path]
+
+
+def test_failures_are_written_and_the_rest_still_solved(tmp_path):
+    bad_path = tmp_path / "bad.json"
+    bad_path.write_text("{", encoding="utf-8")
+    exit_code, results = run_cli(tmp_path, str(bad_path), str(tmp_path / "missing.json"), EXAMPLE_PATH)
+    assert exit_code == 1
+    assert "error" in results[0] and "error" in results[1]
+    assert results[2]["task"] == "Debug task" and "routes_found" in results[2]
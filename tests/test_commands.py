@@ -0,0 +1,45 @@
+import copy
+import pickle
+
+import pytest
+
+from solver import solve
+from task_calculator import BREADTH_FIRST, STREAMING, DEPTH_FIRST, STATE_GRAPH
+from data_structure import Command, Comms, Power, REGULAR_RESOURCE_NAMES
+from conftest import route_keys, breadth_first_keys
+
+
+def make_command(power: int = 1, comms: int = 2) -> Command:
+    return Command("Power to comms", {REGULAR_RESOURCE_NAMES["power"]: Power(value=power)},
+                   {REGULAR_RESOURCE_NAMES["comms"]: Comms(value=comms)})
+
+
+def test_commands_are_interned():
+    command = make_command()
+    assert make_command() is command
+    assert make_command(comms=3) is not command
+    assert copy.copy(command) is command
+    assert copy.deepcopy(command) is command
+    assert command.copy() is command
+    assert pickle.loads(pickle.dumps(command)) is command
+
+
+def test_commands_are_immutable():
+    input_resources = {REGULAR_RESOURCE_NAMES["power"]: Power(value=4)}
+    command = Command("Power to nothing", input_resources, {})
+    input_resources[REGULAR_RESOURCE_NAMES["power"]].value = 5
+    assert command.input_resources[REGULAR_RESOURCE_NAMES["power"]].value == 4
+    assert -4 in command.delta
+    with pytest.raises(AttributeError):
+        command.name = "Renamed"
+    with pytest.raises(TypeError):
+        command.input_resources[REGULAR_RESOURCE_NAMES["power"]] = Power(value=1)
+
+
+@pytest.mark.parametrize("search_mode, workers", [(BREADTH_FIRST, 1), (STREAMING, 1), (DEPTH_FIRST, 1),
+                                                  (DEPTH_FIRST, 2), (STATE_GRAPH, 1)])
+def test_routes_share_the_task_commands(fixed_heat_task, search_mode, workers):
+    routes = list(solve(fixed_heat_task, search_mode, workers=workers))
+    assert sorted(route_keys(routes)) == sorted(breadth_first_keys(fixed_heat_task))
+    commands = set(map(id, fixed_heat_task.available_commands.values()))
+    assert all(id(command) in commands for route in routes for turn in route.turns for command in turn.commands)
@@ -0,0 +1,39 @@
+import io
+import json
+
+import pytest
+
+from compact_routes import CompactRoutes
+from task_file import route_to_json, write_json_line
+from conftest import route_keys, make_task, breadth_first_routes
+
+
+@pytest.mark.parametrize("prune", [True, False])
+def test_materialised_routes_match_breadth_first_routes(prune):
+    task = make_task(3 if prune else 2)
+    routes = breadth_first_routes(task, prune)
+    compact_routes = CompactRoutes(task, routes)
+    assert len(compact_routes) == len(routes) > 0
+    assert route_keys(compact_routes) == route_keys(routes)
+    assert route_keys([compact_routes[-1]]) == route_keys(routes[-1:])
+
+
+def test_bytes_round_trip(task):
+    compact_routes = CompactRoutes(task, breadth_first_routes(task))
+    assert route_keys(CompactRoutes.from_bytes(task, *compact_routes.to_bytes())) == route_keys(compact_routes)
+
+
+def test_written_routes_match_breadth_first_routes(task):
+    routes = breadth_first_routes(task)
+    output = io.StringIO()
+    write_json_line(output, {"routes": map(route_to_json, CompactRoutes(task, routes))})
+    assert output.getvalue() == json.dumps({"routes": [route_to_json(route) for route in routes]}) + "\n"
+
+
+def test_numpy_view(task):
+    pytest.importorskip("numpy")
+    compact_routes = CompactRoutes(task, breadth_first_routes(task))
+    array = compact_routes.to_numpy()
+    assert array.shape == (len(compact_routes), task.amount_of_turns, task.commands_per_turn)
+    assert [[compact_routes.commands[index] for index in turn] for turn in array[0]] == \
+        [list(turn) for turn in compact_routes.get_turns_commands(0)]
@@ -0,0 +1,27 @@
+import itertools
+
+import pytest
+
+from solver import solve
+from task_calculator import BREADTH_FIRST, STREAMING, DEPTH_FIRST, STATE_GRAPH
+from data_structure import Route
+from conftest import make_task, breadth_first_keys
+
+
+def ordering_keys(route: Route) -> list[tuple]:
+    """
+    The keys of every route a route with grouped orderings stands for, one per combination of the orderings of its
+    turns. Every ordering of a turn leads to the same state.
+    """
+    turn_orderings = [[(tuple(command.name for command in ordering), turn.state)
+                       for ordering in (turn.commands, *turn.other_orderings)] for turn in route.turns]
+    return list(itertools.product(*turn_orderings))
+
+
+@pytest.mark.parametrize("search_mode", [BREADTH_FIRST, STREAMING, DEPTH_FIRST, STATE_GRAPH])
+def test_grouped_orderings_stand_for_the_same_routes(search_mode):
+    task = make_task(fixed_heat=True)
+    grouped_routes = list(solve(task, search_mode, group_orderings=True))
+    keys = [key for route in grouped_routes for key in ordering_keys(route)]
+    assert len(grouped_routes) < len(keys)
+    assert sorted(keys) == sorted(breadth_first_keys(task))
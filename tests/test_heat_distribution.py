@@ -0,0 +1,65 @@
+import copy
+import itertools
+
+import pytest
+
+from solver import Task
+from heat_distribution import iterate_heat_risks
+from data_structure import ResourceBounds, Turn, Comms, REGULAR_RESOURCE_NAMES, compile_objective, \
+    state_satisfies_objective
+from conftest import route_key, make_task
+
+
+def make_heat_task() -> Task:
+    task: Task = make_task(2)
+    task.objective = {REGULAR_RESOURCE_NAMES["comms"]: Comms(value=3)}
+    return task
+
+
+def enumerate_success_probabilities(task: Task, end_of_route_criteria: bool) -> dict[tuple, float]:
+    """
+    The probability of success of every command sequence, found by trying every permutation of commands on every turn
+    with every possible Heat gain at the end of it, each as likely as the others.
+    """
+    bounds = ResourceBounds(task.starting_resources)
+    objective = compile_objective(task.objective)
+    heat_gains = range(bounds.min_heat_increase, bounds.max_heat_increase + 1)
+    permutations = list(itertools.product(task.available_commands.values(), repeat=task.commands_per_turn))
+    probabilities = {}
+
+    def walk(state: tuple[int, ...], key: tuple, probability: float) -> None:
+        if len(key) == task.amount_of_turns:
+            if state_satisfies_objective(state, objective) and \
+                    (not end_of_route_criteria or bounds.is_valid_end_of_route(state)):
+                probabilities[key] = probabilities.get(key, 0.0) + probability
+            return
+        for permutation in permutations:
+            for heat_gain in heat_gains:
+                fixed_bounds = copy.copy(bounds)
+                fixed_bounds.min_heat_increase = fixed_bounds.max_heat_increase = heat_gain
+                turn = Turn.from_state(state, fixed_bounds, task.commands_per_turn)
+                if all(turn.append(command) for command in permutation):
+                    walk(turn.state, key + (tuple(command.name for command in permutation),),
+                         probability / len(heat_gains))
+
+    walk(bounds.to_state(task.starting_resources), (), 1.0)
+    return probabilities
+
+
+@pytest.mark.parametrize("prune", [True, False])
+def test_probabilities_match_every_outcome(prune):
+    task = make_heat_task()
+    exact = {route_key(risk.route, False): risk.success_probability for risk in iterate_heat_risks(task, 1.0, prune)}
+    enumerated = enumerate_success_probabilities(task, prune)
+    assert any(probability < 1.0 for probability in exact.values())
+    assert set(exact) == set(enumerated)
+    assert max(abs(exact[key] - enumerated[key]) for key in exact) < 1e-9
+
+
+def test_routes_more_likely_to_fail_are_left_out():
+    task = make_heat_task()
+    risks = list(iterate_heat_risks(task, 1.0))
+    likely_risks = list(iterate_heat_risks(task, 0.5))
+    assert 0 < len(likely_risks) < len(risks)
+    assert sorted(route_key(risk.route, False) for risk in likely_risks) == \
+        sorted(route_key(risk.route, False) for risk in risks if risk.failure_probability <= 0.5)
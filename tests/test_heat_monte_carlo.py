@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from heat_monte_carlo import iterate_heat_estimates
+from heat_distribution import iterate_heat_risks
+from conftest import route_key, route_keys, make_task, breadth_first_keys
+
+SAMPLES = 4000
+TOLERANCE = 0.05
+
+
+@pytest.mark.parametrize("prune", [True, False])
+def test_fixed_heat_finds_the_breadth_first_routes_for_certain(fixed_heat_task, prune):
+    fixed_heat_task.amount_of_turns = 2
+    estimates = list(iterate_heat_estimates(fixed_heat_task, 100, seed=1, prune=prune))
+    assert sorted(route_keys(estimate.route for estimate in estimates)) == \
+        sorted(breadth_first_keys(fixed_heat_task, prune))
+    assert all(estimate.probability == 1.0 for estimate in estimates)
+
+
+@pytest.mark.parametrize("prune", [True, False])
+def test_estimates_match_the_exact_heat_distribution(prune):
+    task = make_task(2 if not prune else 3)
+    exact = {route_key(risk.route, False): risk.success_probability for risk in iterate_heat_risks(task, 1.0, prune)}
+    estimates = {route_key(estimate.route, False): estimate.probability
+                 for estimate in iterate_heat_estimates(task, SAMPLES, seed=1, prune=prune)}
+    assert exact
+    # Including the routes which only work when Heat gains more than its minimum
+    assert set(estimates) == {key for key, probability in exact.items() if probability > 0}
+    assert max(abs(estimates[key] - exact[key]) for key in estimates) < TOLERANCE
+
+
+def test_same_seed_gives_same_estimates(task):
+    first = [(route_key(estimate.route), estimate.successes) for estimate in iterate_heat_estimates(task, 500, 7)]
+    second = [(route_key(estimate.route), estimate.successes) for estimate in iterate_heat_estimates(task, 500, 7)]
+    assert first == second
@@ -0,0 +1,70 @@
+import pytest
+
+from solver import Task
+from task_calculator import SearchControl, SearchStats
+from incremental_solver import IncrementalSolver, UNCHANGED, FILTERED, TRUNCATED, EXTENDED, COMMANDS_CHANGED, \
+    REBUILT
+from data_structure import Command, Comms, Data, REGULAR_RESOURCE_NAMES
+from conftest import route_keys, breadth_first_keys
+
+EXTRA_COMMANDS = {"Data to comms": Command("Data to comms", {REGULAR_RESOURCE_NAMES["data"]: Data(value=1)},
+                                           {REGULAR_RESOURCE_NAMES["comms"]: Comms(value=3)})}
+
+
+def make_variant(task: Task, amount_of_turns: int, objective: dict = None, removed: tuple[str, ...] = (),
+                 added: dict[str, Command] = None) -> Task:
+    available_commands = {name: command for name, command in task.available_commands.items() if name not in removed}
+    available_commands.update(added or {})
+    return Task(available_commands, task.starting_resources, amount_of_turns, task.commands_per_turn,
+                task.objective if objective is None else objective)
+
+
+def make_edits(task: Task, max_turns: int) -> list[tuple[Task, str]]:
+    """
+    A sequence of tasks of up to max_turns, each a small edit of the one before, along with what the edit should make
+    the solver do.
+    """
+    fewer_comms = {REGULAR_RESOURCE_NAMES["comms"]: Comms(value=3)}
+    turns = max_turns - 1
+    return [(make_variant(task, turns), REBUILT),
+            (make_variant(task, turns), UNCHANGED),
+            (make_variant(task, turns, fewer_comms), FILTERED),
+            (make_variant(task, max_turns), EXTENDED),
+            (make_variant(task, turns), TRUNCATED),
+            (make_variant(task, max_turns), FILTERED),
+            (make_variant(task, turns, added=EXTRA_COMMANDS), COMMANDS_CHANGED),
+            (make_variant(task, max_turns, added=EXTRA_COMMANDS), EXTENDED),
+            (make_variant(task, turns, removed=("Power to comms",), added=EXTRA_COMMANDS), COMMANDS_CHANGED),
+            (make_variant(task, turns, removed=("Power to comms",)), COMMANDS_CHANGED),
+            (make_variant(task, turns, {}), COMMANDS_CHANGED),
+            (make_variant(task, turns, {}, removed=("Drift to data",)), COMMANDS_CHANGED)]
+
+
+# Without pruning, the routes of three turns take a plain search seconds to find
+@pytest.mark.parametrize("prune, max_turns", [(True, 3), (False, 2)])
+def test_incremental_solves_match_breadth_first_solves(fixed_heat_task, prune, max_turns):
+    solver = IncrementalSolver(end_of_route_criteria=prune)
+    found_routes = False
+    for task, change in make_edits(fixed_heat_task, max_turns):
+        routes = sorted(route_keys(solver.solve(task)))
+        assert solver.last_change == change
+        assert routes == sorted(breadth_first_keys(task, prune))
+        found_routes = found_routes or bool(routes)
+    assert found_routes
+
+
+def test_cancelled_solve_starts_over(fixed_heat_task):
+    solver = IncrementalSolver()
+    control = SearchControl()
+    control.cancel()
+    assert list(solver.solve(fixed_heat_task, control)) == []
+    assert sorted(route_keys(solver.solve(fixed_heat_task))) == sorted(breadth_first_keys(fixed_heat_task))
+    assert solver.last_change == REBUILT
+
+
+def test_stats_count_the_cache_in_use(fixed_heat_task):
+    solver = IncrementalSolver()
+    for task in (fixed_heat_task, make_variant(fixed_heat_task, 2, added=EXTRA_COMMANDS)):
+        control = SearchControl(stats=SearchStats())
+        list(solver.solve(task, control))
+        assert control.stats.turn_cache is solver.turn_table.cache
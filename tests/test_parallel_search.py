@@ -0,0 +1,37 @@
+import pytest
+
+from solver import solve
+from task_calculator import SearchControl, BREADTH_FIRST, DEPTH_FIRST, STATE_GRAPH
+from data_structure import PossibleTurnsCache
+from conftest import route_keys, make_task, breadth_first_keys
+
+
+@pytest.mark.parametrize("shard_turns", [1, 2, 3])
+def test_sharded_search_finds_the_breadth_first_routes(shard_turns):
+    task = make_task(fixed_heat=True)
+    keys = route_keys(solve(task, DEPTH_FIRST, workers=2, shard_turns=shard_turns))
+    assert keys
+    assert sorted(keys) == sorted(breadth_first_keys(task))
+
+
+def test_workers_count_their_expansions_and_cache_use():
+    task = make_task(fixed_heat=True)
+    control = SearchControl()
+    turn_cache = PossibleTurnsCache()
+    list(solve(task, BREADTH_FIRST, control=control, turn_cache=turn_cache))
+    parallel_control = SearchControl()
+    parallel_turn_cache = PossibleTurnsCache()
+    list(solve(task, DEPTH_FIRST, workers=2, control=parallel_control, turn_cache=parallel_turn_cache))
+    assert parallel_control.routes_expanded == control.routes_expanded
+    assert parallel_turn_cache.hits + parallel_turn_cache.misses == turn_cache.hits + turn_cache.misses
+
+
+def test_cancelled_parallel_search_finds_nothing():
+    control = SearchControl()
+    control.cancel()
+    assert list(solve(make_task(fixed_heat=True), DEPTH_FIRST, workers=2, control=control)) == []
+
+
+def test_state_graph_cant_be_split_between_workers():
+    with pytest.raises(ValueError):
+        solve(make_task(), STATE_GRAPH, workers=2)
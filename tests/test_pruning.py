@@ -0,0 +1,55 @@
+import pytest
+
+from solver import Task, solve
+from task_calculator import SearchControl, BREADTH_FIRST, STREAMING, DEPTH_FIRST, STATE_GRAPH
+from data_structure import ResourceBounds, TurnTable, RoutePruner, Comms, REGULAR_RESOURCE_NAMES
+from conftest import route_keys, make_task
+
+SEARCH_MODES = [BREADTH_FIRST, STREAMING, DEPTH_FIRST, STATE_GRAPH]
+
+
+def make_pruning_task(objective: dict = None) -> Task:
+    """
+    The fixed Heat task over two turns, which is as many as an unpruned search finds quickly, with a weaker objective
+    than the debug task's if one is given.
+    """
+    task: Task = make_task(2, fixed_heat=True)
+    if objective is not None:
+        task.objective = objective
+    return task
+
+
+@pytest.mark.parametrize("objective", [None, {REGULAR_RESOURCE_NAMES["comms"]: Comms(value=3)}])
+@pytest.mark.parametrize("search_mode", SEARCH_MODES)
+def test_pruned_routes_are_the_unpruned_routes_meeting_the_end_of_route_criteria(search_mode, objective):
+    task = make_pruning_task(objective)
+    bounds = ResourceBounds(task.starting_resources)
+    unpruned_routes = list(solve(task, search_mode, False))
+    pruned_routes = list(solve(task, search_mode, True))
+    assert unpruned_routes
+    assert sorted(route_keys(pruned_routes)) == \
+        sorted(route_keys(route for route in unpruned_routes if bounds.is_valid_end_of_route(route.state)))
+    if objective is not None:
+        assert pruned_routes
+
+
+def test_every_turn_of_a_successful_route_can_succeed():
+    task = make_pruning_task({REGULAR_RESOURCE_NAMES["comms"]: Comms(value=3)})
+    bounds = ResourceBounds(task.starting_resources)
+    pruner = RoutePruner(TurnTable(task.available_commands, task.commands_per_turn, bounds), task.objective,
+                         task.amount_of_turns)
+    successful_routes = [route for route in solve(task, BREADTH_FIRST, False)
+                         if bounds.is_valid_end_of_route(route.state)]
+    assert successful_routes
+    for route in successful_routes:
+        for turns_completed, turn in enumerate(route.turns, 1):
+            assert pruner.can_succeed(turn.state, turns_completed)
+
+
+def test_pruning_expands_fewer_routes():
+    task = make_pruning_task()
+    unpruned_control = SearchControl()
+    pruned_control = SearchControl()
+    list(solve(task, BREADTH_FIRST, False, control=unpruned_control))
+    list(solve(task, BREADTH_FIRST, True, control=pruned_control))
+    assert pruned_control.routes_expanded < unpruned_control.routes_expanded
@@ -0,0 +1,28 @@
+import pytest
+
+from route_ranking import RouteScorer, TopRoutes
+from heat_distribution import iterate_heat_risks
+from conftest import route_key, route_keys, breadth_first_routes
+
+
+@pytest.mark.parametrize("max_routes", [1, 10, 100000])
+def test_top_routes_match_sorting_every_breadth_first_route(task, max_routes):
+    routes = breadth_first_routes(task)
+    scorer = RouteScorer(task)
+    top_routes = TopRoutes(scorer, max_routes)
+    top_routes.extend(routes)
+
+    scored = [(scorer.score(route), index, route) for index, route in enumerate(routes)]
+    scored.sort(key=lambda entry: (entry[0].key(), -entry[1]), reverse=True)
+    assert route_keys(route for route, score in top_routes.best()) == \
+        route_keys(route for score, index, route in scored[:max_routes])
+
+
+def test_scores_match_the_exact_heat_distribution(task):
+    scorer = RouteScorer(task)
+    scores = {route_key(route, False): scorer.score(route) for route in breadth_first_routes(task)}
+    risks = {route_key(risk.route, False): risk for risk in iterate_heat_risks(task)}
+    assert scores
+    for key, score in scores.items():
+        assert score.heat_failure_probability == pytest.approx(risks[key].failure_probability)
+        assert score.min_slack >= 0
@@ -0,0 +1,72 @@
+import io
+import json
+import os
+
+import pytest
+
+from route_store import RouteEncoder, RouteStore, RouteList, estimate_node_bytes
+from task_file import route_to_json
+from data_structure import Route, compile_objective
+from conftest import route_keys, make_task, breadth_first_keys, breadth_first_routes
+
+
+def make_encoder(task) -> RouteEncoder:
+    return RouteEncoder(Route(task.starting_resources, task.amount_of_turns), task.available_commands,
+                        task.commands_per_turn)
+
+
+@pytest.mark.parametrize("prune", [True, False])
+@pytest.mark.parametrize("memory_budget", [0, 20000, 10 ** 9])
+def test_spilled_search_matches_breadth_first_search(prune, memory_budget):
+    task = make_task(3 if prune else 2)
+    routes = breadth_first_keys(task, prune, memory_budget=memory_budget)
+    assert routes == breadth_first_keys(task, prune)
+    assert routes
+
+
+def test_store_round_trip(task, tmp_path):
+    routes = breadth_first_routes(task)
+    path = str(tmp_path / "routes.bin")
+    with RouteStore(make_encoder(task), path) as store:
+        store.extend(routes)
+        assert len(store) == len(routes)
+        assert route_keys(store) == route_keys(routes)
+        assert route_keys([store[-1]]) == route_keys(routes[-1:])
+        assert route_keys(store.iterate_level(task.amount_of_turns)) == route_keys(routes)
+        assert list(store.iterate_level(task.amount_of_turns - 1)) == []
+
+        output = io.StringIO()
+        store.export_json_lines(output)
+        assert output.getvalue() == "".join(json.dumps(route_to_json(route)) + "\n" for route in routes)
+    assert os.path.exists(path)
+
+
+def test_route_list_spills_past_its_budget(task):
+    routes = breadth_first_routes(task)
+    objective = compile_objective(task.objective)
+    in_memory = RouteList(make_encoder(task))
+    spilled = RouteList(make_encoder(task), memory_budget=1)
+    in_memory.extend(routes)
+    spilled.extend(routes)
+    assert in_memory.store is None and spilled.store is not None
+    assert spilled.memory_bytes == 0 < in_memory.memory_bytes
+    assert route_keys(spilled) == route_keys(in_memory) == route_keys(routes)
+    assert route_keys(spilled.iterate(objective)) == route_keys(in_memory.iterate(objective))
+
+    path = spilled.store.path
+    spilled.close()
+    in_memory.close()
+    assert not os.path.exists(path)
+
+
+def test_route_list_counts_every_node_it_keeps_alive(task):
+    routes = breadth_first_routes(task)
+    route_list = RouteList(make_encoder(task))
+    route_list.extend(routes)
+    nodes = {}
+    for route in routes:
+        node = route.last_node
+        while node is not None:
+            nodes[id(node)] = node
+            node = node.parent
+    assert route_list.memory_bytes >= sum(map(estimate_node_bytes, nodes.values()))
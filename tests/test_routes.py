@@ -0,0 +1,66 @@
+import pytest
+
+from solver import debug_task, optimistic_heat_task
+from data_structure import ResourceBounds, Turn, Route
+
+# Heat always gains its minimum, so that the turns don't overheat at random
+TASK = optimistic_heat_task(debug_task())
+
+
+def make_turn(starting_state: tuple[int, ...], *command_names: str) -> Turn:
+    turn = Turn.from_state(starting_state, ResourceBounds(TASK.starting_resources), len(command_names))
+    for command_name in command_names:
+        turn.append(TASK.available_commands[command_name])
+    return turn
+
+
+def test_extending_leaves_the_route_as_it_is():
+    route = Route(TASK.starting_resources, 3)
+    first_turn = make_turn(route.state, "Power to comms")
+    route.append(first_turn)
+    second_turn = make_turn(route.state, "Drift to data")
+    extended_route = route.extend(second_turn)
+    assert route.turns == [first_turn]
+    assert route.state == first_turn.state
+    assert extended_route.turns == [first_turn, second_turn]
+    assert extended_route.state == second_turn.state
+
+
+def test_extended_routes_share_their_turns():
+    route = Route(TASK.starting_resources, 3)
+    route.append(make_turn(route.state, "Power to comms"))
+    first_extension = route.extend(make_turn(route.state, "Drift to data"))
+    second_extension = route.extend(make_turn(route.state, "Heat to power"))
+    assert first_extension.last_node.parent is second_extension.last_node.parent is route.last_node
+    assert first_extension.turns[0] is second_extension.turns[0]
+
+
+def test_appending_to_a_copy_leaves_the_original_as_it_is():
+    route = Route(TASK.starting_resources, 2)
+    route_copy = route.copy()
+    route_copy.append(make_turn(route.state, "Power to comms"))
+    assert len(route) == 0
+    assert len(route_copy) == 1
+
+
+def test_turns_beyond_the_max_turns_are_refused():
+    route = Route(TASK.starting_resources, 1)
+    route.append(make_turn(route.state, "Power to comms"))
+    with pytest.raises(AttributeError):
+        route.append(make_turn(route.state, "Power to comms"))
+
+
+def test_cached_validity_matches_checking_every_turn():
+    route = Route(TASK.starting_resources, 3)
+    valid_route = route.extend(make_turn(route.state, "Power to comms"))
+    invalid_route = route.extend(make_turn(route.state, "Crew and data to navs"))
+    assert valid_route.is_valid()
+    assert not invalid_route.is_valid()
+
+    # Once a turn is invalid, so is every route extended from it, even by a turn which is valid on its own
+    for extended_route in (valid_route, invalid_route):
+        valid_turn = make_turn(valid_route.state, "Heat to power")
+        assert valid_turn.is_valid()
+        longer_route = extended_route.extend(valid_turn)
+        assert longer_route.is_valid() == all(turn.is_valid() for turn in longer_route.turns) == \
+            extended_route.is_valid()
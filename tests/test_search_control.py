@@ -0,0 +1,60 @@
+import threading
+
+from task_calculator import calculator, SearchControl, BREADTH_FIRST, STREAMING
+from conftest import route_keys, make_task, breadth_first_keys
+
+
+class RecordingGui:
+    """
+    Stands in for the GUI calculator presents its routes through, like CalculatorWorker does.
+    """
+
+    def __init__(self):
+        self.routes: list = []
+        self.results: list = []
+        self.presented: threading.Event = threading.Event()
+
+    def present_route(self, route) -> None:
+        self.routes.append(route)
+
+    def present_results(self, routes) -> None:
+        self.results.append(routes)
+        self.presented.set()
+
+
+def test_calculator_presents_the_routes_through_the_gui():
+    task = make_task(fixed_heat=True)
+    breadth_first_gui = RecordingGui()
+    calculator(**task.search_arguments(), gui=breadth_first_gui, search_mode=BREADTH_FIRST, prune=True)
+    streaming_gui = RecordingGui()
+    calculator(**task.search_arguments(), gui=streaming_gui, search_mode=STREAMING, prune=True)
+    assert route_keys(breadth_first_gui.results[0]) == route_keys(streaming_gui.routes) == breadth_first_keys(task)
+    assert streaming_gui.results == [None]
+
+
+def test_progress_is_throttled():
+    task = make_task(fixed_heat=True)
+    messages = []
+    calculator(**task.search_arguments(), gui=RecordingGui(), search_mode=STREAMING, prune=True,
+               control=SearchControl(messages.append, progress_interval=3600))
+    assert len(messages) == 1
+    unthrottled_messages = []
+    gui = RecordingGui()
+    calculator(**task.search_arguments(), gui=gui, search_mode=STREAMING, prune=True,
+               control=SearchControl(unthrottled_messages.append, progress_interval=0))
+    assert len(unthrottled_messages) == len(gui.routes)
+    assert unthrottled_messages[-1] == f"Found: {len(gui.routes)}"
+
+
+def test_search_is_cancelled_from_another_thread():
+    # Unpruned, three turns take seconds to search
+    task = make_task()
+    control = SearchControl()
+    gui = RecordingGui()
+    worker = threading.Thread(target=calculator, kwargs={**task.search_arguments(), "gui": gui,
+                                                         "search_mode": STREAMING, "control": control})
+    worker.start()
+    control.cancel()
+    worker.join(timeout=5)
+    assert not worker.is_alive()
+    assert gui.presented.is_set()
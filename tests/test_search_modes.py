@@ -0,0 +1,64 @@
+import pytest
+
+from solver import solve
+from task_calculator import SearchControl, build_state_graph, STREAMING, DEPTH_FIRST, \
+    STATE_GRAPH
+from data_structure import Route, TurnTable
+from conftest import route_keys, make_task, breadth_first_keys
+
+# Without pruning, the routes of three turns take a plain search seconds to find
+PRUNE_AND_TURNS = [(True, 3), (False, 2)]
+
+
+@pytest.mark.parametrize("prune, amount_of_turns", PRUNE_AND_TURNS)
+def test_streaming_matches_breadth_first(prune, amount_of_turns):
+    task = make_task(amount_of_turns, fixed_heat=True)
+    keys = route_keys(solve(task, STREAMING, prune))
+    assert keys
+    assert keys == breadth_first_keys(task, prune)
+
+
+def test_streaming_yields_routes_before_the_search_is_done():
+    task = make_task(fixed_heat=True)
+    control = SearchControl()
+    routes = solve(task, STREAMING, control=control)
+    next(routes)
+    routes_expanded = control.routes_expanded
+    list(routes)
+    assert routes_expanded < control.routes_expanded
+
+
+@pytest.mark.parametrize("prune, amount_of_turns", PRUNE_AND_TURNS)
+def test_depth_first_matches_breadth_first(prune, amount_of_turns):
+    task = make_task(amount_of_turns, fixed_heat=True)
+    keys = route_keys(solve(task, DEPTH_FIRST, prune))
+    assert keys
+    assert keys == breadth_first_keys(task, prune)
+
+
+def test_cancelled_depth_first_search_stops():
+    task = make_task(fixed_heat=True)
+    control = SearchControl()
+    routes = solve(task, DEPTH_FIRST, control=control)
+    first_route = next(routes)
+    control.cancel()
+    assert list(routes) == []
+    assert route_keys([first_route]) == breadth_first_keys(task)[:1]
+
+
+@pytest.mark.parametrize("prune, amount_of_turns", PRUNE_AND_TURNS)
+def test_state_graph_matches_breadth_first(prune, amount_of_turns):
+    task = make_task(amount_of_turns, fixed_heat=True)
+    keys = route_keys(solve(task, STATE_GRAPH, prune))
+    assert keys
+    assert sorted(keys) == sorted(breadth_first_keys(task, prune))
+
+
+def test_state_graph_merges_routes_reaching_the_same_state():
+    task = make_task(2, fixed_heat=True)
+    empty_route = Route(task.starting_resources, task.amount_of_turns)
+    turn_table = TurnTable(task.available_commands, task.commands_per_turn, empty_route.bounds)
+    state_graph = build_state_graph(empty_route, task.amount_of_turns, SearchControl(), turn_table)
+    final_nodes = list(state_graph.levels[-1].values())
+    routes_found = sum(1 for node in final_nodes for route in state_graph.iterate_routes(node))
+    assert len(final_nodes) < routes_found == state_graph.count_routes(final_nodes)
@@ -0,0 +1,62 @@
+import pytest
+
+from solver import solve
+from task_calculator import SearchControl, SearchStats, BREADTH_FIRST, STREAMING, DEPTH_FIRST, STATE_GRAPH
+from data_structure import PossibleTurnsCache
+from conftest import route_keys, make_task, breadth_first_keys
+
+
+def level_counts(stats: SearchStats) -> list[tuple[int, int, int]]:
+    return [(level_stats.frontier, level_stats.accepted, level_stats.rejected) for level_stats in stats.levels]
+
+
+@pytest.mark.parametrize("search_mode", [BREADTH_FIRST, STREAMING, DEPTH_FIRST])
+def test_every_accepted_route_is_expanded_on_the_next_level(search_mode):
+    task = make_task(fixed_heat=True)
+    control = SearchControl(stats=SearchStats())
+    assert route_keys(solve(task, search_mode, control=control)) == breadth_first_keys(task)
+    levels = control.stats.levels
+    assert len(levels) == task.amount_of_turns
+    assert levels[0].frontier == 1
+    for level, next_level in zip(levels, levels[1:]):
+        assert next_level.frontier == level.accepted
+    assert control.stats.routes_expanded == control.routes_expanded
+
+
+def test_state_graph_expands_each_state_once():
+    task = make_task(fixed_heat=True)
+    tree_control = SearchControl(stats=SearchStats())
+    list(solve(task, DEPTH_FIRST, control=tree_control))
+    graph_control = SearchControl(stats=SearchStats())
+    list(solve(task, STATE_GRAPH, control=graph_control))
+    assert graph_control.stats.levels[0].frontier == 1
+    assert graph_control.stats.routes_expanded < tree_control.stats.routes_expanded
+
+
+def test_workers_stats_add_up_to_a_single_process_search():
+    task = make_task(fixed_heat=True)
+    control = SearchControl(stats=SearchStats())
+    list(solve(task, DEPTH_FIRST, control=control))
+    parallel_control = SearchControl(stats=SearchStats())
+    list(solve(task, DEPTH_FIRST, workers=2, control=parallel_control))
+    assert level_counts(parallel_control.stats) == level_counts(control.stats)
+
+
+def test_cache_hits_are_counted_per_level():
+    task = make_task(fixed_heat=True)
+    turn_cache = PossibleTurnsCache()
+    control = SearchControl(stats=SearchStats())
+    list(solve(task, DEPTH_FIRST, turn_cache=turn_cache, control=control))
+    assert sum(level_stats.cache_hits for level_stats in control.stats.levels) == turn_cache.hits > 0
+
+
+def test_estimates_settle_once_the_search_is_done():
+    task = make_task(fixed_heat=True)
+    reports = []
+    control = SearchControl(stats=SearchStats(reports.append))
+    list(solve(task, DEPTH_FIRST, control=control))
+    stats = control.stats
+    assert reports[-1] is stats
+    assert stats.estimate_remaining_seconds() == 0.0
+    assert stats.estimate_routes_expanded() == stats.routes_expanded
+    assert len(stats.summary().splitlines()) == task.amount_of_turns + 1
@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from solver import Task, solve
+from task_calculator import BREADTH_FIRST, DEPTH_FIRST
+from task_file import task_hash
+from solution_cache import SolutionCache
+from data_structure import TurnTable, PossibleTurnsCache, ResourceBounds, Comms, REGULAR_RESOURCE_NAMES
+from conftest import route_keys, make_task, breadth_first_keys
+
+
+@pytest.fixture
+def cache_path(tmp_path) -> str:
+    return str(tmp_path / "solutions.sqlite3")
+
+
+def seeded_keys(task: Task, search_mode: str, seed: int) -> list[tuple]:
+    random.seed(seed)
+    return route_keys(solve(task, search_mode))
+
+
+def test_hits_match_fresh_solves(task, cache_path):
+    with SolutionCache(cache_path) as cache:
+        assert route_keys(cache.solve(task, BREADTH_FIRST, seed=3)) == breadth_first_keys(task, seed=3)
+        assert route_keys(cache.solve(task, BREADTH_FIRST, seed=3)) == breadth_first_keys(task, seed=3)
+        assert (cache.hits, cache.misses) == (1, 1)
+    with SolutionCache(cache_path) as cache:
+        assert route_keys(cache.solve(task, BREADTH_FIRST, seed=3)) == breadth_first_keys(task, seed=3)
+        assert cache.hits == 1
+
+
+def test_search_mode_and_seed_are_part_of_the_key(task, cache_path):
+    with SolutionCache(cache_path) as cache:
+        for search_mode, seed in ((BREADTH_FIRST, 3), (BREADTH_FIRST, 4), (DEPTH_FIRST, 3)):
+            assert route_keys(cache.solve(task, search_mode, seed=seed)) == seeded_keys(task, search_mode, seed)
+        assert (cache.hits, cache.misses) == (0, 3)
+        for search_mode, seed in ((BREADTH_FIRST, 3), (BREADTH_FIRST, 4), (DEPTH_FIRST, 3)):
+            assert route_keys(cache.solve(task, search_mode, seed=seed)) == seeded_keys(task, search_mode, seed)
+        assert (cache.hits, cache.misses) == (3, 3)
+
+
+def test_pruning_is_part_of_the_key(cache_path):
+    task = make_task(2)
+    with SolutionCache(cache_path) as cache:
+        assert route_keys(cache.solve(task, BREADTH_FIRST, seed=3)) == breadth_first_keys(task, seed=3) == []
+        assert route_keys(cache.solve(task, BREADTH_FIRST, False, seed=3)) == breadth_first_keys(task, False, seed=3) \
+            != []
+        assert cache.misses == 2
+
+
+def test_seed_is_ignored_without_random_heat(cache_path):
+    task = make_task(2, fixed_heat=True)
+    with SolutionCache(cache_path) as cache:
+        assert route_keys(cache.solve(task, BREADTH_FIRST, False, seed=3)) == breadth_first_keys(task, False)
+        assert route_keys(cache.solve(task, BREADTH_FIRST, False, seed=4)) == breadth_first_keys(task, False)
+        assert route_keys(cache.solve(task, BREADTH_FIRST, False)) == breadth_first_keys(task, False)
+        assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_task_hash_ignores_the_name_and_command_order(task):
+    reordered = Task(dict(reversed(task.available_commands.items())), task.starting_resources, task.amount_of_turns,
+                     task.commands_per_turn, task.objective, "Renamed")
+    longer = Task(task.available_commands, task.starting_resources, task.amount_of_turns + 1, task.commands_per_turn,
+                  task.objective, task.name)
+    assert task_hash(reordered) == task_hash(task)
+    assert task_hash(longer) != task_hash(task)
+
+
+def test_turn_cache_is_shared_by_tasks_with_the_same_commands(fixed_heat_task, cache_path):
+    other_objective = Task(fixed_heat_task.available_commands, fixed_heat_task.starting_resources,
+                           fixed_heat_task.amount_of_turns, fixed_heat_task.commands_per_turn,
+                           {REGULAR_RESOURCE_NAMES["comms"]: Comms(value=3)})
+    with SolutionCache(cache_path) as cache:
+        list(cache.solve(fixed_heat_task, BREADTH_FIRST))
+        turn_table = TurnTable(other_objective.available_commands, other_objective.commands_per_turn,
+                               ResourceBounds(other_objective.starting_resources), PossibleTurnsCache(100000))
+        assert cache.load_turn_cache(turn_table) > 0
+        assert route_keys(cache.solve(other_objective, BREADTH_FIRST)) == breadth_first_keys(other_objective)
+
+
+def test_least_recently_used_are_evicted(task, cache_path):
+    with SolutionCache(cache_path, max_bytes=1) as cache:
+        list(cache.solve(make_task(2), BREADTH_FIRST, False))
+        list(cache.solve(task, BREADTH_FIRST))
+        assert cache.evictions > 0
+        assert cache.size_in_bytes <= 1
@@ -0,0 +1,58 @@
+import io
+import json
+
+from solve_service import SolveService, TurnTableRegistry
+from task_file import task_to_json, route_to_json
+from data_structure import Comms, REGULAR_RESOURCE_NAMES
+from conftest import make_task, breadth_first_routes
+
+
+def run_service(requests: list) -> list[dict]:
+    """
+    Runs the requests through a service, and returns the results in the order they're written.
+    """
+    output = io.StringIO()
+    service = SolveService(output, workers=2)
+    service.run(io.StringIO("".join((request if isinstance(request, str) else json.dumps(request)) + "\n"
+                                    for request in requests)))
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_registry_shares_turn_tables_between_tasks_with_the_same_commands():
+    registry = TurnTableRegistry(max_tables=1)
+    task = make_task()
+    other_objective = make_task(2)
+    other_objective.objective = {REGULAR_RESOURCE_NAMES["comms"]: Comms(value=3)}
+    assert registry.get(task) is registry.get(other_objective)
+    grouped_turn_table = registry.get(task, group_orderings=True)
+    assert grouped_turn_table is not registry.get(task)
+    assert (registry.hits, registry.misses, len(registry.turn_tables)) == (1, 3, 1)
+
+
+def test_results_match_the_breadth_first_routes():
+    # Without pruning, the routes of three turns take a plain search seconds to find
+    requests = {"pruned": (make_task(fixed_heat=True), True), "unpruned": (make_task(2, fixed_heat=True), False)}
+    results = run_service([{"id": request_id, "task": task_to_json(task),
+                            "options": {"search_mode": "breadth_first", "prune": prune, "max_routes": 10}}
+                           for request_id, (task, prune) in requests.items()])
+    results = {result["id"]: result for result in results}
+    assert set(results) == set(requests)
+    for request_id, (task, prune) in requests.items():
+        routes = breadth_first_routes(task, prune)
+        assert results[request_id]["routes_found"] == len(routes) > 0
+        assert results[request_id]["routes"] == [route_to_json(route) for route in routes[:10]]
+        assert not results[request_id]["cancelled"]
+
+
+def test_duplicate_requests_are_refused_and_cancelled_ones_still_get_a_result():
+    slow_request = {"id": "slow", "task": task_to_json(make_task()), "options": {"prune": False}}
+    results = run_service([slow_request, slow_request, {"id": "slow", "cancel": True}])
+    assert "error" in results[0]
+    assert results[1]["cancelled"]
+    assert len(results) == 2
+
+
+def test_invalid_requests_get_an_error():
+    results = run_service(["{", "[]", {"task": task_to_json(make_task(2))}, {"id": "bad", "task": {}}])
+    assert [result["id"] for result in results] == [None, None, None, "bad"]
+    assert all("error" in result for result in results)
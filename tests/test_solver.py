@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from solver import solve
+from conftest import route_keys, make_task, breadth_first_keys
+
+REPOSITORY_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_the_solver_leaves_out_qt_and_multiprocessing():
+    imported = subprocess.run([sys.executable, "-c", "import sys, solver; print(' '.join(sys.modules))"],
+                              cwd=REPOSITORY_PATH, capture_output=True, text=True, check=True).stdout.split()
+    assert "solver" in imported
+    assert not [module for module in imported if module.startswith(("PyQt5", "multiprocessing", "concurrent"))]
+
+
+def test_solve_finds_the_breadth_first_routes():
+    task = make_task(fixed_heat=True)
+    assert sorted(route_keys(solve(task))) == sorted(breadth_first_keys(task))
+
+
+def test_invalid_options_are_refused_right_away():
+    with pytest.raises(ValueError):
+        solve(make_task(), "sideways")
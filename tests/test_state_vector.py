@@ -0,0 +1,61 @@
+import random
+
+from solver import debug_task
+from data_structure import ResourceBounds, Turn, Route, RESOURCE_INDEX, SPECIAL_RESOURCE_NAMES
+
+TASK = debug_task()
+CREW_INDEX = RESOURCE_INDEX[SPECIAL_RESOURCE_NAMES["crew"]]
+HEAT_INDEX = RESOURCE_INDEX[SPECIAL_RESOURCE_NAMES["heat"]]
+
+
+def resource_values(resources: dict) -> dict[str, int]:
+    return {resource_name: resource.value for resource_name, resource in resources.items()}
+
+
+def test_state_round_trips_through_resources():
+    bounds = ResourceBounds(TASK.starting_resources)
+    state = bounds.to_state(TASK.starting_resources)
+    resources = bounds.to_resources(state)
+    assert resource_values(resources) == resource_values(TASK.starting_resources)
+    assert all(type(resources[name]) is type(resource) for name, resource in TASK.starting_resources.items())
+    assert bounds.to_state(resources) == state
+
+
+def test_appending_commands_changes_the_state_like_the_resources():
+    turn = Turn(TASK.starting_resources, 10)
+    values = resource_values(TASK.starting_resources)
+    for command_name in ("Power to comms", "Heat to power", "Drift to data"):
+        command = TASK.available_commands[command_name]
+        assert turn.append(command)
+        for resource_name, resource in command.input_resources.items():
+            values[resource_name] -= resource.value
+        for resource_name, resource in command.output_resources.items():
+            values[resource_name] += resource.value
+        assert resource_values(turn.current_resources) == values
+
+
+def test_commands_beyond_the_bounds_are_invalid():
+    turn = Turn(TASK.starting_resources, 10)
+    assert not turn.append(TASK.available_commands["Crew and data to navs"])
+    assert not turn.is_valid()
+
+
+def test_end_of_turn_regains_crew_and_gains_heat():
+    random.seed(1)
+    starting_state = ResourceBounds(TASK.starting_resources).to_state(TASK.starting_resources)
+    for _ in range(20):
+        turn = Turn(TASK.starting_resources, 1)
+        turn.append(TASK.available_commands["Heat to power"])
+        heat_gain = turn.state[HEAT_INDEX] - (starting_state[HEAT_INDEX] - 2)
+        assert 1 <= heat_gain <= 3
+        assert turn.state[CREW_INDEX] == TASK.starting_resources[SPECIAL_RESOURCE_NAMES["crew"]].max_value
+
+
+def test_route_state_is_the_last_turns_state():
+    route = Route(TASK.starting_resources, 2)
+    assert route.state == ResourceBounds(TASK.starting_resources).to_state(TASK.starting_resources)
+    turn = Turn(TASK.starting_resources, 1)
+    turn.append(TASK.available_commands["Power to comms"])
+    assert route.append(turn)
+    assert route.state == turn.state
+    assert resource_values(route.current_resources) == resource_values(turn.current_resources)
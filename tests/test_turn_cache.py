@@ -0,0 +1,44 @@
+import pytest
+
+from solver import solve
+from task_calculator import BREADTH_FIRST, STREAMING, DEPTH_FIRST, STATE_GRAPH
+from data_structure import PossibleTurnsCache
+from conftest import route_keys, make_task, breadth_first_keys
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = PossibleTurnsCache(2)
+    cache.put((1,), ())
+    cache.put((2,), ())
+    assert cache.get((1,)) == ()
+    cache.put((3,), ())
+    assert cache.get((2,)) is None
+    assert cache.get((1,)) == cache.get((3,)) == ()
+    assert (cache.hits, cache.misses, cache.evictions, len(cache)) == (3, 1, 1, 2)
+
+
+def test_byte_limit_is_respected():
+    cache = PossibleTurnsCache(100, max_bytes=1000)
+    for value in range(100):
+        cache.put((value,), ())
+        assert cache.size_in_bytes <= 1000
+    assert 0 < len(cache) < 100
+    assert cache.evictions == 100 - len(cache)
+
+
+@pytest.mark.parametrize("max_entries", [1, 100000])
+@pytest.mark.parametrize("search_mode", [BREADTH_FIRST, STREAMING, DEPTH_FIRST, STATE_GRAPH])
+def test_cached_searches_find_the_same_routes(search_mode, max_entries):
+    task = make_task(fixed_heat=True)
+    turn_cache = PossibleTurnsCache(max_entries)
+    assert sorted(route_keys(solve(task, search_mode, turn_cache=turn_cache))) == sorted(breadth_first_keys(task))
+    assert turn_cache.misses > 0
+    assert len(turn_cache) <= max_entries
+
+
+def test_cache_is_hit_when_states_repeat():
+    task = make_task(fixed_heat=True)
+    turn_cache = PossibleTurnsCache()
+    list(solve(task, DEPTH_FIRST, turn_cache=turn_cache))
+    assert turn_cache.hits > 0
+    assert turn_cache.evictions == 0
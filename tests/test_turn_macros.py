@@ -0,0 +1,58 @@
+import itertools
+import random
+
+import pytest
+
+from solver import Task, debug_task, optimistic_heat_task
+from data_structure import ResourceBounds, Turn, TurnMacro, TurnTable
+
+TASK = optimistic_heat_task(debug_task())
+
+
+def random_states(task: Task, amount: int, seed: int = 1) -> list[tuple[int, ...]]:
+    """
+    The starting state, and states around it, which are within the bounds or just past them.
+    """
+    random.seed(seed)
+    bounds = ResourceBounds(task.starting_resources)
+    starting_state = bounds.to_state(task.starting_resources)
+    return [starting_state] + [tuple(value + random.randint(-3, 3) for value in starting_state)
+                               for _ in range(amount - 1)]
+
+
+def possible_turns_by_appending(task: Task, state: tuple[int, ...]) -> list[tuple]:
+    """
+    Every permutation of the commands which can be appended one by one to a turn starting with the given state, like
+    the calculator originally found its possible turns.
+    """
+    bounds = ResourceBounds(task.starting_resources)
+    possible_turns = []
+    for permutation in itertools.product(task.available_commands.values(), repeat=task.commands_per_turn):
+        turn = Turn.from_state(state, bounds, task.commands_per_turn)
+        if all(turn.append(command) for command in permutation):
+            possible_turns.append((tuple(command.name for command in permutation), turn.state))
+    return possible_turns
+
+
+@pytest.mark.parametrize("commands_per_turn", [1, 2, 3])
+def test_macros_accept_the_permutations_which_can_be_appended(commands_per_turn):
+    bounds = ResourceBounds(TASK.starting_resources)
+    for permutation in itertools.product(TASK.available_commands.values(), repeat=commands_per_turn):
+        macro = TurnMacro(permutation, bounds)
+        for state in random_states(TASK, 20):
+            # With room for more commands, no end of turn effects are applied
+            turn = Turn.from_state(state, bounds, commands_per_turn + 1)
+            appended = all(turn.append(command) for command in permutation)
+            assert macro.accepts(state) == appended
+            if appended:
+                assert macro.apply(state) == turn.state
+        assert macro.delta == tuple(map(sum, zip(*(command.delta for command in permutation))))
+
+
+def test_turn_table_finds_the_same_turns_as_appending():
+    bounds = ResourceBounds(TASK.starting_resources)
+    turn_table = TurnTable(TASK.available_commands, TASK.commands_per_turn, bounds)
+    for state in random_states(TASK, 10):
+        turns = [(tuple(command.name for command in turn.commands), turn.state)
+                 for turn in turn_table.get_possible_turns(state)]
+        assert sorted(turns) == sorted(possible_turns_by_appending(TASK, state))